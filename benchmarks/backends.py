@@ -0,0 +1,66 @@
+"""Comparaison des moteurs de stockage de todo.py (journal et SQLite).
+
+Undo et redo ne doivent pas dépendre du nombre de tâches.
+
+Usage : python benchmarks/backends.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_core as todo  # noqa: E402
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def bench_store(name, make_store, size):
+    store = make_store()
+    results = {}
+    results['add'], _ = timed(store.add, 'nouvelle tâche')
+    results['list'], _ = timed(lambda: sum(1 for _ in store.iter_tasks()))
+    results['id_at'], task_id = timed(store.id_at, size // 2)
+    results['done'], _ = timed(store.done, task_id)
+    results['remove'], _ = timed(store.remove, task_id)
+    results['undo'], _ = timed(store.undo)
+    results['redo'], _ = timed(store.redo)
+    return results
+
+
+def run(size):
+    with tempfile.TemporaryDirectory() as tmp:
+        tasks_file = os.path.join(tmp, 'tasks.json')
+        db_file = os.path.join(tmp, 'tasks.db')
+        todo.save_tasks([{'title': f'Tâche numéro {i}', 'done': i % 3 == 0} for i in range(size)],
+                        tasks_file)
+        # Migration initiale (identifiants, index) hors des mesures.
+        todo.JournalStore(tasks_file).compact()
+        import_time, _ = timed(todo.SqliteStore, db_file, tasks_file)
+        print(f'{size} tâches (import SQLite : {import_time * 1000:.1f} ms)')
+        stores = [
+            ('journal', lambda: todo.JournalStore(tasks_file)),
+            ('sqlite', lambda: todo.SqliteStore(db_file, tasks_file)),
+        ]
+        for name, make_store in stores:
+            results = bench_store(name, make_store, size)
+            timings = '  '.join(f'{op}={sec * 1000:9.2f} ms' for op, sec in results.items())
+            print(f'  {name:8} {timings}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Diffusion d'une commande à une flotte d'hôtes : durée totale contre --hosts serveurs paramiko locaux.
+
+Chaque hôte est un serveur SSH local sur son propre port. La commande
+`work <lignes> <secondes> <code>` y écrit ses lignes réparties sur la
+durée, puis sort avec le code donné. Mesures : un hôte à la fois (sur
+--sequential hôtes, extrapolé), puis la flotte entière avec --workers,
+connexions neuves puis déjà dans le pool ; enfin un hôte en échec, des hôtes
+bloqués et un injoignable, avec un délai par hôte de --timeout secondes. Chaque
+ligne attendue doit arriver, dans l'ordre, pour chaque hôte.
+
+Usage : python benchmarks/broadcast.py [--hosts 200] [--workers 8 32 64] [--lines 50] [--seconds 0.2]
+"""
+import argparse
+import collections
+import contextlib
+import socket
+import threading
+import time
+
+import headless
+from sshlocal import LocalSSHServer
+
+headless.install()
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+
+def handler(channel, command):
+    """`work <lignes> <secondes> <code>`"""
+    lines, seconds, code = (cast(arg) for cast, arg in zip((int, float, int), command.split()[1:]))
+    for k in range(lines):
+        channel.sendall(f'ligne {k} sur {lines}\n'.encode())
+        time.sleep(seconds / lines)
+    channel.send_exit_status(code)
+
+
+def fail(channel, command):
+    """Hôte en échec : la commande sort en code 3."""
+    channel.sendall(b'erreur\n')
+    channel.send_exit_status(3)
+
+
+def hang(channel, command):
+    """Hôte bloqué : la commande ne finit jamais."""
+    while channel.recv(1024):
+        pass
+
+
+class Sink:
+    """on_output : lignes reçues par hôte."""
+
+    def __init__(self):
+        self.lines = collections.defaultdict(list)
+        self.lock = threading.Lock()
+
+    def __call__(self, host, line):
+        with self.lock:
+            self.lines[host].append(line)
+
+
+def run(hosts, command, workers, timeout, pool):
+    sink = Sink()
+    broadcast = terminal_module.Broadcast(pool, 'pi', 'raspberry', workers=workers, timeout=timeout)
+    start = time.perf_counter()
+    results = broadcast.run(hosts, command, sink)
+    return time.perf_counter() - start, results, sink
+
+
+def check(results, sink, lines):
+    expected = [f'ligne {k} sur {lines}' for k in range(lines)]
+    complete = sum(1 for result in results if sink.lines[result.host] == expected)
+    codes = collections.Counter(result.status for result in results)
+    return f'{complete}/{len(results)} sorties complètes, codes {dict(codes)}'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=200)
+    parser.add_argument('--workers', type=int, nargs='+', default=[8, 32, 64])
+    parser.add_argument('--sequential', type=int, default=10, help='Hôtes mesurés un à la fois')
+    parser.add_argument('--lines', type=int, default=50, help='Lignes écrites par hôte')
+    parser.add_argument('--seconds', type=float, default=0.2, help='Durée de la commande')
+    parser.add_argument('--timeout', type=float, default=2.0, help='Délai par hôte du dernier scénario')
+    args = parser.parse_args()
+    command = f'work {args.lines} {args.seconds} 0'
+    with contextlib.ExitStack() as stack:
+        servers = [stack.enter_context(LocalSSHServer(handler)) for _ in range(args.hosts)]
+        hosts = [('127.0.0.1', server.port) for server in servers]
+
+        pool = terminal_module.SSHConnectionPool()
+        elapsed, results, sink = run(hosts[:args.sequential], command, 1, 60, pool)
+        pool.close()
+        print(f'1 à la fois     {args.sequential} hôtes en {elapsed:6.2f} s  '
+              f'(soit ~{elapsed / args.sequential * args.hosts:6.1f} s pour {args.hosts})  '
+              f'{check(results, sink, args.lines)}')
+
+        for workers in args.workers:
+            pool = terminal_module.SSHConnectionPool()
+            for state in ('neuves', 'du pool'):
+                handshakes = pool.handshakes
+                elapsed, results, sink = run(hosts, command, workers, 60, pool)
+                print(f'{workers:3} en parallèle  {args.hosts} hôtes en {elapsed:6.2f} s  connexions {state:7} '
+                      f'({pool.handshakes - handshakes} poignées de main)  {check(results, sink, args.lines)}')
+            pool.close()
+
+        # Un hôte en échec, deux bloqués, un injoignable : le délai par hôte borne la diffusion.
+        faulty = [stack.enter_context(LocalSSHServer(fail))] + [stack.enter_context(LocalSSHServer(hang))
+                                                                for _ in range(2)]
+        faulty = [('127.0.0.1', server.port) for server in faulty] + [('127.0.0.1', free_port())]
+        pool = terminal_module.SSHConnectionPool()
+        elapsed, results, sink = run(hosts[:20] + faulty, command, max(args.workers), args.timeout, pool)
+        print(f'pannes          {len(results)} hôtes en {elapsed:6.2f} s (délai de {args.timeout} s par hôte)')
+        print(terminal_module.broadcast_summary(results).rstrip())
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
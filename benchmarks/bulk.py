@@ -0,0 +1,88 @@
+"""Import et export en masse : débit et pic de mémoire selon la taille du fichier.
+
+Chaque import (dans un dossier vide) et chaque export est lancé dans un
+processus neuf ; le pic de RSS doit rester à peu près stable quand le
+nombre de lignes est multiplié par dix.
+
+Usage : python benchmarks/bulk.py [--sizes 100000 1000000] [--formats csv jsonl md] [--backend journal]
+"""
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_core as todo  # noqa: E402
+from snapshot import peak_rss  # noqa: E402
+
+
+def child(backend, action, path, workdir):
+    """Import ou export dans `workdir` ; affiche « secondes rss_ko »."""
+    os.chdir(workdir)
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            todo.main(['--backend', backend, action, path])
+        finally:
+            sys.stdout = stdout
+    print(time.perf_counter() - start, peak_rss())
+
+
+def measure(backend, action, path, workdir):
+    output = subprocess.check_output([sys.executable, __file__, '--child', backend, action, path, workdir])
+    elapsed, rss = output.split()
+    return float(elapsed), int(rss)
+
+
+def generate(fmt, path, size):
+    """`size` lignes dont un titre sur dix est un doublon."""
+    rows = ((f'Tâche importée {i if i % 10 else i // 10}', i % 3 == 0) for i in range(size))
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            writer = csv.writer(f)
+            writer.writerow(['title', 'done'])
+            writer.writerows((title, int(done)) for title, done in rows)
+        elif fmt == 'jsonl':
+            f.writelines(json.dumps({'title': title, 'done': done}, ensure_ascii=False) + '\n'
+                         for title, done in rows)
+        else:
+            f.writelines(f"- [{'x' if done else ' '}] {title}\n" for title, done in rows)
+
+
+def run(size, formats, backend):
+    print(f'{size} lignes')
+    for fmt in formats:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, f'source.{fmt}')
+            target = os.path.join(tmp, f'export.{fmt}')
+            workdir = os.path.join(tmp, 'store')
+            os.mkdir(workdir)
+            generate(fmt, source, size)
+            imported, import_rss = measure(backend, 'import', source, workdir)
+            exported, export_rss = measure(backend, 'export', target, workdir)
+            print(f'  {fmt:5} import={size / imported:9.0f} lignes/s (RSS {import_rss / 1024:4.0f} Mo)  '
+                  f'export={size / exported:9.0f} lignes/s (RSS {export_rss / 1024:4.0f} Mo)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--formats', nargs='+', choices=sorted(todo.FORMATS), default=sorted(todo.FORMATS))
+    parser.add_argument('--backend', choices=sorted(todo.STORES), default='journal')
+    parser.add_argument('--child', nargs=4, metavar=('BACKEND', 'ACTION', 'PATH', 'DIR'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+    for size in args.sizes:
+        run(size, args.formats, args.backend)
+
+
+if __name__ == '__main__':
+    main()
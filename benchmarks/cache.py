@@ -0,0 +1,92 @@
+"""Cache des snapshots : `list` et `stats` avec et sans le cache en colonnes du snapshot JSON.
+
+Pour chaque taille, un snapshot synthétique est écrit puis compacté, ce
+qui écrit son cache (`tasks.json.cache`). Chaque mesure lance la commande
+complète dans un processus neuf, sortie écartée : `list` et `stats` en
+lisant le snapshot en flux (cache retiré), puis depuis le cache. Les
+sorties des deux lectures sont comparées. Enfin, l'invalidation : après
+un ajout (journal) puis une compaction, et après un `touch` du snapshot,
+`list` doit rester identique à une lecture sans cache.
+
+Usage : python benchmarks/cache.py [--sizes 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import todo_core as todo  # noqa: E402
+from suite import generate  # noqa: E402
+
+SCRIPT = os.path.join(ROOT, 'todo.py')
+
+
+def command(workdir, *argv):
+    """(durée, sortie) de `todo.py argv` lancé dans `workdir`."""
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, SCRIPT, *argv], cwd=workdir, check=True, stdout=subprocess.PIPE).stdout
+    return time.perf_counter() - start, out
+
+
+def timed(workdir, repeat, *argv):
+    runs = [command(workdir, *argv) for _ in range(repeat)]
+    return statistics.median(elapsed for elapsed, _ in runs), runs[0][1]
+
+
+def uncached(workdir, *argv):
+    """Sortie de la commande sans le cache, qui est remis en place ensuite."""
+    cache = os.path.join(workdir, todo.TASKS_FILE + todo.CACHE_SUFFIX)
+    shutil.move(cache, cache + '.off')
+    try:
+        return command(workdir, *argv)[1]
+    finally:
+        shutil.move(cache + '.off', cache)
+
+
+def run(size, repeat):
+    tasks = generate(size, 'uniform:10:80', 0.3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, todo.TASKS_FILE)
+        todo.save_tasks(tasks, path)
+        command(tmp, 'compact')
+        cache = path + todo.CACHE_SUFFIX
+        assert os.path.exists(cache), 'la compaction n\'a pas écrit le cache'
+        print(f'{size} tâches, snapshot de {os.path.getsize(path) / 1e6:.1f} Mo, '
+              f'cache de {os.path.getsize(cache) / 1e6:.1f} Mo')
+        for argv in (['list'], ['stats']):
+            cached, out = timed(tmp, repeat, *argv)
+            os.rename(cache, cache + '.off')
+            streamed, reference = timed(tmp, repeat, *argv)
+            os.rename(cache + '.off', cache)
+            assert out == reference, f'{argv[0]} : sorties différentes avec le cache'
+            print(f'  {argv[0]:6} en flux {streamed * 1000:7.1f} ms   cache {cached * 1000:7.1f} ms   '
+                  f'x{streamed / cached:.1f}')
+
+        # Invalidation : ajout journalisé, compaction, puis snapshot touché
+        command(tmp, 'add', 'tâche ajoutée après le cache')
+        assert command(tmp, 'list')[1] == uncached(tmp, 'list'), 'journal ignoré avec le cache'
+        command(tmp, 'compact')
+        assert command(tmp, 'list')[1] == uncached(tmp, 'list'), 'cache périmé après compaction'
+        os.utime(path)
+        assert command(tmp, 'list')[1] == uncached(tmp, 'list'), 'cache utilisé pour un snapshot touché'
+        print('  invalidation ok (journal, compaction, touch)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Test de charge multi-processus de l'écriture concurrente dans tasks.json.
+
+Des centaines de processus ajoutent des tâches en même temps sur le même
+fichier, sans passer par le service ; on vérifie ensuite qu'aucune mise à
+jour n'a été perdue et on relève l'attente maximale par opération.
+
+Usage : python benchmarks/concurrency.py [--writers 200] [--ops 10]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_core as todo  # noqa: E402
+
+
+def writer(path, worker, ops, waits):
+    store = todo.JournalStore(path)
+    slowest = 0.0
+    for i in range(ops):
+        start = time.perf_counter()
+        store.add(f'processus {worker} tâche {i}')
+        slowest = max(slowest, time.perf_counter() - start)
+    waits.put(slowest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=200)
+    parser.add_argument('--ops', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'tasks.json')
+        # Petit seuil pour que des compactions aient lieu pendant le test.
+        todo.COMPACT_MIN_BYTES = 4096
+        waits = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=writer, args=(path, n, args.ops, waits))
+                   for n in range(args.writers)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        slowest = max(waits.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        tasks = todo.JournalStore(path).load()
+        expected = args.writers * args.ops
+        ids = {task['id'] for task in tasks}
+        print(f'{len(tasks)}/{expected} tâches, {len(ids)} ids distincts, '
+              f'{expected / elapsed:.0f} ops/s, attente max {slowest * 1000:.1f} ms')
+        if len(tasks) != expected or len(ids) != expected or any(w.exitcode for w in workers):
+            sys.exit('mises à jour perdues ou processus en échec')
+
+
+if __name__ == '__main__':
+    main()
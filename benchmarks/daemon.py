@@ -0,0 +1,82 @@
+"""Générateur de charge pour le service `todo.py serve`.
+
+Lance le service dans un répertoire temporaire, puis des clients
+concurrents qui enchaînent des ajouts ; affiche le débit (ops/s) et les
+latences p50/p99.
+
+Usage : python benchmarks/daemon.py [--clients 16] [--ops 500]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import todo_core as todo  # noqa: E402
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def client(socket_path, ops, latencies):
+    store = todo.RemoteStore.connect(socket_path)
+    for i in range(ops):
+        start = time.perf_counter()
+        store.add(f'tâche de charge {i}')
+        latencies.append(time.perf_counter() - start)
+
+
+def report(name, latencies, elapsed):
+    latencies.sort()
+    print(f'{name:8} {len(latencies) / elapsed:9.0f} ops/s  '
+          f'p50={percentile(latencies, 50) * 1000:.2f} ms  p99={percentile(latencies, 99) * 1000:.2f} ms')
+
+
+def run(clients, ops):
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, todo.SOCKET_FILE)
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'todo.py'), 'serve'],
+                                  cwd=tmp, stdout=subprocess.DEVNULL)
+        try:
+            while todo.RemoteStore.connect(socket_path) is None:
+                time.sleep(0.05)
+            latencies = []
+            threads = [threading.Thread(target=client, args=(socket_path, ops, latencies))
+                       for _ in range(clients)]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            report('service', latencies, time.perf_counter() - start)
+        finally:
+            server.terminate()
+            server.wait()
+
+        # Référence : le même nombre d'ajouts, un par un, sur le store local.
+        store = todo.JournalStore(os.path.join(tmp, 'local.json'))
+        latencies = []
+        start = time.perf_counter()
+        for i in range(clients * ops):
+            op_start = time.perf_counter()
+            store.add(f'tâche de charge {i}')
+            latencies.append(time.perf_counter() - op_start)
+        report('local', latencies, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--ops', type=int, default=500)
+    args = parser.parse_args()
+    run(args.clients, args.ops)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""Session supervisée sur lien instable : coupures, reconnexion, file de commandes et contrôle de flux.
+
+Le terminal (sans iOS, headless.py) passe par un relais TCP local qui
+ajoute --latency de latence dans chaque sens et coupe la liaison à la
+demande, vers un serveur paramiko local dont le shell note chaque
+commande reçue et répond `ok <commande>`. Scénarios :
+  coupure    liaison coupée net (RST) ; des commandes tapées pendant la
+             coupure doivent être rejouées, chacune une seule fois, dans l'ordre ;
+  panne      serveur injoignable pendant --outage s : essais espacés par le backoff ;
+  lien muet  le relais avale tout sans rien couper : seuls les keepalives
+             (ici toutes les 0,5 s, délai 0,5 s) détectent la panne ;
+  envoi      le serveur cesse de lire : la fenêtre SSH se remplit, les
+             commandes attendent dans la file, bornée, puis partent toutes ;
+  réception  le serveur inonde le terminal pendant que l'affichage est
+             arrêté : la lecture se suspend, la sortie en attente reste bornée.
+
+Usage : python benchmarks/flaky.py [--latency 0.02] [--outage 6]
+"""
+import argparse
+import logging
+import threading
+import time
+
+import headless
+from sshlocal import FlakyProxy, LocalSSHServer
+
+LOOP = headless.MainLoop()
+headless.install(LOOP)
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+# Les essais refusés pendant les pannes font journaliser au client des
+# erreurs de bannière attendues
+logging.getLogger('paramiko.transport').setLevel(logging.CRITICAL)
+
+
+class Shell:
+    """Shell du serveur : note les commandes, répond `ok`, et sait se bloquer ou inonder."""
+
+    def __init__(self):
+        self.commands = []
+        self.stall = threading.Event()
+
+    def __call__(self, channel, command):
+        buffer = b''
+        while True:
+            if self.stall.is_set():
+                time.sleep(0.01)
+                continue
+            data = channel.recv(65536)
+            if not data:
+                return
+            buffer += data
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                line = line.decode()
+                self.commands.append(line)
+                if line.startswith('flood '):
+                    # Fins de ligne d'un pty, comme un vrai shell
+                    payload = b'x' * 78 + b'\r\n'
+                    for _ in range(int(line.split()[1]) // len(payload)):
+                        channel.sendall(payload)
+                    channel.sendall(b'fin\r\n')
+                else:
+                    channel.sendall(f'ok {line[:40]}\n'.encode())
+
+
+class Screen:
+    """add_output de remplacement : garde le texte reçu et les messages."""
+
+    def __init__(self):
+        self.parts = []
+        self.lock = threading.Lock()
+
+    def __call__(self, text, raw=False):
+        with self.lock:
+            self.parts.append(text)
+
+    def text(self):
+        with self.lock:
+            return ''.join(self.parts)
+
+
+def wait_for(predicate, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise SystemExit('délai dépassé')
+        time.sleep(0.002)
+    return time.monotonic()
+
+
+def connect(port, add_output=None):
+    terminal = terminal_module.SSHTerminal(pool=terminal_module.SSHConnectionPool())
+    screen = Screen()
+    terminal.add_output = add_output or screen
+    terminal.host_field.text, terminal.port = f'127.0.0.1:{port}', port
+    terminal.user_field.text, terminal.pass_field.text = 'pi', 'raspberry'
+    terminal.hostname, terminal.username, terminal.password = '127.0.0.1', 'pi', 'raspberry'
+    terminal._connect_thread(terminal._begin_session())
+    if not terminal.connected:
+        raise SystemExit(screen.text())
+    return terminal, screen
+
+
+def type_command(terminal, command):
+    terminal.command_field.text = command
+    terminal.send_command(None)
+
+
+def close(terminal):
+    terminal.disconnect_ssh()
+    terminal.pool.close()
+
+
+def cut(server, shell, latency):
+    with FlakyProxy(server.port, latency) as proxy:
+        terminal, screen = connect(proxy.port)
+        for k in range(5):
+            type_command(terminal, f'avant {k}')
+        wait_for(lambda: 'ok avant 4' in screen.text())
+        start = time.monotonic()
+        proxy.drop()
+        wait_for(lambda: not terminal.connected)
+        detected = time.monotonic()
+        for k in range(5):
+            type_command(terminal, f'pendant {k}')
+        reconnected = wait_for(lambda: 'Reconnecté' in screen.text())
+        done = wait_for(lambda: 'ok pendant 4' in screen.text())
+        expected = [f'avant {k}' for k in range(5)] + [f'pendant {k}' for k in range(5)]
+        received = [command for command in shell.commands if command in expected]
+        print(f'coupure    détectée en {(detected - start) * 1000:6.1f} ms, reconnecté en '
+              f'{(reconnected - start) * 1000:6.1f} ms, file rejouée en {(done - reconnected) * 1000:6.1f} ms ; '
+              f"commandes {'reçues une fois, dans l’ordre' if received == expected else 'ALTÉRÉES ' + str(received)}")
+        close(terminal)
+
+
+def outage(server, latency, seconds):
+    with FlakyProxy(server.port, latency) as proxy:
+        terminal, screen = connect(proxy.port)
+        proxy.refusing = True
+        start = time.monotonic()
+        proxy.drop()
+        wait_for(lambda: not terminal.connected)
+        type_command(terminal, 'après la panne')
+        time.sleep(seconds)
+        proxy.refusing = False
+        back = wait_for(lambda: 'ok après la panne' in screen.text(), 60)
+        delays = [line.rsplit('dans ', 1)[1] for line in screen.text().splitlines() if 'nouvel essai' in line]
+        print(f'panne      {seconds} s : {len(delays)} essais espacés de {", ".join(delays)}, '
+              f'commande exécutée {back - start - seconds:5.2f} s après le retour du serveur')
+        close(terminal)
+
+
+def mute(server, latency):
+    terminal_module.PROBE_INTERVAL, terminal_module.PROBE_TIMEOUT = 0.5, 0.5
+    with FlakyProxy(server.port, latency) as proxy:
+        terminal, screen = connect(proxy.port)
+        time.sleep(0.6)
+        proxy.mute()
+        start = time.monotonic()
+        detected = wait_for(lambda: not terminal.connected)
+        type_command(terminal, 'après le silence')
+        back = wait_for(lambda: 'ok après le silence' in screen.text())
+        print(f'lien muet  détecté en {(detected - start) * 1000:6.1f} ms par keepalive, '
+              f'commande exécutée {(back - detected) * 1000:6.1f} ms après')
+        close(terminal)
+    terminal_module.PROBE_INTERVAL, terminal_module.PROBE_TIMEOUT = 5, 5
+
+
+def sending(server, shell, latency):
+    with FlakyProxy(server.port, latency) as proxy:
+        terminal, screen = connect(proxy.port)
+        shell.stall.set()
+        line = 'y' * 32768
+        accepted = refused = peak = 0
+        # Au-delà de la fenêtre SSH du serveur (2 Mo, 64 commandes) et de la file
+        for _ in range(terminal_module.COMMAND_QUEUE_LIMIT + 100):
+            before = len(terminal.outbox)
+            type_command(terminal, line)
+            if len(terminal.outbox) > before:
+                accepted += 1
+            else:
+                refused += 1
+            peak = max(peak, len(terminal.outbox))
+            time.sleep(0.001)
+        count = shell.commands.count(line)
+        shell.stall.clear()
+        start = time.monotonic()
+        wait_for(lambda: shell.commands.count(line) == accepted)
+        print(f'envoi      serveur bloqué : {count} commandes de 32 Ko passées avant que la fenêtre se ferme, '
+              f'file au plus de {peak}, {refused} refusées ; {accepted} reçues '
+              f'{(time.monotonic() - start) * 1000:6.1f} ms après la reprise')
+        close(terminal)
+
+
+def receiving(server, latency):
+    with FlakyProxy(server.port, latency) as proxy:
+        terminal, _ = connect(proxy.port)
+        del terminal.add_output  # add_output du terminal : affichage par la boucle
+        size = 32 << 20
+        type_command(terminal, f'flood {size}')
+        peak = 0
+        start = time.monotonic()
+        while time.monotonic() - start < 3:
+            peak = max(peak, terminal.output_size)
+            time.sleep(0.01)
+        waiting = terminal.output_size
+        screen = terminal.screen
+        start = time.monotonic()
+        while 'fin' not in screen.lines:
+            LOOP.advance(terminal_module.FRAME_INTERVAL)
+            screen.render()
+            time.sleep(0.001)
+            if time.monotonic() - start > 60:
+                raise SystemExit('délai dépassé')
+        elapsed = time.monotonic() - start
+        print(f'réception  affichage arrêté 3 s : au plus {peak / 1e6:.1f} Mo en attente (limite '
+              f'{terminal_module.OUTPUT_BUFFER_LIMIT / 1e6:.1f} Mo), {waiting / 1e6:.1f} Mo à la fin ; '
+              f'{size / 1e6:.0f} Mo affichés {elapsed:5.2f} s après la reprise')
+        close(terminal)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.02, help='Latence ajoutée dans chaque sens (s)')
+    parser.add_argument('--outage', type=float, default=6, help='Durée de la panne (s)')
+    args = parser.parse_args()
+    shell = Shell()
+    with LocalSSHServer(shell) as server:
+        cut(server, shell, args.latency)
+        outage(server, args.latency, args.outage)
+        mute(server, args.latency)
+        sending(server, shell, args.latency)
+        receiving(server, args.latency)
+
+
+if __name__ == '__main__':
+    main()
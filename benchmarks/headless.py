@@ -0,0 +1,92 @@
+"""Modules `ui` et `console` de Pythonista réduits au minimum, pour charger le terminal hors iOS.
+
+Les widgets acceptent tous les attributs sans rien afficher ; `ui.delay`
+exécute la fonction depuis un minuteur, comme le ferait la boucle d'iOS
+sur le fil principal, ou bien la confie à une MainLoop à horloge fictive
+que la mesure fait avancer elle-même.
+
+Usage : import headless; headless.install(); import ssh_terminal_pythonista
+"""
+import heapq
+import itertools
+import os
+import sys
+import threading
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Widget:
+    """Vue inerte : garde les attributs qu'on lui donne et ses sous-vues."""
+
+    def __init__(self, *args, parent=None, **attrs):
+        self.subviews = []
+        self.frame = (0, 0, 0, 0)
+        self.text = ''
+        self.content_size = (0, 0)
+        self.content_offset = (0, 0)
+        self.__dict__.update(attrs)
+        if parent is not None:
+            parent.add_subview(self)
+
+    def add_subview(self, view):
+        self.subviews.append(view)
+
+    def present(self, *args, **kwargs):
+        pass
+
+
+def delay(func, seconds):
+    timer = threading.Timer(seconds, func)
+    timer.daemon = True
+    timer.start()
+
+
+class MainLoop:
+    """Fil principal simulé : les fonctions passées à ui.delay attendent `advance`."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.queue = []
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+
+    def delay(self, func, seconds):
+        with self.lock:
+            heapq.heappush(self.queue, (self.now + seconds, next(self.seq), func))
+
+    def advance(self, seconds):
+        """Avancer l'horloge et exécuter ce qui est dû ; renvoie le nombre d'appels."""
+        self.now += seconds
+        calls = 0
+        while True:
+            with self.lock:
+                if not self.queue or self.queue[0][0] > self.now:
+                    return calls
+                _, _, func = heapq.heappop(self.queue)
+            func()
+            calls += 1
+
+
+def install(loop=None):
+    """Enregistrer `ui` et `console` de remplacement s'ils manquent, et rendre le dépôt importable.
+
+    Avec `loop` (MainLoop), ui.delay passe par elle plutôt que par des minuteurs.
+    """
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    ui = sys.modules.get('ui')
+    if ui is None:
+        ui = types.ModuleType('ui')
+        for name in ('View', 'Label', 'TextField', 'TextView', 'Button', 'ScrollView'):
+            setattr(ui, name, type(name, (Widget,), {}))
+        ui.headless = True
+        sys.modules['ui'] = ui
+    if getattr(ui, 'headless', False):
+        ui.delay = delay if loop is None else loop.delay
+    if 'console' not in sys.modules:
+        console = types.ModuleType('console')
+        console.alert = lambda *args, **kwargs: 1
+        sys.modules['console'] = console
+    return ui
@@ -0,0 +1,142 @@
+"""Historique persistant des commandes (CommandHistory) : coût d'ajout, chargement et latence des recherches.
+
+Historique synthétique d'un hôte : --commands commandes distinctes,
+utilisées --uses fois en tout selon une loi de Zipf (quelques commandes
+très fréquentes, une longue traîne), sur 90 jours. Mesures : ajout d'une
+utilisation (fichier compris), taille du fichier et rechargement, puis
+recherches par préfixe et floues (reverse-i-search) sur --queries
+requêtes tirées des commandes. Quelques résultats sont comparés à une
+recherche naïve. --legacy mesure aussi l'ancienne liste en mémoire
+(`if command not in self.command_history`) à la même taille.
+
+Usage : python benchmarks/history.py [--commands 50000] [--uses 200000] [--queries 300] [--legacy]
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+
+import headless
+
+headless.install()
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+VERBS = ('git', 'docker', 'sudo systemctl', 'ls', 'cd', 'tail -f', 'grep -rn', 'python3', 'vcgencmd', 'journalctl -u',
+         'ssh', 'scp', 'kubectl', 'make', 'cat', 'htop', 'df -h', 'free -m', 'apt', 'pip install')
+WORDS = ('status', 'restart', 'logs', 'nginx', 'sshd', 'pihole', 'measure_temp', '/var/log/syslog', 'build', 'main',
+         'origin', 'deploy', 'config.txt', '--since', 'today', 'node', 'get', 'pods', 'update', 'requirements.txt')
+
+
+def corpus(rng, count):
+    commands = set()
+    while len(commands) < count:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(0, 4))]
+        if rng.random() < 0.3:
+            words.append(f'{rng.randint(1, 99999)}')
+        commands.add(' '.join([rng.choice(VERBS)] + words))
+    commands = sorted(commands)
+    rng.shuffle(commands)
+    return commands
+
+
+def uses(rng, commands, count, now):
+    """(commande, date) triés par date ; la k-ième commande est tirée avec un poids 1/k."""
+    weights = list(itertools.accumulate(1 / k for k in range(1, len(commands) + 1)))
+    # Chaque commande au moins une fois, le reste selon Zipf
+    picks = commands + rng.choices(commands, cum_weights=weights, k=max(0, count - len(commands)))
+    dates = sorted(now - rng.random() * 90 * 86400 for _ in picks)
+    rng.shuffle(picks)
+    return list(zip(picks, dates))
+
+
+def latencies(func, queries):
+    delays = []
+    for query in queries:
+        start = time.perf_counter()
+        func(query)
+        delays.append((time.perf_counter() - start) * 1000)
+    delays.sort()
+    return (f'médiane={statistics.median(delays):6.2f} ms  p95={delays[int(len(delays) * 0.95) - 1]:6.2f} ms  '
+            f'max={delays[-1]:6.2f} ms')
+
+
+def check(history, prefixes, fuzzy, now):
+    """Préfixe et recherche floue contre un parcours naïf de toutes les commandes."""
+    for query in prefixes:
+        best = max((history.score(cmd, now), history.entries[cmd][1]) for cmd in history.entries
+                   if cmd.startswith(query))
+        found = history.prefix(query, 1, now)[0]
+        assert (history.score(found, now), history.entries[found][1]) == best, query
+    for query in fuzzy:
+        pattern = re.compile('.*?'.join(map(re.escape, query)), re.IGNORECASE)
+        naive = sum(1 for cmd in history.entries if pattern.search(cmd))
+        assert len(history.search(query.lower(), len(history), now)) == naive, query
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--commands', type=int, default=50000, help='Commandes distinctes')
+    parser.add_argument('--uses', type=int, default=200000, help='Utilisations en tout')
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--legacy', action='store_true', help="Mesurer aussi l'ancienne liste")
+    args = parser.parse_args()
+    rng = random.Random(0)
+    now = time.time()
+    commands = corpus(rng, args.commands)
+    history_uses = uses(rng, commands, args.uses, now)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'pi@raspberrypi.local.jsonl')
+        history = terminal_module.CommandHistory(path)
+        start = time.perf_counter()
+        for command, date in history_uses:
+            history.add(command, date)
+        elapsed = time.perf_counter() - start
+        print(f'ajout          {elapsed / len(history_uses) * 1e6:6.1f} µs/utilisation  '
+              f'({len(history_uses)} utilisations, {len(history)} commandes distinctes)')
+        history.compact()
+        print(f'fichier        {os.path.getsize(path) / 1e6:6.2f} Mo compacté '
+              f'({os.path.getsize(path) / len(history):.0f} octets/commande)')
+        start = time.perf_counter()
+        reloaded = terminal_module.CommandHistory(path)
+        elapsed = time.perf_counter() - start
+        assert reloaded.entries == history.entries
+        print(f'chargement     {elapsed * 1000:6.1f} ms')
+
+        # Requêtes : début de commande (préfixe), caractères pris dans l'ordre (floue)
+        sample = [rng.choice(commands) for _ in range(args.queries)]
+        prefixes = [command[:rng.randint(1, 8)] for command in sample]
+        fuzzy = []
+        for command in sample:
+            picks = sorted(rng.sample(range(len(command)), min(len(command), rng.randint(2, 6))))
+            fuzzy.append(''.join(command[k] for k in picks).lower())
+        check(reloaded, prefixes[:20], fuzzy[:10], now)
+        print('vérifications  ok')
+        print(f'préfixe        {latencies(lambda query: reloaded.prefix(query, 10, now), prefixes)}')
+        print(f'floue          {latencies(lambda query: reloaded.search(query, 10, now), fuzzy)}')
+        # Première recherche après un ajout : index de recherche floue reconstruit
+        def after_add(query):
+            reloaded.add(rng.choice(commands), now)
+            reloaded.search(query, 10, now)
+        print(f'floue + ajout  {latencies(after_add, fuzzy[:50])}')
+        print(f'sans résultat  {latencies(lambda query: reloaded.search(query, 10, now), ["zqxw", "éèà", "Q9Z"])}')
+
+    if args.legacy:
+        # Ancienne liste, déjà remplie : dédoublonnage par parcours, en
+        # mémoire seulement, sans classement ni recherche
+        command_history = list(commands)
+        picks = [command for command, _ in history_uses[-2000:]]
+        start = time.perf_counter()
+        for command in picks:
+            if command not in command_history:
+                command_history.append(command)
+        elapsed = time.perf_counter() - start
+        print(f'ancienne liste {elapsed / len(picks) * 1e6:6.1f} µs/utilisation à {len(commands)} commandes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Mémoire occupée par 1M tâches : liste de dicts contre TaskList (tracemalloc).
+
+Échoue si le gain est inférieur à 3x.
+
+Usage : python benchmarks/memory.py [--size 1000000]
+"""
+import argparse
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_core as todo  # noqa: E402
+
+
+def traced(build):
+    tracemalloc.start()
+    data = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=int, default=1000000)
+    args = parser.parse_args()
+
+    def titles():
+        return (f'Tâche numéro {i} à traiter' for i in range(args.size))
+
+    def as_dicts():
+        return [{'id': i + 1, 'title': title, 'done': i % 3 == 0} for i, title in enumerate(titles())]
+
+    def as_task_list():
+        tasks = todo.TaskList()
+        for i, title in enumerate(titles()):
+            tasks.append(i + 1, title, i % 3 == 0)
+        return tasks
+
+    dicts = traced(as_dicts)
+    packed = traced(as_task_list)
+    ratio = dicts / packed
+    print(f'{args.size} tâches : dicts {dicts / 1e6:.1f} Mo, TaskList {packed / 1e6:.1f} Mo, gain {ratio:.1f}x')
+    if ratio < 3:
+        sys.exit('gain mémoire inférieur à 3x')
+
+
+if __name__ == '__main__':
+    main()
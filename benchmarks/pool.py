@@ -0,0 +1,91 @@
+"""Pool de connexions SSH : latence de reconnexion et nombre de poignées de main, contre un serveur paramiko local.
+
+Le terminal tourne sans iOS (headless.py). Reconnexion : --cycles fois,
+le terminal se connecte puis se déconnecte, avec le pool (connexion
+gardée) puis sans (idle_timeout nul : chaque connexion est neuve, comme
+avant le pool). Onglets : --tabs terminaux ouverts sur le même hôte.
+Coupure : le serveur ferme la connexion ; la reconnexion suivante doit en
+négocier une nouvelle.
+
+Usage : python benchmarks/pool.py [--cycles 50] [--tabs 8]
+"""
+import argparse
+import statistics
+import time
+
+import headless
+from sshlocal import LocalSSHServer
+
+headless.install()
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+
+def handler(channel, command):
+    """Shell muet : lit jusqu'à la fermeture du canal."""
+    while channel.recv(1024):
+        pass
+
+
+def connect(terminal, port):
+    messages = []
+    terminal.add_output = lambda text, raw=False: messages.append(text)
+    terminal.hostname, terminal.port = '127.0.0.1', port
+    terminal.username, terminal.password = 'pi', 'raspberry'
+    start = time.perf_counter()
+    terminal._connect_thread(terminal._begin_session())
+    elapsed = time.perf_counter() - start
+    if not terminal.connected:
+        raise SystemExit(''.join(messages))
+    return elapsed
+
+
+def reconnects(server, pool, cycles):
+    terminal = terminal_module.SSHTerminal(pool=pool)
+    before = server.handshakes
+    delays = []
+    for _ in range(cycles):
+        delays.append(connect(terminal, server.port))
+        terminal.disconnect_ssh()
+    pool.close()
+    return statistics.median(delays) * 1000, max(delays) * 1000, server.handshakes - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=50)
+    parser.add_argument('--tabs', type=int, default=8)
+    args = parser.parse_args()
+    with LocalSSHServer(handler) as server:
+        for name, pool in (('pool', terminal_module.SSHConnectionPool()),
+                           ('sans pool', terminal_module.SSHConnectionPool(idle_timeout=0))):
+            median, worst, handshakes = reconnects(server, pool, args.cycles)
+            print(f'{name:10} reconnexion : médiane={median:7.2f} ms  max={worst:7.2f} ms  '
+                  f'{handshakes} poignées de main pour {args.cycles} connexions')
+
+        pool = terminal_module.SSHConnectionPool()
+        before = server.handshakes
+        tabs = [terminal_module.SSHTerminal(pool=pool) for _ in range(args.tabs)]
+        delays = [connect(tab, server.port) for tab in tabs]
+        channels = sum(len(connection.channels) for connection in pool.connections.values())
+        print(f'onglets    {args.tabs} terminaux : {server.handshakes - before} poignée(s) de main, '
+              f'{channels} canaux ouverts, premier={delays[0] * 1000:.2f} ms  '
+              f'suivants={statistics.median(delays[1:]) * 1000:.2f} ms')
+        for tab in tabs:
+            tab.disconnect_ssh()
+
+        # Coupure côté serveur : le transport du pool meurt, la reconnexion en négocie un neuf.
+        before = server.handshakes
+        for transport in server.transports:
+            transport.close()
+        deadline = time.monotonic() + 5
+        while any(connection.active() for connection in pool.connections.values()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        terminal = terminal_module.SSHTerminal(pool=pool)
+        delay = connect(terminal, server.port)
+        print(f'coupure    reconnexion en {delay * 1000:.2f} ms, {server.handshakes - before} nouvelle poignée de main')
+        terminal.disconnect_ssh()
+        pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Affichage du terminal SSH : coût par bloc de sortie et mémoire, au fil de 100 Mo de sortie.
+
+Le terminal tourne sans iOS (headless.py) avec une boucle principale à
+horloge fictive : --per-frame blocs de sortie arrivent entre deux images
+de FRAME_INTERVAL. Le coût d'un bloc compte add_output et sa part des
+rendus ; il doit rester constant, quelle que soit la sortie déjà affichée.
+--legacy mesure aussi l'ancien add_output (texte de la vue réécrit en
+entier à chaque bloc), sur --legacy-megabytes.
+
+Usage : python benchmarks/scrollback.py [--megabytes 100] [--chunk 16384] [--per-frame 4] [--legacy]
+"""
+import argparse
+import random
+import time
+
+import headless
+from snapshot import peak_rss
+
+LOOP = headless.MainLoop()
+headless.install(LOOP)
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+WORDS = ('kernel:', 'systemd[1]:', 'Started', 'Session', 'usb', 'eth0:', 'link', 'up', 'température', '42°C',
+         'sshd[812]:', 'Accepted', 'password', 'for', 'pi', 'from', '192.168.1.10', 'port', '51234', '✓')
+
+
+def chunks(size, chunk_size, seed=0):
+    """Blocs de journal synthétique de `chunk_size` caractères, coupés n'importe où dans les lignes."""
+    rng = random.Random(seed)
+    lines = [' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 16))) + '\r\n' for _ in range(1000)]
+    text = ''.join(lines)
+    pos = 0
+    for _ in range(size // chunk_size):
+        end = pos + chunk_size
+        if end > len(text):
+            pos, end = 0, chunk_size
+        yield text[pos:end]
+        pos = end
+
+
+def legacy_add_output(terminal):
+    def add_output(text, raw=False):
+        view = terminal.terminal_view
+        view.text = view.text + text
+    return add_output
+
+
+def run(name, terminal, size, chunk_size, per_frame, checkpoints):
+    flushes = 0
+    original = terminal._flush_output
+
+    def flush():
+        nonlocal flushes
+        flushes += 1
+        original()
+    terminal._flush_output = flush
+    window, sent = [], 0
+    print(f'{name} :')
+    for n, chunk in enumerate(chunks(size, chunk_size), 1):
+        start = time.perf_counter()
+        terminal.add_output(chunk, raw=True)
+        if n % per_frame == 0:
+            LOOP.advance(terminal_module.FRAME_INTERVAL)
+        window.append(time.perf_counter() - start)
+        sent += len(chunk)
+        if checkpoints and sent >= checkpoints[0]:
+            checkpoints.pop(0)
+            print(f'  après {sent / 1e6:6.1f} Mo : {sum(window) / len(window) * 1e6:9.1f} µs/bloc  '
+                  f'vue={len(terminal.terminal_view.text) / 1e3:8.1f} Ko  RSS max={peak_rss() / 1024:6.1f} Mo')
+            window = []
+    LOOP.advance(terminal_module.FRAME_INTERVAL)
+    print(f'  {n} blocs' + (f', {flushes} rendus' if flushes else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, default=100)
+    parser.add_argument('--chunk', type=int, default=16384, help='Taille des blocs de sortie (caractères)')
+    parser.add_argument('--per-frame', type=int, default=4, help='Blocs reçus entre deux images')
+    parser.add_argument('--lines', type=int, default=terminal_module.SCROLLBACK_LINES, help='Lignes de scrollback')
+    parser.add_argument('--legacy', action='store_true', help="Mesurer aussi l'ancien add_output")
+    parser.add_argument('--legacy-megabytes', type=float, default=16)
+    args = parser.parse_args()
+
+    def checkpoints(size, marks):
+        # La dernière marque est la sortie réellement envoyée (blocs entiers).
+        return [mark for mark in marks if mark < size] + [size // args.chunk * args.chunk]
+
+    size = int(args.megabytes * 1e6)
+    terminal = terminal_module.SSHTerminal(scrollback_lines=args.lines)
+    run(f'scrollback de {args.lines} lignes', terminal, size, args.chunk, args.per_frame,
+        checkpoints(size, (1e6, 10e6, 25e6, 50e6, 75e6, 200e6, 500e6)))
+    if args.legacy:
+        size = int(args.legacy_megabytes * 1e6)
+        terminal = terminal_module.SSHTerminal()
+        terminal.add_output = legacy_add_output(terminal)
+        run('ancien add_output', terminal, size, args.chunk, args.per_frame, checkpoints(size, (1e6, 4e6, 8e6, 32e6)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Transferts SFTP (SFTPTransfers) contre get/put de paramiko : débit, fichiers multiples, mémoire et reprise.
+
+Le serveur est un LocalSFTPServer sur un dossier temporaire, joint
+directement puis à travers un FlakyProxy qui ajoute --latency secondes
+dans chaque sens (lien Wi-Fi ou distant). Mesures, pour chaque latence :
+un fichier de --megabytes Mo téléchargé puis envoyé, et --files fichiers
+de --file-kb Ko téléchargés, avec get/put de paramiko (un fichier à la
+fois, réglages par défaut) puis avec SFTPTransfers. Enfin, sans latence :
+pic d'allocations Python pendant un téléchargement (client et serveur
+sont dans ce processus), et reprise d'un téléchargement coupé à mi-chemin.
+Chaque fichier reçu est comparé à l'original.
+
+Usage : python benchmarks/sftp.py [--megabytes 64] [--files 100] [--file-kb 256] [--latency 0 0.01]
+"""
+import argparse
+import contextlib
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+
+import headless
+from sshlocal import FlakyProxy, LocalSFTPServer
+
+headless.install()
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+
+def digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def connect(port):
+    pool = terminal_module.SSHConnectionPool()
+    return pool, pool.get('127.0.0.1', port, 'pi', 'raspberry')
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def naive(client, jobs):
+    sftp = client.open_sftp()
+    for direction, source, destination in jobs:
+        if direction == 'get':
+            sftp.get(source, destination)
+        else:
+            sftp.put(source, destination)
+    sftp.close()
+
+
+def pipelined(client, jobs):
+    results = terminal_module.SFTPTransfers(client).run(jobs)
+    errors = [result.error for result in results if result.error]
+    if errors:
+        raise SystemExit(errors[0])
+
+
+def compare(name, volume, jobs, pairs, client):
+    """Débit de get/put puis de SFTPTransfers sur les mêmes transferts ; vérifie les fichiers reçus."""
+    rates = []
+    for method in (naive, pipelined):
+        for _, _, destination in jobs:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(destination)
+        elapsed = timed(lambda: method(client, jobs))
+        for original, received in pairs:
+            assert digest(original) == digest(received), received
+        rates.append(volume / elapsed / 1e6)
+    print(f'  {name:28} get/put={rates[0]:7.1f} Mo/s  SFTPTransfers={rates[1]:7.1f} Mo/s  ({rates[1] / rates[0]:4.1f}x)')
+
+
+def memory(client, remote, local, size):
+    peaks = []
+    for method in (naive, pipelined):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(local)
+        tracemalloc.start()
+        method(client, [('get', remote, local)])
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f'mémoire   téléchargement de {size / 1e6:.0f} Mo : pic get={peaks[0] / 1e6:.1f} Mo  '
+          f'SFTPTransfers={peaks[1] / 1e6:.1f} Mo  (borne depth × chunk = '
+          f'{terminal_module.SFTP_DEPTH * terminal_module.SFTP_CHUNK / 1e6:.1f} Mo)')
+
+
+def resume(server, remote_path, remote, local, size):
+    """Coupe la liaison au milieu du téléchargement, puis le relance sur une nouvelle connexion."""
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(local)
+    with FlakyProxy(server.port) as proxy:
+        pool, client = connect(proxy.port)
+
+        def on_progress(name, done, total):
+            if done >= total // 2:
+                proxy.drop()
+        first, = terminal_module.SFTPTransfers(client).run([('get', remote, local)], on_progress)
+        pool.close()
+    partial = os.path.getsize(local + terminal_module.PARTIAL_SUFFIX)
+    pool, client = connect(server.port)
+    second, = terminal_module.SFTPTransfers(client).run([('get', remote, local)])
+    pool.close()
+    assert second.error is None and digest(local) == digest(remote_path)
+    print(f'reprise   coupure à {partial / 1e6:.1f} Mo ({first.error}) ; reprise à {second.resumed / 1e6:.1f} Mo, '
+          f'{(size - second.resumed) / 1e6:.1f} Mo transférés ensuite, fichier identique')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, default=64)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--file-kb', type=int, default=256)
+    parser.add_argument('--latency', type=float, nargs='+', default=[0, 0.01], help='Latence dans chaque sens (s)')
+    args = parser.parse_args()
+    size = int(args.megabytes * 1e6)
+    small = args.file_kb << 10
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as local_dir:
+        # Côté serveur : le gros fichier et les petits ; côté client : l'original du gros
+        big = os.path.join(local_dir, 'original.bin')
+        with open(big, 'wb') as f:
+            f.write(os.urandom(size))
+        with open(os.path.join(root, 'big.bin'), 'wb') as f, open(big, 'rb') as source:
+            f.write(source.read())
+        for k in range(args.files):
+            with open(os.path.join(root, f'small{k}.bin'), 'wb') as f:
+                f.write(os.urandom(small))
+
+        with LocalSFTPServer(root) as server:
+            for latency in args.latency:
+                print(f'latence {latency * 1000:.0f} ms dans chaque sens :')
+                with FlakyProxy(server.port, latency) if latency else contextlib.nullcontext() as proxy:
+                    pool, client = connect(proxy.port if proxy else server.port)
+                    downloaded = os.path.join(local_dir, 'big.bin')
+                    compare(f'téléchargement {size / 1e6:.0f} Mo', size, [('get', 'big.bin', downloaded)],
+                            [(big, downloaded)], client)
+                    compare(f'envoi {size / 1e6:.0f} Mo', size, [('put', big, 'sent.bin')],
+                            [(big, os.path.join(root, 'sent.bin'))], client)
+                    jobs = [('get', f'small{k}.bin', os.path.join(local_dir, f'small{k}.bin'))
+                            for k in range(args.files)]
+                    pairs = [(os.path.join(root, source), destination) for _, source, destination in jobs]
+                    compare(f'{args.files} fichiers de {args.file_kb} Ko', args.files * small, jobs, pairs, client)
+                    pool.close()
+
+            pool, client = connect(server.port)
+            memory(client, 'big.bin', os.path.join(local_dir, 'big.bin'), size)
+            pool.close()
+            resume(server, os.path.join(root, 'big.bin'), 'big.bin', os.path.join(local_dir, 'resumed.bin'), size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Snapshot JSON contre snapshot binaire : taille, temps de chargement et RSS.
+
+Chaque chargement est mesuré dans un processus neuf pour que le pic de
+mémoire (ru_maxrss) ne mélange pas les deux formats.
+
+Usage : python benchmarks/snapshot.py [--sizes 100000 1000000]
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_core as todo  # noqa: E402
+
+CODECS = {'json': todo.JsonSnapshot, 'binary': todo.BinarySnapshot}
+
+
+def child(codec, path, action):
+    """Mesure dans le processus courant ; affiche « secondes rss_ko »."""
+    start = time.perf_counter()
+    with open(path, 'rb') as f:
+        if action == 'load':
+            CODECS[codec].load(f)
+        elif codec == 'binary':
+            snapshot = todo.BinarySnapshot(f)
+            snapshot.count, snapshot.done_count()
+        else:
+            tasks = todo.JsonSnapshot.load(f)
+            len(tasks), sum(task['done'] for task in tasks)
+    elapsed = time.perf_counter() - start
+    print(elapsed, peak_rss())
+
+
+def peak_rss():
+    """Pic de mémoire résidente en Ko.
+
+    Sous Linux, ru_maxrss hérite du pic du processus parent à travers exec :
+    VmHWM, propre au processus, est utilisé quand il est disponible.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss  # octets sur macOS
+
+
+def measure(codec, path, action):
+    output = subprocess.check_output([sys.executable, __file__, '--child', codec, path, action])
+    elapsed, rss = output.split()
+    return float(elapsed), int(rss)
+
+
+def run(size):
+    tasks = [{'id': i + 1, 'title': f'Tâche numéro {i} à traiter', 'done': i % 3 == 0}
+             for i in range(size)]
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f'{size} tâches')
+        for name, codec in CODECS.items():
+            path = os.path.join(tmp, f'tasks.{name}')
+            start = time.perf_counter()
+            codec.save(tasks, path)
+            dump = time.perf_counter() - start
+            load, load_rss = measure(name, path, 'load')
+            count, count_rss = measure(name, path, 'count')
+            print(f'  {name:7} taille={os.path.getsize(path) / 1e6:7.1f} Mo  écriture={dump * 1000:7.0f} ms  '
+                  f'chargement={load * 1000:7.0f} ms (RSS {load_rss / 1024:.0f} Mo)  '
+                  f'compteurs={count * 1000:7.1f} ms (RSS {count_rss / 1024:.0f} Mo)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--child', nargs=3, metavar=('CODEC', 'PATH', 'ACTION'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+    for size in args.sizes:
+        run(size)
+
+
+if __name__ == '__main__':
+    main()
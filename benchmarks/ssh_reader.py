@@ -0,0 +1,167 @@
+"""Lecteur de sortie de SSHTerminal : débit (Mo/s) et latence d'écho, contre un serveur paramiko local.
+
+Le terminal tourne sans iOS (modules `ui` de remplacement, voir headless.py)
+et se connecte en vrai, via invoke_shell, à un serveur SSH sur 127.0.0.1.
+Débit : le serveur envoie --megabytes de texte UTF-8 où des caractères
+multi-octets tombent à cheval sur les paquets ; le texte reçu doit être
+identique. Latence : un caractère envoyé, le temps jusqu'à son écho affiché.
+--legacy mesure aussi l'ancien lecteur (recv de 1 Ko puis 0,1 s d'attente).
+
+Usage : python benchmarks/ssh_reader.py [--megabytes 64] [--echoes 200] [--legacy]
+"""
+import argparse
+import statistics
+import threading
+import time
+import types
+
+import headless
+from sshlocal import LocalSSHServer
+
+headless.install()
+import ssh_terminal_pythonista as terminal_module  # noqa: E402
+
+LINE = 'journalctl: déploiement réussi — température 42 °C ✓ 😀\n'
+
+
+def handler(channel, command):
+    """Shell de test : `flood <octets>` envoie du texte, `echo` renvoie chaque octet reçu."""
+    request = b''
+    while not request.endswith(b'\n'):
+        data = channel.recv(1024)
+        if not data:
+            return
+        request += data
+    verb, _, arg = request.decode().strip().partition(' ')
+    if verb == 'flood':
+        payload = flood_text(int(arg)).encode('utf-8')
+        # Paquets de taille impaire : des caractères multi-octets sont coupés.
+        for pos in range(0, len(payload), 32767):
+            channel.sendall(payload[pos:pos + 32767])
+        while channel.recv(1024):
+            pass
+    else:
+        while True:
+            data = channel.recv(1024)
+            if not data:
+                return
+            channel.sendall(data)
+
+
+def flood_text(size):
+    line = LINE.encode('utf-8')
+    return LINE * (size // len(line) + 1)
+
+
+def legacy_read(self):
+    """Lecteur d'origine, pour comparaison."""
+    while self.connected and self.ssh_channel:
+        try:
+            if self.ssh_channel.recv_ready():
+                data = self.ssh_channel.recv(1024).decode('utf-8', errors='ignore')
+                if data:
+                    self.add_output(data)
+            time.sleep(0.1)
+        except Exception:
+            break
+
+
+class Collector:
+    """Remplace add_output : accumule le texte et signale quand `expected` caractères sont arrivés."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.expected = None
+        self.last = None
+        self.done = threading.Event()
+        self.lock = threading.Lock()
+
+    def reset(self, expected):
+        with self.lock:
+            self.chunks, self.size, self.expected = [], 0, expected
+            self.done.clear()
+
+    def __call__(self, text, raw=False):
+        with self.lock:
+            if self.expected is None:
+                return
+            self.chunks.append(text)
+            self.size += len(text)
+            self.last = time.perf_counter()
+            if self.size >= self.expected:
+                self.done.set()
+
+
+def connect(port, legacy):
+    terminal = terminal_module.SSHTerminal()
+    collector = Collector()
+    messages = []
+    terminal.add_output = lambda text, raw=False: messages.append(text)
+    if legacy:
+        terminal._read_ssh_output = types.MethodType(legacy_read, terminal)
+    terminal.hostname, terminal.port = '127.0.0.1', port
+    terminal.username, terminal.password = 'pi', 'raspberry'
+    terminal._connect_thread(terminal._begin_session())
+    if not terminal.connected:
+        raise SystemExit(''.join(messages))
+    terminal.add_output = collector
+    return terminal, collector
+
+
+def throughput(port, size, legacy):
+    terminal, collector = connect(port, legacy)
+    text = flood_text(size)
+    collector.reset(len(text))
+    start = time.perf_counter()
+    terminal.ssh_channel.send('flood %d\n' % size)
+    # Un lecteur qui perd des caractères n'atteint jamais la taille attendue :
+    # la mesure s'arrête alors après 2 s sans rien recevoir.
+    while not collector.done.wait(0.5):
+        if collector.last is not None and time.perf_counter() - collector.last > 2:
+            break
+    elapsed = collector.last - start
+    intact = ''.join(collector.chunks) == text
+    terminal.disconnect_ssh = lambda: None
+    terminal.supervised = terminal.connected = False
+    terminal.ssh_client.close()
+    return len(text.encode('utf-8')) / elapsed / 1e6, intact, len(collector.chunks)
+
+
+def echo_latency(port, count, legacy):
+    terminal, collector = connect(port, legacy)
+    terminal.ssh_channel.send('echo\n')
+    delays = []
+    for k in range(count):
+        collector.reset(1)
+        start = time.perf_counter()
+        terminal.ssh_channel.send('abcdefghij'[k % 10])
+        if not collector.done.wait(10):
+            raise SystemExit('écho perdu')
+        delays.append(time.perf_counter() - start)
+    terminal.supervised = terminal.connected = False
+    terminal.ssh_client.close()
+    delays.sort()
+    return statistics.median(delays) * 1000, delays[int(len(delays) * 0.95) - 1] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, default=64)
+    parser.add_argument('--echoes', type=int, default=200)
+    parser.add_argument('--legacy', action='store_true',
+                        help="Mesurer aussi l'ancien lecteur (sur 64 Ko et 20 échos : il plafonne à ~10 Ko/s)")
+    args = parser.parse_args()
+    readers = [('select', False)] + ([('ancien', True)] if args.legacy else [])
+    with LocalSSHServer(handler) as server:
+        for name, legacy in readers:
+            size = 64 * 1024 if legacy else int(args.megabytes * 1e6)
+            echoes = 20 if legacy else args.echoes
+            rate, intact, calls = throughput(server.port, size, legacy)
+            median, p95 = echo_latency(server.port, echoes, legacy)
+            print(f'{name:7} débit={rate:8.2f} Mo/s sur {size / 1e6:.1f} Mo ({calls} appels à add_output, '
+                  f"texte {'intact' if intact else 'ALTÉRÉ'})  écho: médiane={median:6.2f} ms  p95={p95:6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""Serveur SSH local (paramiko) pour les mesures du terminal, sans Raspberry Pi.
+
+Tout mot de passe est accepté. Chaque shell ou commande ouvre un canal
+confié à `handler(channel, command)` dans son propre thread (`command` vaut
+None pour un shell) ; le serveur compte les poignées de main SSH.
+LocalSFTPServer sert en plus le sous-système SFTP sur un dossier local, et
+FlakyProxy relaie la connexion avec de la latence et des coupures.
+
+Usage :
+    with LocalSSHServer(handler) as server:
+        client.connect('127.0.0.1', server.port, username='pi', password='x')
+"""
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+
+import paramiko
+
+_HOST_KEY = None
+# Les transports du serveur journalisent à part : une connexion coupée par
+# le client n'est pas une erreur de la mesure.
+LOG_CHANNEL = 'sshlocal.transport'
+logging.getLogger(LOG_CHANNEL).setLevel(logging.CRITICAL)
+REPLY_DELAY = 0.005
+
+
+def host_key():
+    """Clé d'hôte RSA, générée une fois par processus."""
+    global _HOST_KEY
+    if _HOST_KEY is None:
+        _HOST_KEY = paramiko.RSAKey.generate(2048)
+    return _HOST_KEY
+
+
+class _Interface(paramiko.ServerInterface):
+    def __init__(self, server):
+        self.server = server
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, channel, term, width, height, pixelwidth, pixelheight, modes):
+        self.server.pty_sizes.append((width, height))
+        return True
+
+    def check_channel_window_change_request(self, channel, width, height, pixelwidth, pixelheight):
+        self.server.pty_sizes.append((width, height))
+        return True
+
+    def check_global_request(self, kind, msg):
+        # keepalive@openssh.com et consorts
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.server.start(channel, None)
+        return True
+
+    def check_channel_exec_request(self, channel, command):
+        self.server.start(channel, command.decode('utf-8'))
+        return True
+
+
+class LocalSSHServer:
+    """Serveur SSH sur 127.0.0.1, port choisi par le système."""
+
+    def __init__(self, handler, host='127.0.0.1', port=0):
+        self.handler = handler
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(256)
+        self.host, self.port = self.sock.getsockname()
+        self.transports = []
+        self.handshakes = 0
+        self.pty_sizes = []
+        self.closed = False
+
+    def __enter__(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        transport = paramiko.Transport(conn)
+        transport.set_log_channel(LOG_CHANNEL)
+        transport.add_server_key(host_key())
+        self.setup_transport(transport)
+        try:
+            transport.start_server(server=_Interface(self))
+        except (paramiko.SSHException, EOFError, OSError):
+            return
+        self.handshakes += 1
+        self.transports.append(transport)
+        # Les canaux sont servis par `start` ; le transport ne les référence que
+        # faiblement, il faut les garder pour qu'ils ne soient pas fermés.
+        channels = []
+        while transport.is_active() and not self.closed:
+            channel = transport.accept(0.5)
+            if channel is not None:
+                channels = [c for c in channels if not c.closed] + [channel]
+
+    def setup_transport(self, transport):
+        """Point d'extension (sous-système SFTP...) avant la négociation."""
+
+    def start(self, channel, command):
+        def run():
+            # La réponse à la requête exec part après le retour de
+            # check_channel_exec_request : une commande qui se ferme aussitôt
+            # ne doit pas la devancer (le client verrait « Channel closed »).
+            if command is not None:
+                time.sleep(REPLY_DELAY)
+            try:
+                self.handler(channel, command)
+            except (OSError, EOFError, paramiko.SSHException):
+                pass
+            finally:
+                channel.close()
+        threading.Thread(target=run, daemon=True).start()
+
+    def close(self):
+        self.closed = True
+        self.sock.close()
+        for transport in self.transports:
+            transport.close()
+
+
+class _SFTPHandle(paramiko.SFTPHandle):
+    def stat(self):
+        f = getattr(self, 'readfile', None) or self.writefile
+        return paramiko.SFTPAttributes.from_stat(os.fstat(f.fileno()))
+
+
+class _SFTPInterface(paramiko.SFTPServerInterface):
+    """Sous-système SFTP sur le dossier `root` du serveur (chemins distants relatifs à root)."""
+
+    def __init__(self, server, root, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = root
+
+    def _path(self, path):
+        return os.path.join(self.root, path.lstrip('/'))
+
+    @staticmethod
+    def _errno(func, *args):
+        try:
+            return func(*args)
+        except OSError as e:
+            return paramiko.SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        def opened():
+            fd = os.open(self._path(path), flags, 0o644)
+            mode = {os.O_RDONLY: 'rb', os.O_WRONLY: 'wb', os.O_RDWR: 'r+b'}[flags & 3]
+            if flags & os.O_APPEND:
+                mode = 'ab' if mode == 'wb' else 'a+b'
+            handle = _SFTPHandle(flags)
+            f = os.fdopen(fd, mode)
+            if flags & 3 != os.O_WRONLY:
+                handle.readfile = f
+            if flags & 3 != os.O_RDONLY:
+                handle.writefile = f
+            return handle
+        return self._errno(opened)
+
+    def stat(self, path):
+        return self._errno(lambda: paramiko.SFTPAttributes.from_stat(os.stat(self._path(path))))
+
+    lstat = stat
+
+    def list_folder(self, path):
+        def listing():
+            folder = self._path(path)
+            return [paramiko.SFTPAttributes.from_stat(os.stat(os.path.join(folder, name)), name)
+                    for name in os.listdir(folder)]
+        return self._errno(listing)
+
+    def remove(self, path):
+        return self._errno(lambda: os.remove(self._path(path)) or paramiko.SFTP_OK)
+
+    def rename(self, oldpath, newpath):
+        if os.path.exists(self._path(newpath)):
+            return paramiko.SFTP_FAILURE
+        return self.posix_rename(oldpath, newpath)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._errno(lambda: os.replace(self._path(oldpath), self._path(newpath)) or paramiko.SFTP_OK)
+
+    def mkdir(self, path, attr):
+        return self._errno(lambda: os.mkdir(self._path(path)) or paramiko.SFTP_OK)
+
+    def canonicalize(self, path):
+        return '/' + path.strip('/')
+
+
+class LocalSFTPServer(LocalSSHServer):
+    """Serveur SSH local dont le sous-système SFTP sert le dossier `root`."""
+
+    def __init__(self, root, handler=None, **kwargs):
+        super().__init__(handler, **kwargs)
+        self.root = root
+
+    def setup_transport(self, transport):
+        transport.set_subsystem_handler('sftp', paramiko.SFTPServer, _SFTPInterface, self.root)
+
+
+class FlakyProxy:
+    """Relais TCP 127.0.0.1 -> port cible, avec latence, coupures, refus et liaisons muettes."""
+
+    def __init__(self, target_port, latency=0.0):
+        self.target_port = target_port
+        self.latency = latency
+        self.sock = socket.socket()
+        self.sock.bind(('127.0.0.1', 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        self.sockets = []
+        self.refusing = False
+        self.muted = set()
+        self.closed = False
+
+    def __enter__(self):
+        threading.Thread(target=self._accept, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+        self.sock.close()
+        self.drop()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            if self.refusing:
+                self._reset(client)
+                continue
+            server = socket.create_connection(('127.0.0.1', self.target_port))
+            self.sockets += [client, server]
+            for src, dst in ((client, server), (server, client)):
+                pending = queue.Queue()
+                threading.Thread(target=self._read, args=(src, pending), daemon=True).start()
+                threading.Thread(target=self._write, args=(dst, pending), daemon=True).start()
+
+    def _read(self, src, pending):
+        while True:
+            try:
+                data = src.recv(65536)
+            except OSError:
+                data = b''
+            if src not in self.muted or not data:
+                pending.put((time.monotonic() + self.latency, data))
+            if not data:
+                return
+
+    def _write(self, dst, pending):
+        while True:
+            due, data = pending.get()
+            time.sleep(max(0, due - time.monotonic()))
+            try:
+                if not data:
+                    dst.shutdown(socket.SHUT_WR)
+                    return
+                dst.sendall(data)
+            except OSError:
+                return
+
+    @staticmethod
+    def _reset(sock):
+        # Fermeture brutale (RST) ; shutdown débloque d'abord le thread qui
+        # attend dans recv, sans quoi close ne libère pas la socket
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def mute(self):
+        """Avaler sans rien couper tout ce qui passe par les liaisons en cours
+        (les nouvelles passent, comme après un changement de point d'accès)."""
+        self.muted = set(self.sockets)
+
+    def drop(self):
+        sockets, self.sockets = self.sockets, []
+        for sock in sockets:
+            self._reset(sock)
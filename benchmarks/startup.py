@@ -0,0 +1,98 @@
+"""Latence de démarrage à froid de todo.py pour list, add et done, comparée à la version de départ.
+
+Chaque commande est lancée comme un utilisateur le ferait (`python todo.py
+list`) dans un interpréteur neuf, compilation comprise : le tout premier appel
+(un add) part d'une copie sans `__pycache__`, les suivants (médiane de
+--runs) profitent du bytecode mis en cache pour `todo_core`. Le script de départ
+(premier commit du dépôt, ou --baseline) est mesuré de la même façon,
+dans son propre dossier de données. Le temps passé dans les imports vient
+de `python -X importtime`, mesuré à part pour ne pas gonfler le total.
+PYTHONDONTWRITEBYTECODE est retiré de l'environnement des commandes : le
+cache de bytecode fait partie de ce qui est mesuré.
+
+Usage : python benchmarks/startup.py [--runs 20] [--baseline ancien_todo.py]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV = {key: value for key, value in os.environ.items() if key != 'PYTHONDONTWRITEBYTECODE'}
+
+
+def run(argv, cwd, importtime=False):
+    """Durée de la commande, ou temps passé dans les imports avec `importtime`."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable] + (['-X', 'importtime'] if importtime else []) + argv, cwd=cwd,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True, env=ENV)
+    elapsed = time.perf_counter() - start
+    if not importtime:
+        return elapsed
+    # Lignes « import time: self | cumulative | module » ; la somme des self donne le total.
+    return sum(int(line.split('|')[0].split(':')[1]) for line in proc.stderr.splitlines()
+               if line.startswith('import time:') and line.split('|')[0].split(':')[1].strip().isdigit()) / 1e6
+
+
+def baseline_source(path):
+    """Source du script de départ : `path`, sinon todo.py du premier commit (None hors dépôt git)."""
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+    try:
+        root = subprocess.run(['git', 'rev-list', '--max-parents=0', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.split()[-1]
+        return subprocess.run(['git', 'show', f'{root}:todo.py'], cwd=ROOT, capture_output=True,
+                              check=True).stdout
+    except (OSError, subprocess.CalledProcessError, IndexError):
+        return None
+
+
+def measure(name, script, data, runs):
+    commands = {
+        'list': [script, 'list'],
+        'add': [script, 'add', 'tâche de mesure'],
+        'done': [script, 'done', '1'],
+    }
+    first = run([script, 'add', 'première tâche'], data)
+    print(f'{"1er":5} {name:8} {first * 1000:6.1f} ms')
+    for command, argv in commands.items():
+        total = statistics.median(run(argv, data) for _ in range(runs))
+        imports = statistics.median(run(argv, data, importtime=True) for _ in range(max(1, runs // 4)))
+        print(f'{command:5} {name:8} {total * 1000:6.1f} ms  imports={imports * 1000:6.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--baseline', help='Script de référence (par défaut : todo.py du premier commit)')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        empty = statistics.median(run(['-c', 'pass'], tmp) for _ in range(args.runs))
+        print(f'{"vide":14} {empty * 1000:6.1f} ms  (python -c pass)')
+        # Copies fraîches : le premier appel compile comme après une installation
+        variants = []
+        current = os.path.join(tmp, 'actuel')
+        os.mkdir(current)
+        for name in ('todo.py', 'todo_core.py'):
+            shutil.copy(os.path.join(ROOT, name), current)
+        variants.append(('actuel', os.path.join(current, 'todo.py')))
+        source = baseline_source(args.baseline)
+        if source is not None:
+            os.mkdir(os.path.join(tmp, 'départ'))
+            script = os.path.join(tmp, 'départ', 'todo.py')
+            with open(script, 'wb') as f:
+                f.write(source)
+            variants.insert(0, ('départ', script))
+        for name, script in variants:
+            data = os.path.join(tmp, f'données-{name}')
+            os.mkdir(data)
+            measure(name, script, data, args.runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""Suite de mesures de todo.py : chargement, sauvegarde, list, add, done et remove.
+
+Pour chaque taille et chaque distribution de longueur des titres, un jeu
+de tâches synthétique est généré puis chaque opération est lancée dans un
+moteur (--backends) tel que la ligne de commande l'utilise : `load` ouvre
+le moteur et charge toutes ses tâches, `save` réécrit tout son état
+persistant (compaction du snapshot, de l'index et du cache ; VACUUM pour
+SQLite). Chaque opération est lancée dans un
+processus neuf : premier appel (à froid), puis médiane de --repeat appels
+(à chaud), pic de RSS et octets écrits. Les résultats sont écrits en JSON
+(--output) ; --compare confronte deux de ces fichiers, par exemple ceux de
+deux versions, et échoue si une mesure se dégrade au-delà de --threshold.
+
+Distributions de longueur : fixed:N, uniform:MIN:MAX, lognormal:MU:SIGMA.
+
+Usage : python benchmarks/suite.py [--sizes 1000 10000 100000] [--titles uniform:10:80]
+                                   [--backends journal] [--output bench.json]
+        python benchmarks/suite.py --compare avant.json après.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import todo_core as todo  # noqa: E402
+from snapshot import peak_rss  # noqa: E402
+
+OPERATIONS = ('load', 'save', 'list', 'add', 'done', 'remove')
+# En dessous, un écart de temps relève du bruit de mesure et n'est pas signalé.
+NOISE_MS = 1.0
+WORDS = ('réunion', 'rapport', 'courses', 'appeler', 'déploiement', 'facture', 'revue', 'été',
+         'serveur', 'prod', 'écrire', 'tests', 'client', 'budget', 'planning', 'ménage')
+
+
+def title_lengths(spec, rng):
+    """Générateur de longueurs de titre selon `spec` (voir l'aide du module)."""
+    kind, *params = spec.split(':')
+    if kind == 'fixed':
+        length = int(params[0])
+        return lambda: length
+    if kind == 'uniform':
+        low, high = map(int, params)
+        return lambda: rng.randint(low, high)
+    if kind == 'lognormal':
+        mu, sigma = map(float, params)
+        return lambda: max(1, round(rng.lognormvariate(mu, sigma)))
+    raise ValueError(f'distribution inconnue: {spec}')
+
+
+def generate(size, spec, done_ratio, seed=0):
+    rng = random.Random(seed)
+    length = title_lengths(spec, rng)
+    tasks = []
+    for i in range(size):
+        n = length()
+        words = []
+        while sum(map(len, words)) + len(words) < n:
+            words.append(rng.choice(WORDS))
+        tasks.append({'id': i + 1, 'title': ' '.join(words)[:n], 'done': rng.random() < done_ratio})
+    return tasks
+
+
+def seed_store(workdir, backend, tasks):
+    """Données initiales du moteur ; la migration (ids, index) reste hors des mesures."""
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        todo.save_tasks(tasks, todo.TASKS_FILE)
+        todo.JournalStore().compact()
+        if backend == 'binary':
+            todo.BinarySnapshot.save(tasks, todo.BINARY_FILE)
+            todo.JournalStore(todo.BINARY_FILE, todo.BinarySnapshot).compact()
+        elif backend == 'sqlite':
+            todo.SqliteStore().conn.close()
+    finally:
+        os.chdir(cwd)
+
+
+def operation(name, backend, size):
+    """Fonction de l'itération k, qui exécute `name` comme le ferait la ligne de commande."""
+    def args(**params):
+        return SimpleNamespace(store=todo.STORES[backend](), **params)
+
+    if name == 'load':
+        return lambda k: todo.STORES[backend]().load()
+    if name == 'save':
+        return lambda k: todo.STORES[backend]().compact()
+    if name == 'list':
+        return lambda k: todo.list_tasks(args(**todo.LIST_DEFAULTS))
+    if name == 'add':
+        return lambda k: todo.add_task(args(title=f'tâche de mesure {k}', **todo.ADD_DEFAULTS))
+    if name == 'done':
+        # Une tâche différente à chaque itération, pour ne pas mesurer un no-op.
+        return lambda k: todo.mark_done(args(index=size // 2 + k, by_id=False))
+    return lambda k: todo.remove_task(args(index=size // 2, by_id=False))
+
+
+def written_bytes():
+    """Octets passés à write(2) par le processus, ou None hors Linux."""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def child(name, workdir, backend, size, repeat):
+    """Mesure dans le processus courant ; affiche une ligne JSON."""
+    os.chdir(workdir)
+    run = operation(name, backend, size)
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        before = written_bytes()
+        start = time.perf_counter()
+        run(0)
+        cold = time.perf_counter() - start
+        written = None if before is None else written_bytes() - before
+        warm = []
+        for k in range(1, repeat + 1):
+            start = time.perf_counter()
+            run(k)
+            warm.append(time.perf_counter() - start)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print(json.dumps({'cold_ms': cold * 1000, 'warm_ms': statistics.median(warm) * 1000 if warm else None,
+                      'peak_rss_kb': peak_rss(), 'bytes_written': written}))
+
+
+def measure(name, workdir, backend, size, repeat):
+    output = subprocess.check_output([sys.executable, __file__, '--child', name, workdir, backend,
+                                      str(size), str(repeat)])
+    return json.loads(output)
+
+
+def version():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    results = []
+    for size in args.sizes:
+        for spec in args.titles:
+            tasks = generate(size, spec, args.done_ratio)
+            for backend in args.backends:
+                print(f'{size} tâches, titres {spec}, moteur {backend}')
+                with tempfile.TemporaryDirectory() as tmp:
+                    seed_store(tmp, backend, tasks)
+                    for name in args.operations:
+                        result = measure(name, tmp, backend, size, args.repeat)
+                        warm = f"{result['warm_ms']:9.2f}" if result['warm_ms'] is not None else '        -'
+                        written = result['bytes_written']
+                        print(f"  {name:10} froid={result['cold_ms']:9.2f} ms  chaud={warm} ms  "
+                              f"RSS={result['peak_rss_kb'] / 1024:6.1f} Mo  "
+                              f"écrit={'-' if written is None else f'{written} o'}")
+                        results.append(dict(result, size=size, titles=spec, backend=backend, op=name))
+    return results
+
+
+def compare(before_path, after_path, threshold):
+    """Comparer deux fichiers de résultats ; renvoie le nombre de dégradations."""
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+
+    def key(result):
+        return result['size'], result['titles'], result['backend'], result['op']
+
+    baseline = {key(result): result for result in before['results']}
+    print(f"{before.get('version')} -> {after.get('version')}")
+    regressions = 0
+    for result in after['results']:
+        old = baseline.get(key(result))
+        if old is None:
+            continue
+        ratios = []
+        for metric in ('cold_ms', 'warm_ms', 'peak_rss_kb', 'bytes_written'):
+            if old.get(metric) and result.get(metric) is not None:
+                ratio = result[metric] / old[metric]
+                noise = metric.endswith('_ms') and result[metric] < NOISE_MS
+                flag = ' !' if ratio > threshold and not noise else ''
+                regressions += bool(flag)
+                ratios.append(f'{metric}={ratio:5.2f}{flag}')
+        print(f"  {result['size']:>8} {result['titles']:16} {result['backend']:8} {result['op']:10} "
+              + '  '.join(ratios))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--titles', nargs='+', default=['uniform:10:80'],
+                        help='Distributions de longueur des titres')
+    parser.add_argument('--done-ratio', type=float, default=0.3)
+    parser.add_argument('--backends', nargs='+', choices=sorted(todo.STORES), default=['journal'])
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--repeat', type=int, default=5, help='Appels à chaud après le premier')
+    parser.add_argument('--output', help='Fichier JSON des résultats')
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRÈS'), help='Comparer deux fichiers de résultats')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Rapport après/avant au-delà duquel une mesure est signalée')
+    parser.add_argument('--child', nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        name, workdir, backend, size, repeat = args.child
+        child(name, workdir, backend, int(size), int(repeat))
+        return
+    if args.compare:
+        regressions = compare(*args.compare, args.threshold)
+        if regressions:
+            sys.exit(f'{regressions} mesures dégradées au-delà de x{args.threshold}')
+        return
+    results = run(args)
+    if args.output:
+        report = {'version': version(), 'python': platform.python_version(), 'platform': platform.platform(),
+                  'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'settings': {
+                      'titles': args.titles, 'done_ratio': args.done_ratio, 'repeat': args.repeat},
+                  'results': results}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f'Résultats écrits dans {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Émulateur VT100/xterm du terminal (TerminalScreen) : débit en Mo/s sur des sorties types, sans iOS.
+
+Chaque charge est découpée en blocs de --chunk caractères, comme les
+livre le lecteur SSH ; comme dans _flush_output, les --per-frame blocs
+reçus entre deux images sont passés ensemble à feed, puis suivis d'un
+render (lignes modifiées seulement). Charges : journal (lignes
+simples, quelques couleurs), ls --color, redessin plein écran façon top
+(écran alternatif, positionnement, effacements), barres de progression
+(CR sans LF). Quelques vérifications de l'état de l'écran précèdent la mesure.
+
+Usage : python benchmarks/vt100.py [--megabytes 32] [--chunk 65536] [--size 80x24]
+"""
+import argparse
+import random
+import time
+
+import headless
+
+headless.install()
+from ssh_terminal_pythonista import TerminalScreen  # noqa: E402
+
+WORDS = ('kernel:', 'systemd[1]:', 'Started', 'Session', 'usb', 'eth0:', 'link', 'up', 'température', '42°C',
+         'sshd[812]:', 'Accepted', 'password', 'for', 'pi', 'from', '192.168.1.10', 'port', '51234', '✓')
+
+
+def journal(rng, cols):
+    lines = []
+    for k in range(2000):
+        line = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 9)))[:cols]
+        if k % 10 == 0:
+            line = '\x1b[1;31m' + line + '\x1b[0m'
+        lines.append(line + '\r\n')
+    return ''.join(lines)
+
+
+def ls_color(rng, cols):
+    colors = ('01;34', '01;32', '01;36', '00', '01;31')
+    lines = []
+    for _ in range(2000):
+        # Colonnes de noms à la largeur du terminal, comme ls
+        names, width = [], 0
+        while True:
+            name = ''.join(rng.choice('abcdefghijklmnop_.') for _ in range(rng.randint(4, 12)))
+            if width + len(name) + 2 > cols:
+                break
+            names.append(f'\x1b[{rng.choice(colors)}m{name}\x1b[0m  ')
+            width += len(name) + 2
+        lines.append(''.join(names) + '\r\n')
+    return ''.join(lines)
+
+
+def top_like(rng, cols, rows):
+    frames = ['\x1b[?1049h\x1b[?25l']
+    for _ in range(200):
+        frame = ['\x1b[H', f'top - 12:00:00 up 3 days,  load average: {rng.random():.2f}\x1b[K\r\n',
+                 '\x1b[7m  PID USER      PR  NI    VIRT    RES  %CPU  %MEM COMMAND\x1b[K\x1b[0m\r\n']
+        for row in range(rows - 3):
+            frame.append(f'{rng.randint(1, 99999):5} pi        20   0 {rng.randint(1, 999999):7} '
+                         f'{rng.randint(1, 99999):6} {rng.random() * 100:5.1f} {rng.random() * 10:5.1f} '
+                         f'{rng.choice(WORDS)}\x1b[K\r\n')
+        frame.append('\x1b[J')
+        frames.append(''.join(frame))
+    frames.append('\x1b[?25h\x1b[?1049l')
+    return ''.join(frames)
+
+
+def progress(rng, cols):
+    bars = []
+    # Barre à la largeur du terminal, comme celles de pip ou wget
+    size = max(10, cols - 36)
+    for _ in range(200):
+        for pct in range(0, 101):
+            filled = pct * size // 100
+            bars.append(f'\r  fichier.tar.gz {pct:3d}% [{"#" * filled}{"." * (size - filled)}] {rng.random() * 10:4.1f} Mo/s')
+        bars.append('\r\n')
+    return ''.join(bars)
+
+
+def check():
+    """État de l'écran après quelques séquences courantes."""
+    screen = TerminalScreen(20, 4, 100)
+    screen.feed('un\r\ndeux\r\ntrois\r\nquatre\r\ncinq\r\n')
+    lines, _ = screen.render()
+    assert lines == ['trois', 'quatre', 'cinq', ''] and list(screen.scrollback) == ['un', 'deux'], lines
+    screen.feed('\x1b[2;3H\x1b[1;32mXY\x1b[0m\x1b[K\x1b[6n')
+    lines, changed = screen.render()
+    assert lines[1] == 'quXY' and changed == {1} and screen.replies == ['\x1b[2;5R'], (lines, changed)
+    assert screen.pens[screen.attrs[1][2]] == (2, None, 1)
+    screen.feed('\x1b[?1049h\x1b[Hplein écran\x1b[?1049l')
+    lines, _ = screen.render()
+    assert lines[1] == 'quXY' and list(screen.scrollback) == ['un', 'deux'], lines
+    screen.feed('\r\x1b[K' + 'x' * 45)
+    lines, _ = screen.render()
+    assert lines[-2:] == ['x' * 20, 'x' * 5] and (screen.x, screen.y) == (5, 3), lines
+    # Lignes en bloc et caractère par caractère : même écran, même scrollback
+    rng = random.Random(1)
+    text = ''.join(''.join(rng.choice('ab ') for _ in range(rng.randint(0, 19))) + '\r\n' for _ in range(500))
+    bulk, slow = TerminalScreen(20, 6, 50), TerminalScreen(20, 6, 50)
+    bulk.feed(text)
+    for char in text:
+        slow.feed(char)
+    assert bulk.render()[0] == slow.render()[0] and list(bulk.scrollback) == list(slow.scrollback)
+    print('vérifications : ok')
+
+
+def run(name, text, size, cols, rows, chunk, per_frame):
+    screen = TerminalScreen(cols, rows)
+    text = text * (size // len(text.encode('utf-8')) + 1)
+    blocks = [text[pos:pos + chunk] for pos in range(0, len(text), chunk)]
+    volume = len(text.encode('utf-8'))
+    renders = 0
+    start = time.perf_counter()
+    for pos in range(0, len(blocks), per_frame):
+        screen.feed(''.join(blocks[pos:pos + per_frame]))
+        screen.render()
+        renders += 1
+    elapsed = time.perf_counter() - start
+    print(f'{name:11} {volume / elapsed / 1e6:8.1f} Mo/s  ({volume / 1e6:.1f} Mo, {len(blocks)} blocs, '
+          f'{renders} rendus, {len(screen.scrollback)} lignes de scrollback)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--megabytes', type=float, default=32)
+    parser.add_argument('--chunk', type=int, default=65536, help='Taille des blocs passés à feed (caractères)')
+    parser.add_argument('--per-frame', type=int, default=4, help='Blocs reçus entre deux rendus')
+    parser.add_argument('--size', default='80x24', help='Colonnes x lignes')
+    args = parser.parse_args()
+    cols, rows = map(int, args.size.split('x'))
+    check()
+    rng = random.Random(0)
+    size = int(args.megabytes * 1e6)
+    workloads = [('journal', journal(rng, cols)), ('ls --color', ls_color(rng, cols)),
+                 ('top', top_like(rng, cols, rows)), ('progression', progress(rng, cols))]
+    for name, text in workloads:
+        run(name, text, size, cols, rows, args.chunk, args.per_frame)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,28 +8,1316 @@ Description: Interface terminal SSH avec UI native Pythonista
 
 import ui
 import console
+import bisect
+import codecs
+import collections
+import concurrent.futures
+import heapq
+import json
+import random
+import re
+import select
+import shlex
 import threading
 import time
 import socket
 import sys
 import os
+from array import array
 
 # Tentative d'import de paramiko (si disponible)
 try:
     import paramiko
+    from paramiko.sftp import CMD_DATA, CMD_READ, CMD_STATUS, CMD_WRITE, int64
     PARAMIKO_AVAILABLE = True
 except ImportError:
     PARAMIKO_AVAILABLE = False
     print("Paramiko non disponible. Installation requise.")
 
-class SSHTerminal:
+# Lecture de la sortie SSH : taille maximale d'un recv, volume lu avant de
+# passer la main à l'affichage, et délai d'attente de select au bout duquel
+# l'état de la connexion est revérifié.
+READ_SIZE = 65536
+DRAIN_LIMIT = 1 << 20
+READ_TIMEOUT = 0.5
+
+# Affichage : lignes gardées dans le scrollback et intervalle minimal entre
+# deux rendus.
+SCROLLBACK_LINES = 2000
+FRAME_INTERVAL = 1 / 60
+
+# Pool de connexions : intervalle des keepalives (secondes), et durée de vie
+# d'une connexion sur laquelle plus aucun terminal n'a de canal ouvert.
+KEEPALIVE_INTERVAL = 30
+IDLE_TIMEOUT = 600
+
+# Session supervisée : intervalle et délai de réponse des keepalives qui
+# détectent un lien mort, délais de reconnexion (doublés à chaque échec,
+# plafonnés), commandes gardées pendant une coupure, et sortie en attente
+# d'affichage au-delà de laquelle la lecture du canal est suspendue.
+PROBE_INTERVAL = 5
+PROBE_TIMEOUT = 5
+RECONNECT_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30
+COMMAND_QUEUE_LIMIT = 100
+OUTPUT_BUFFER_LIMIT = 4 << 20
+
+# Diffusion d'une commande à plusieurs hôtes : hôtes traités en parallèle au
+# plus, et durée maximale par hôte (secondes, connexion comprise).
+BROADCAST_WORKERS = 32
+BROADCAST_TIMEOUT = 60
+
+# Historique des commandes : un fichier par hôte dans HISTORY_DIR, commandes
+# distinctes gardées au plus (les moins récemment utilisées partent en
+# premier), et lignes de journal tolérées au-delà avant compactage.
+HISTORY_DIR = os.path.expanduser('~/Documents/.ssh_history')
+HISTORY_LIMIT = 50000
+HISTORY_COMPACT_MIN = 1000
+
+# Poids de la fréquence d'une commande selon l'ancienneté de sa dernière
+# utilisation (secondes), façon z/fasd : (âge maximal, poids)
+RECENCY_WEIGHTS = ((3600, 4), (86400, 2), (7 * 86400, 0.5), (float('inf'), 0.25))
+
+# Transferts SFTP : taille des requêtes de lecture et d'écriture, requêtes
+# en vol par fichier (la mémoire d'un transfert est bornée par leur
+# produit), fenêtre et taille de paquet des canaux SFTP, fichiers
+# transférés en parallèle, et dossier local des téléchargements.
+SFTP_CHUNK = 256 << 10
+SFTP_DEPTH = 32
+SFTP_WINDOW = 32 << 20
+SFTP_PACKET = 256 << 10
+SFTP_WORKERS = 4
+TRANSFER_DIR = os.path.expanduser('~/Documents')
+PARTIAL_SUFFIX = '.part'
+
+# Émulation du terminal : type annoncé au serveur, taille d'une cellule de
+# la police Courier 12 de la vue (en points) et marges intérieures.
+TERM_TYPE = 'xterm'
+CELL_WIDTH = 7.2
+CELL_HEIGHT = 14.0
+VIEW_PADDING = 16
+
+# Séquences reconnues : CSI (préfixe, paramètres, final), OSC (texte), ESC
+# suivi d'un jeu de caractères (ignoré), autres ESC (final), caractère de
+# contrôle seul (hors CR, LF et ESC, traités à part), ESC isolé.
+VT_TOKEN = re.compile(
+    r'\x1b\[([?>=!<]?)([0-9;:]*)[ -/]*([@-~])'
+    r'|\x1b\]([^\x07\x1b]*)(?:\x07|\x1b\\)'
+    r'|\x1b[()*+#%][ -~]'
+    r'|\x1b([ -/]*[0-~])'
+    r'|([\x00-\x09\x0b\x0c\x0e-\x1a\x1c-\x1f\x7f])'
+    r'|\x1b')
+# Séquence commencée mais pas finie en fin de bloc : gardée pour le suivant
+VT_INCOMPLETE = re.compile(r'\x1b(?:\[[?>=!<]?[0-9;:]*[ -/]*|\][^\x07\x1b]*\x1b?|[()*+#%]|[ -/]*)\Z')
+# Sortie « simple » : texte, CR, LF et SGR. Une fois les SGR retirés,
+# VT_CONTROL y trouve ce qui ne l'est pas ; VT_COMPLEX le situe dans le texte
+# d'origine.
+VT_SGR = re.compile(r'\x1b\[[0-9;:]*m')
+VT_CONTROL = re.compile(r'[\x00-\x09\x0b\x0c\x0e-\x1f\x7f]')
+VT_COMPLEX = re.compile(r'\x1b(?!\[[0-9;:]*m)|[\x00-\x09\x0b\x0c\x0e-\x1a\x1c-\x1f\x7f]')
+
+# Attributs SGR : bits posés par un code, et bits effacés par son inverse
+SGR_SET = {1: 1, 2: 2, 3: 4, 4: 8, 5: 16, 7: 32, 8: 64, 9: 128}
+SGR_RESET = {22: 1 | 2, 23: 4, 24: 8, 25: 16, 27: 32, 28: 64, 29: 128}
+MAX_PENS = 65535
+
+def overlay(parts):
+    """Texte visible après avoir écrit chaque morceau depuis le début de la ligne"""
+    # Seul compte, à chaque colonne, le dernier morceau qui l'atteint : en
+    # partant de la fin, la ligne est souvent complète d'emblée
+    width = max(map(len, parts))
+    line = ''
+    for part in reversed(parts):
+        if len(part) > len(line):
+            line += part[len(line):]
+            if len(line) == width:
+                break
+    return line
+
+class TerminalScreen:
+    """Écran VT100/xterm de taille fixe, alimenté par le flux de sortie du shell
+    
+    Chaque ligne de la grille est un array('u') de caractères et un array('H')
+    d'attributs (indice dans `pens`, les combinaisons SGR rencontrées). Les
+    lignes modifiées sont notées dans `dirty` : `render` ne reconvertit
+    qu'elles en texte. Les lignes qui sortent par le haut de l'écran
+    principal passent dans `scrollback`. Un caractère occupe une cellule.
+    """
+    
+    def __init__(self, cols=80, rows=24, scrollback_lines=SCROLLBACK_LINES):
+        self.cols = cols
+        self.rows = rows
+        self.scrollback = collections.deque(maxlen=scrollback_lines)
+        self.pens = [(None, None, 0)]
+        self.pen_ids = {self.pens[0]: 0}
+        # (crayon, paramètres SGR) -> crayon obtenu
+        self.sgr_cache = {}
+        self.title = ''
+        # Réponses dues au serveur (position du curseur, identification)
+        self.replies = []
+        self.pending = ''
+        self.blank_chars = array('u', ' ' * cols)
+        self.blank_attrs = array('H', bytes(2 * cols))
+        self.reset()
+    
+    def reset(self):
+        """État initial : écran principal vide, curseur en haut à gauche"""
+        self.chars = [self.blank_chars[:] for _ in range(self.rows)]
+        self.attrs = [self.blank_attrs[:] for _ in range(self.rows)]
+        self.lines = [''] * self.rows
+        self.dirty = set(range(self.rows))
+        self.x = self.y = 0
+        self.top, self.bottom = 0, self.rows - 1
+        self.pen = 0
+        self.saved = (0, 0, 0)
+        self.autowrap = True
+        self.origin = False
+        self.cursor_visible = True
+        self.alternate = None
+    
+    def clear(self):
+        """Vider l'écran et le scrollback"""
+        self.scrollback.clear()
+        self._erase_rows(0, self.rows)
+        self.x = self.y = 0
+    
+    def feed(self, text):
+        """Interpréter du texte reçu du shell"""
+        data = self.pending + text if self.pending else text
+        self.pending = ''
+        cut = data.rfind('\x1b', max(0, len(data) - 4096))
+        if cut >= 0 and VT_INCOMPLETE.match(data, cut):
+            self.pending = data[cut:]
+            data = data[:cut]
+        if len(data) > self.cols * self.rows and self.alternate is None:
+            start = data.find('\n') + 1
+            self._parse(data[:start])
+            data = data[self._scroll_through(data, start):]
+        self._parse(data)
+    
+    def _parse(self, data):
+        if not VT_CONTROL.search(data):
+            self._write(data)
+            return
+        pos = 0
+        for match in VT_TOKEN.finditer(data):
+            start = match.start()
+            if start > pos:
+                self._write(data[pos:start])
+            pos = match.end()
+            prefix, params, final, osc, esc, control = match.groups()
+            if final:
+                self._csi(prefix, params, final)
+            elif control:
+                self._control(control)
+            elif esc:
+                self._esc(esc[-1])
+            elif osc is not None and osc[:2] in ('0;', '2;'):
+                self.title = osc[2:]
+        if pos < len(data):
+            self._write(data[pos:])
+    
+    def _scroll_through(self, data, start):
+        """Lignes qui ne font que traverser l'écran : passées d'un bloc au scrollback
+        
+        Un gros bloc de sortie simple (texte, CR LF, SGR) ne laisse à l'écran
+        que ses dernières lignes : celles d'avant vont au scrollback sans
+        passer par la grille ni les attributs. Renvoie la position dans `data`
+        où l'interprétation normale reprend.
+        """
+        rows, cols = self.rows, self.cols
+        if (self.x or self.top or self.bottom != rows - 1 or not self.autowrap
+                or any(self.chars[y] != self.blank_chars for y in range(self.y, rows))):
+            return start
+        limit = len(data)
+        while True:
+            # Les `rows` dernières lignes simples sont interprétées normalement :
+            # elles font défiler tout ce qui précède hors de l'écran
+            end = limit
+            for _ in range(rows + 1):
+                end = data.rfind('\n', start, end)
+                if end < start:
+                    return start
+            end += 1
+            block = data[start:end]
+            plain = VT_SGR.sub('', block) if '\x1b' in block else block
+            if not VT_CONTROL.search(plain):
+                break
+            if limit < len(data):
+                return start
+            limit = VT_COMPLEX.search(data, start).start()
+        if block.count('\r\n') != block.count('\n'):
+            return start
+        lines = plain.split('\r\n')
+        lines.pop()
+        if '\r' in plain:
+            # Barres de progression : chaque CR réécrit le début de la ligne
+            overlaid = []
+            for line in lines:
+                if '\r' in line:
+                    parts = line.split('\r')
+                    if max(map(len, parts)) > cols:
+                        return start
+                    line = overlay(parts)
+                overlaid.append(line)
+            lines = overlaid
+        if max(map(len, lines)) > cols:
+            lines = [line[pos:pos + cols] for line in lines for pos in range(0, max(len(line), 1), cols)]
+        history = [self.chars[y].tounicode().rstrip() for y in range(self.y)]
+        history += map(str.rstrip, lines[-self.scrollback.maxlen:])
+        self.scrollback.extend(history)
+        # Crayon à la fin du bloc : SGR appliqués depuis la dernière remise à zéro
+        reset = max(block.rfind('\x1b[0m'), block.rfind('\x1b[m'))
+        if reset >= 0:
+            self.pen = 0
+        for sgr in VT_SGR.findall(block, max(reset, 0) + (reset >= 0)):
+            self._sgr(sgr[2:-1])
+        self._erase_rows(0, rows)
+        self.y = 0
+        return end
+    
+    def render(self):
+        """(lignes de texte, indices des lignes modifiées depuis le dernier rendu)"""
+        changed, self.dirty = self.dirty, set()
+        for y in changed:
+            self.lines[y] = self.chars[y].tounicode().rstrip()
+        return self.lines, changed
+    
+    # Texte
+    
+    def _write(self, text):
+        """Texte sans séquence d'échappement : caractères imprimables, CR et LF"""
+        if '\n' not in text:
+            if '\r' in text:
+                self._overwrite(text.split('\r'))
+            else:
+                self._put(text)
+            return
+        parts = text.split('\r\n')
+        if len(parts) > 4 and text.count('\n') == text.count('\r') == len(parts) - 1:
+            # Cas courant : des lignes entières terminées par CR LF
+            self._put(parts[0])
+            self._lines(parts[1:])
+            return
+        for k, line in enumerate(text.split('\n')):
+            if k:
+                self._linefeed()
+            if '\r' not in line:
+                if line:
+                    self._put(line)
+            elif line[-1] == '\r' and line.count('\r') == 1:
+                # Fin de ligne CR LF
+                if len(line) > 1:
+                    self._put(line[:-1])
+                self.x = 0
+            else:
+                self._overwrite(line.split('\r'))
+    
+    def _overwrite(self, parts):
+        """Morceaux de texte séparés par des CR (barres de progression)"""
+        self._put(parts[0])
+        parts = parts[1:]
+        if max(map(len, parts)) > self.cols:
+            for part in parts:
+                self.x = 0
+                self._put(part)
+            return
+        self.x = 0
+        self._put(overlay(parts))
+        self.x = len(parts[-1])
+    
+    def _put(self, text):
+        """Écrire à la position du curseur, avec retour à la ligne automatique"""
+        x, n, cols = self.x, len(text), self.cols
+        if x + n <= cols:
+            y = self.y
+            self.chars[y][x:x + n] = array('u', text)
+            self.attrs[y][x:x + n] = array('H', (self.pen,)) * n
+            self.x = x + n
+            self.dirty.add(y)
+            return
+        while text:
+            if self.x >= cols:
+                if self.autowrap:
+                    self.x = 0
+                    self._linefeed()
+                else:
+                    self.x = cols - 1
+            x, y = self.x, self.y
+            n = min(len(text), cols - x)
+            part, text = (text, '') if n == len(text) else (text[:n], text[n:])
+            self.chars[y][x:x + n] = array('u', part)
+            self.attrs[y][x:x + n] = array('H', (self.pen,)) * n
+            # x == cols : retour à la ligne en attente du prochain caractère
+            self.x = x + n
+            self.dirty.add(y)
+    
+    def _lines(self, lines):
+        """Lignes précédées chacune d'un CR LF, traitées d'un bloc
+        
+        Seules les lignes qui restent à l'écran sont écrites dans la grille ;
+        celles qui défilent au-delà passent telles quelles dans le scrollback.
+        """
+        top, bottom, cols = self.top, self.bottom, self.cols
+        if not lines:
+            return
+        if not top <= self.y <= bottom or max(map(len, lines)) > cols:
+            for line in lines:
+                self.x = 0
+                self._linefeed()
+                self._put(line)
+            return
+        pen = array('H', (self.pen,))
+        height = bottom - top + 1
+        # Lignes virtuelles : celles de la région, puis autant de lignes
+        # vides que nécessaire ; la ligne i est écrite dans la ligne first + i.
+        first = self.y - top + 1
+        total = max(height, first + len(lines))
+        scrolls = total - height
+        chars = self.chars[top:bottom + 1]
+        attrs = self.attrs[top:bottom + 1]
+        for v in range(first, min(height, first + len(lines))):
+            line = lines[v - first]
+            chars[v][:len(line)] = array('u', line)
+            attrs[v][:len(line)] = pen * len(line)
+        if scrolls and top == 0 and self.alternate is None:
+            history = [row.tounicode().rstrip() for row in chars[:scrolls]]
+            if scrolls > height:
+                start = max(height, scrolls - self.scrollback.maxlen) - first
+                history += map(str.rstrip, lines[start:scrolls - first])
+            self.scrollback.extend(history)
+        for v in range(max(height, scrolls), total):
+            line = lines[v - first]
+            chars.append(array('u', line) + self.blank_chars[len(line):])
+            attrs.append(pen * len(line) + self.blank_attrs[len(line):])
+        self.chars[top:bottom + 1] = chars[-height:]
+        self.attrs[top:bottom + 1] = attrs[-height:]
+        self.y = top + first + len(lines) - 1 - scrolls
+        self.x = len(lines[-1])
+        self.dirty.update(range(top, bottom + 1))
+    
+    # Déplacements et défilement
+    
+    def _linefeed(self):
+        if self.y == self.bottom:
+            self._scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+    
+    def _scroll_up(self, n, top=None, history=True):
+        """Faire monter de n lignes la région [top, bottom] (la région de défilement par défaut)"""
+        top = self.top if top is None else top
+        bottom = self.bottom
+        n = min(n, bottom - top + 1)
+        if history and top == 0 and self.alternate is None:
+            self.scrollback.extend(self.chars[y].tounicode().rstrip() for y in range(n))
+        del self.chars[top:top + n], self.attrs[top:top + n]
+        self.chars[bottom - n + 1:bottom - n + 1] = [self.blank_chars[:] for _ in range(n)]
+        self.attrs[bottom - n + 1:bottom - n + 1] = [self.blank_attrs[:] for _ in range(n)]
+        self.dirty.update(range(top, bottom + 1))
+    
+    def _scroll_down(self, n, top=None):
+        top = self.top if top is None else top
+        bottom = self.bottom
+        n = min(n, bottom - top + 1)
+        del self.chars[bottom - n + 1:bottom + 1], self.attrs[bottom - n + 1:bottom + 1]
+        self.chars[top:top] = [self.blank_chars[:] for _ in range(n)]
+        self.attrs[top:top] = [self.blank_attrs[:] for _ in range(n)]
+        self.dirty.update(range(top, bottom + 1))
+    
+    def _erase_rows(self, start, end):
+        for y in range(start, end):
+            self.chars[y] = self.blank_chars[:]
+            self.attrs[y] = self.blank_attrs[:]
+            self.dirty.add(y)
+    
+    def _erase_cells(self, y, start, end):
+        end = min(end, self.cols)
+        if start < end:
+            self.chars[y][start:end] = self.blank_chars[start:end]
+            self.attrs[y][start:end] = self.blank_attrs[start:end]
+            self.dirty.add(y)
+    
+    # Séquences
+    
+    def _control(self, char):
+        if char == '\x08':
+            self.x = max(0, min(self.x, self.cols - 1) - 1)
+        elif char == '\t':
+            self.x = min(self.cols - 1, (self.x // 8 + 1) * 8)
+        elif char in '\x0b\x0c':
+            self._linefeed()
+    
+    def _esc(self, final):
+        if final == '7':
+            self.saved = (self.x, self.y, self.pen)
+        elif final == '8':
+            self.x, self.y, self.pen = self.saved
+        elif final == 'D':
+            self._linefeed()
+        elif final == 'E':
+            self.x = 0
+            self._linefeed()
+        elif final == 'M':
+            if self.y == self.top:
+                self._scroll_down(1)
+            elif self.y > 0:
+                self.y -= 1
+        elif final == 'c':
+            self.reset()
+    
+    def _csi(self, prefix, params, final):
+        if prefix == '?':
+            if final in 'hl':
+                for mode in params.split(';'):
+                    self._dec_mode(mode, final == 'h')
+            return
+        if prefix:
+            return
+        if final == 'm':
+            self._sgr(params)
+            return
+        args = [int(p) if p.isdigit() else 0 for p in params.replace(':', ';').split(';')] if params else []
+        n = args[0] if args and args[0] else 1
+        cols, rows = self.cols, self.rows
+        x, y = min(self.x, cols - 1), self.y
+        if final in 'Hf':
+            row = n - 1 + (self.top if self.origin else 0)
+            self.y = min(self.bottom if self.origin else rows - 1, row)
+            self.x = min(cols - 1, (args[1] if len(args) > 1 and args[1] else 1) - 1)
+        elif final == 'A':
+            self.y = max(self.top if y >= self.top else 0, y - n)
+            self.x = x
+        elif final in 'Be':
+            self.y = min(self.bottom if y <= self.bottom else rows - 1, y + n)
+            self.x = x
+        elif final in 'Ca':
+            self.x = min(cols - 1, x + n)
+        elif final == 'D':
+            self.x = max(0, x - n)
+        elif final == 'E':
+            self.y = min(self.bottom if y <= self.bottom else rows - 1, y + n)
+            self.x = 0
+        elif final == 'F':
+            self.y = max(self.top if y >= self.top else 0, y - n)
+            self.x = 0
+        elif final in 'G`':
+            self.x = min(cols - 1, n - 1)
+        elif final == 'd':
+            self.y = min(rows - 1, n - 1)
+        elif final == 'J':
+            mode = args[0] if args else 0
+            if mode == 0:
+                self._erase_cells(y, x, cols)
+                self._erase_rows(y + 1, rows)
+            elif mode == 1:
+                self._erase_rows(0, y)
+                self._erase_cells(y, 0, x + 1)
+            elif mode == 2:
+                self._erase_rows(0, rows)
+            elif mode == 3:
+                self.scrollback.clear()
+        elif final == 'K':
+            mode = args[0] if args else 0
+            start, end = {0: (x, cols), 1: (0, x + 1)}.get(mode, (0, cols))
+            self._erase_cells(y, start, end)
+        elif final in 'LM':
+            if self.top <= y <= self.bottom:
+                if final == 'L':
+                    self._scroll_down(n, y)
+                else:
+                    # Des lignes supprimées ne passent pas dans le scrollback
+                    self._scroll_up(n, y, history=False)
+                self.x = 0
+        elif final in 'P@':
+            n = min(n, cols - x)
+            chars, attrs = self.chars[y], self.attrs[y]
+            if final == 'P':
+                chars[x:] = chars[x + n:] + self.blank_chars[:n]
+                attrs[x:] = attrs[x + n:] + self.blank_attrs[:n]
+            else:
+                chars[x:] = self.blank_chars[:n] + chars[x:cols - n]
+                attrs[x:] = self.blank_attrs[:n] + attrs[x:cols - n]
+            self.dirty.add(y)
+        elif final == 'X':
+            self._erase_cells(y, x, x + n)
+        elif final == 'S':
+            self._scroll_up(n)
+        elif final == 'T':
+            self._scroll_down(n)
+        elif final == 'r':
+            top = (args[0] or 1) - 1 if args else 0
+            bottom = (args[1] or rows) - 1 if len(args) > 1 else rows - 1
+            if top < bottom < rows:
+                self.top, self.bottom = top, bottom
+                self.x, self.y = 0, top if self.origin else 0
+        elif final == 's':
+            self.saved = (self.x, self.y, self.pen)
+        elif final == 'u':
+            self.x, self.y, self.pen = self.saved
+        elif final == 'n':
+            if n == 6:
+                self.replies.append(f'\x1b[{self.y + 1};{x + 1}R')
+            elif n == 5:
+                self.replies.append('\x1b[0n')
+        elif final == 'c' and not (args and args[0]):
+            self.replies.append('\x1b[?1;2c')
+    
+    def _dec_mode(self, mode, enabled):
+        if mode == '7':
+            self.autowrap = enabled
+        elif mode == '6':
+            self.origin = enabled
+            self.x, self.y = 0, self.top if enabled else 0
+        elif mode == '25':
+            self.cursor_visible = enabled
+        elif mode in ('47', '1047', '1049'):
+            if enabled and self.alternate is None:
+                if mode == '1049':
+                    self.saved = (self.x, self.y, self.pen)
+                # Écran alternatif (top, htop, vim) : l'écran principal est mis de côté
+                self.alternate = (self.chars, self.attrs)
+                self.chars = [self.blank_chars[:] for _ in range(self.rows)]
+                self.attrs = [self.blank_attrs[:] for _ in range(self.rows)]
+                self.dirty.update(range(self.rows))
+            elif not enabled and self.alternate is not None:
+                self.chars, self.attrs = self.alternate
+                self.alternate = None
+                if mode == '1049':
+                    self.x, self.y, self.pen = self.saved
+                self.dirty.update(range(self.rows))
+    
+    def _sgr(self, params):
+        key = (self.pen, params)
+        pen_id = self.sgr_cache.get(key)
+        if pen_id is None:
+            pen_id = self.sgr_cache[key] = self._sgr_pen(params)
+        self.pen = pen_id
+    
+    def _sgr_pen(self, params):
+        """Indice du crayon obtenu en appliquant les codes SGR au crayon courant"""
+        fg, bg, flags = self.pens[self.pen]
+        codes = [int(p) if p.isdigit() else 0 for p in params.replace(':', ';').split(';')] if params else [0]
+        i = 0
+        while i < len(codes):
+            code = codes[i]
+            if code == 0:
+                fg, bg, flags = None, None, 0
+            elif code in SGR_SET:
+                flags |= SGR_SET[code]
+            elif code in SGR_RESET:
+                flags &= ~SGR_RESET[code]
+            elif 30 <= code <= 37 or 90 <= code <= 97:
+                fg = code - 30 if code < 90 else code - 82
+            elif 40 <= code <= 47 or 100 <= code <= 107:
+                bg = code - 40 if code < 100 else code - 92
+            elif code == 39:
+                fg = None
+            elif code == 49:
+                bg = None
+            elif code in (38, 48) and i + 1 < len(codes):
+                # 38;5;n (palette 256) ou 38;2;r;g;b (couleur directe)
+                if codes[i + 1] == 5 and i + 2 < len(codes):
+                    color, i = codes[i + 2], i + 2
+                elif codes[i + 1] == 2 and i + 4 < len(codes):
+                    color, i = '#%02x%02x%02x' % tuple(c & 255 for c in codes[i + 2:i + 5]), i + 4
+                else:
+                    color, i = None, i + 1
+                if code == 38:
+                    fg = color
+                else:
+                    bg = color
+            i += 1
+        pen = (fg, bg, flags)
+        pen_id = self.pen_ids.get(pen)
+        if pen_id is None:
+            if len(self.pens) >= MAX_PENS:
+                return 0
+            pen_id = self.pen_ids[pen] = len(self.pens)
+            self.pens.append(pen)
+        return pen_id
+
+class PooledConnection:
+    """Connexion SSH authentifiée du pool et canaux ouverts dessus"""
+    
     def __init__(self):
+        self.client = None
+        self.channels = set()
+        self.idle_since = time.monotonic()
+        # Une seule négociation à la fois par hôte
+        self.lock = threading.Lock()
+    
+    def busy(self):
+        """Vrai si un canal est encore ouvert (ceux fermés par le serveur sont oubliés)"""
+        channels = {channel for channel in self.channels if not channel.closed}
+        if len(channels) != len(self.channels):
+            self.channels = channels
+            if not channels:
+                self.idle_since = time.monotonic()
+        return bool(channels)
+    
+    def active(self):
+        transport = self.client.get_transport() if self.client else None
+        return transport is not None and transport.is_active()
+    
+    def close(self):
+        for channel in self.channels:
+            channel.close()
+        self.channels.clear()
+        if self.client:
+            self.client.close()
+            self.client = None
+
+class SSHConnectionPool:
+    """Connexions SSH authentifiées, partagées entre terminaux (onglets)
+    
+    Une connexion par (hôte, port, utilisateur) ; chaque terminal y ouvre
+    son propre canal. Une connexion sans canal reste ouverte `idle_timeout`
+    secondes, entretenue par des keepalives : se reconnecter ne refait ni la
+    négociation SSH ni l'authentification.
+    """
+    
+    def __init__(self, keepalive=KEEPALIVE_INTERVAL, idle_timeout=IDLE_TIMEOUT):
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.connections = {}
+        self.lock = threading.Lock()
+        # Négociations SSH effectuées (connexions neuves)
+        self.handshakes = 0
+    
+    def get(self, hostname, port, username, password, timeout=10):
+        """Client SSH connecté et authentifié, existant si possible"""
+        self.prune()
+        key = (hostname, port, username)
+        with self.lock:
+            connection = self.connections.setdefault(key, PooledConnection())
+        with connection.lock:
+            if not connection.active():
+                # Transport mort (réseau coupé, keepalive sans réponse) : on repart de zéro
+                connection.close()
+                client = paramiko.SSHClient()
+                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+                # `timeout` borne aussi la bannière et l'authentification : sur
+                # un lien mort, un essai échoue au bout du délai
+                client.connect(hostname=hostname, port=port, username=username, password=password,
+                               timeout=timeout, banner_timeout=timeout, auth_timeout=timeout)
+                client.get_transport().set_keepalive(self.keepalive)
+                connection.client = client
+                self.handshakes += 1
+            # Reprise par un appelant : prune ne doit pas la fermer avant
+            # qu'il y ait ouvert son canal
+            connection.idle_since = time.monotonic()
+            return connection.client
+    
+    def open_shell(self, hostname, port, username, password, term=TERM_TYPE, width=80, height=24, timeout=10):
+        """(client, canal) d'un nouveau shell interactif sur la connexion de l'hôte"""
+        return self._open(lambda client: client.invoke_shell(term=term, width=width, height=height),
+                          hostname, port, username, password, timeout)
+    
+    def open_session(self, hostname, port, username, password, timeout=10):
+        """(client, canal) d'une nouvelle session (pour exec_command) sur la connexion de l'hôte"""
+        return self._open(lambda client: client.get_transport().open_session(timeout=timeout),
+                          hostname, port, username, password, timeout)
+    
+    def _open(self, open_channel, hostname, port, username, password, timeout):
+        """Ouvrir un canal par `open_channel(client)` et l'attacher à la connexion, gardée tant qu'il est ouvert"""
+        for attempt in range(2):
+            handshakes = self.handshakes
+            client = self.get(hostname, port, username, password, timeout)
+            try:
+                channel = open_channel(client)
+            except (paramiko.SSHException, EOFError, OSError):
+                # Une connexion réutilisée a pu mourir depuis : une seule nouvelle tentative
+                if attempt or self.handshakes != handshakes:
+                    raise
+                self.discard(client)
+                continue
+            with self.lock:
+                connection = self._find(client)
+                if connection is not None:
+                    connection.channels.add(channel)
+            return client, channel
+    
+    def release(self, channel):
+        """Fermer le canal d'un terminal ; la connexion reste dans le pool"""
+        channel.close()
+        with self.lock:
+            for connection in self.connections.values():
+                if channel in connection.channels:
+                    connection.channels.discard(channel)
+                    if not connection.channels:
+                        connection.idle_since = time.monotonic()
+    
+    def discard(self, client):
+        """Fermer une connexion et tous ses canaux"""
+        with self.lock:
+            connection = self._find(client)
+        if connection is not None:
+            connection.close()
+    
+    def prune(self):
+        """Fermer les connexions mortes ou sans canal depuis plus de `idle_timeout`"""
+        now = time.monotonic()
+        with self.lock:
+            expired = [(key, connection) for key, connection in self.connections.items()
+                       if not connection.lock.locked() and not connection.busy()
+                       and (now - connection.idle_since > self.idle_timeout or not connection.active())]
+            for key, connection in expired:
+                del self.connections[key]
+        for key, connection in expired:
+            connection.close()
+    
+    def close(self):
+        """Fermer toutes les connexions"""
+        with self.lock:
+            connections = list(self.connections.values())
+            self.connections.clear()
+        for connection in connections:
+            connection.close()
+    
+    def _find(self, client):
+        for connection in self.connections.values():
+            if connection.client is client:
+                return connection
+        return None
+
+# Pool partagé par défaut entre les terminaux d'une même session Pythonista
+CONNECTION_POOL = SSHConnectionPool()
+
+# Résultat de la commande sur un hôte : code de sortie (None si elle n'a
+# pas abouti), message d'erreur, durée en secondes
+HostResult = collections.namedtuple('HostResult', 'host status error elapsed')
+
+def parse_hosts(text, default_port=22):
+    """Liste d'hôtes « pi1, pi2:2222 [fe80::1]:22 ::1 » -> [(nom, port)]
+    
+    Une adresse IPv6 suivie d'un port s'écrit entre crochets ; sans
+    crochets, un nom qui contient plusieurs « : » est une adresse IPv6.
+    Lève ValueError, avec un message affichable, sur un hôte mal formé.
+    """
+    hosts = []
+    for item in re.split(r'[\s,;]+', text.strip()):
+        if not item:
+            continue
+        if item.startswith('['):
+            name, bracket, port = item[1:].partition(']')
+            if not bracket or port[:1] not in ('', ':'):
+                raise ValueError(f"Hôte invalide: {item}")
+            port = port[1:]
+        elif item.count(':') > 1:
+            name, port = item, ''
+        else:
+            name, _, port = item.partition(':')
+        if not name or port and not (re.fullmatch(r'\d{1,5}', port) and 0 < int(port) < 65536):
+            raise ValueError(f"Hôte invalide: {item}")
+        hosts.append((name, int(port) if port else default_port))
+    return hosts
+
+def host_label(hostname, port):
+    if port == 22:
+        return hostname
+    return f"[{hostname}]:{port}" if ':' in hostname else f"{hostname}:{port}"
+
+class Broadcast:
+    """Même commande sur plusieurs hôtes en parallèle (exec_command)
+    
+    Les connexions viennent du pool ; au plus `workers` hôtes sont traités
+    à la fois. La sortie de chaque hôte (stdout et stderr mêlés) est passée
+    ligne par ligne à `on_output(hôte, ligne)`. `timeout` borne, connexion
+    comprise, la durée de la commande sur chaque hôte.
+    """
+    
+    def __init__(self, pool, username, password, workers=BROADCAST_WORKERS, timeout=BROADCAST_TIMEOUT):
+        self.pool = pool
+        self.username = username
+        self.password = password
+        self.workers = workers
+        self.timeout = timeout
+    
+    def run(self, hosts, command, on_output):
+        """Exécuter `command` sur chaque (nom, port) ; HostResult dans l'ordre des hôtes"""
+        workers = max(1, min(self.workers, len(hosts)))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self._run_host, hostname, port, command, on_output)
+                       for hostname, port in hosts]
+            return [future.result() for future in futures]
+    
+    def _run_host(self, hostname, port, command, on_output):
+        label = host_label(hostname, port)
+        start = time.monotonic()
+        deadline = start + self.timeout
+        channel = None
+        try:
+            # Canal attaché à sa connexion du pool : elle n'est pas fermée
+            # comme inutilisée pendant la commande
+            _, channel = self.pool.open_session(hostname, port, self.username, self.password, timeout=self.timeout)
+            channel.set_combine_stderr(True)
+            channel.exec_command(command)
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            partial = ""
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return HostResult(label, None, "délai dépassé", time.monotonic() - start)
+                readable, _, _ = select.select([channel], [], [], min(remaining, READ_TIMEOUT))
+                if not readable:
+                    continue
+                data = channel.recv(READ_SIZE)
+                if not data:
+                    break
+                lines = (partial + decoder.decode(data)).split('\n')
+                partial = lines.pop()
+                for line in lines:
+                    on_output(label, line.rstrip('\r'))
+            partial += decoder.decode(b'', final=True)
+            if partial:
+                on_output(label, partial.rstrip('\r'))
+            # Le code de sortie suit la fin du flux de près
+            if not channel.status_event.wait(max(0, deadline - time.monotonic())):
+                return HostResult(label, None, "pas de code de sortie", time.monotonic() - start)
+            status = channel.recv_exit_status()
+            if status == -1:
+                # Canal fermé sans code de sortie : connexion tombée pendant la commande
+                return HostResult(label, None, "connexion perdue", time.monotonic() - start)
+            return HostResult(label, status, None, time.monotonic() - start)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            return HostResult(label, None, str(e) or type(e).__name__, time.monotonic() - start)
+        finally:
+            if channel is not None:
+                self.pool.release(channel)
+
+def broadcast_summary(results):
+    """Résumé des codes de sortie d'une diffusion"""
+    succeeded = sum(1 for result in results if result.status == 0)
+    lines = [f"=== {succeeded}/{len(results)} hôtes en succès ==="]
+    for result in results:
+        if result.status is None:
+            lines.append(f"{result.host} : erreur, {result.error}")
+        elif result.status:
+            lines.append(f"{result.host} : code {result.status}")
+    return '\n'.join(lines) + '\n'
+
+def probe(transport, timeout):
+    """Vrai si le serveur répond à un keepalive dans le délai"""
+    # global_request n'a pas de délai : il attend dans son propre thread, qui
+    # se termine quand le transport est fermé
+    answered = threading.Event()
+    
+    def ask():
+        try:
+            transport.global_request('keepalive@openssh.com', wait=True)
+        except Exception:
+            pass
+        answered.set()
+    
+    threading.Thread(target=ask, daemon=True).start()
+    return answered.wait(timeout) and transport.is_active()
+
+class CommandHistory:
+    """Historique des commandes d'un hôte, persistant et classé par fréquence et récence
+    
+    Commande -> [utilisations, dernière utilisation] dans un OrderedDict
+    tenu dans l'ordre des utilisations : une commande déjà vue remonte à la
+    fin, et au-delà de `limit` la moins récemment utilisée est oubliée.
+    Sur disque, une ligne JSON [commande, date, utilisations] par
+    utilisation, ajoutée à la fin du fichier ; quand le journal dépasse de
+    moitié (et d'au moins HISTORY_COMPACT_MIN lignes) le nombre de
+    commandes, il est réécrit à une ligne par commande. `path` None :
+    historique en mémoire seulement.
+    """
+    
+    def __init__(self, path=None, limit=HISTORY_LIMIT):
+        self.path = path
+        self.limit = limit
+        self.entries = collections.OrderedDict()
+        self.lines = 0
+        # Index de recherche : commandes triées (préfixes), et texte de
+        # toutes les commandes, une par ligne (recherche floue), reconstruit
+        # à la demande après une modification
+        self.sorted = []
+        self.text = self.folded = None
+        if path:
+            self._load()
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def _load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read().decode('utf-8', 'replace')
+        except FileNotFoundError:
+            return
+        lines = data.splitlines()
+        try:
+            # Un seul appel au parseur pour tout le journal
+            records = json.loads('[' + ','.join(lines) + ']')
+        except ValueError:
+            # Ligne tronquée (écriture interrompue) : lignes valides seulement
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass
+        entries = self.entries
+        for command, last, count in records:
+            entry = entries.get(command)
+            if entry is None:
+                entries[command] = [count, last]
+            else:
+                entry[0] += count
+                entry[1] = max(entry[1], last)
+                entries.move_to_end(command)
+        while len(entries) > self.limit:
+            entries.popitem(last=False)
+        self.lines = len(lines)
+        self.sorted = sorted(entries)
+    
+    def add(self, command, now=None):
+        """Enregistrer une utilisation de `command`"""
+        if not command or '\n' in command:
+            return
+        now = int(time.time() if now is None else now)
+        entry = self.entries.get(command)
+        if entry is None:
+            self.entries[command] = [1, now]
+            bisect.insort(self.sorted, command)
+            if len(self.entries) > self.limit:
+                oldest, _ = self.entries.popitem(last=False)
+                del self.sorted[bisect.bisect_left(self.sorted, oldest)]
+        else:
+            entry[0] += 1
+            entry[1] = now
+            self.entries.move_to_end(command)
+        self.text = None
+        if self.path:
+            self._append(command, now)
+    
+    def _append(self, command, now):
+        line = json.dumps([command, now, 1], ensure_ascii=False) + '\n'
+        try:
+            if self.lines > len(self.entries) * 3 // 2 + HISTORY_COMPACT_MIN:
+                self.compact()
+            else:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                self.lines += 1
+        except OSError:
+            # Historique non enregistré (disque plein, dossier interdit) : il reste en mémoire
+            pass
+    
+    def compact(self):
+        """Réécrire le fichier à une ligne par commande"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps([command, last, count], ensure_ascii=False) + '\n'
+                         for command, (count, last) in self.entries.items())
+        os.replace(tmp, self.path)
+        self.lines = len(self.entries)
+    
+    def recent(self, count=10):
+        """Les `count` dernières commandes distinctes, la plus récente en dernier"""
+        entries = self.entries
+        commands = []
+        for command in reversed(entries):
+            if len(commands) >= count:
+                break
+            commands.append(command)
+        return commands[::-1]
+    
+    def score(self, command, now=None):
+        """Fréquence pondérée par la récence de la dernière utilisation"""
+        count, last = self.entries[command]
+        age = (time.time() if now is None else now) - last
+        for limit, weight in RECENCY_WEIGHTS:
+            if age < limit:
+                return count * weight
+    
+    def prefix(self, prefix, count=10, now=None):
+        """Commandes commençant par `prefix`, les mieux classées d'abord"""
+        start = bisect.bisect_left(self.sorted, prefix)
+        end = bisect.bisect_left(self.sorted, prefix + '\U0010ffff', start)
+        now = time.time() if now is None else now
+        return heapq.nlargest(count, self.sorted[start:end], key=lambda command: self._rank(command, now))
+    
+    def search(self, query, count=10, now=None):
+        """Recherche floue (reverse-i-search) : commandes contenant `query`, puis
+        celles qui en contiennent les caractères dans l'ordre
+        
+        Les commandes sont parcourues de la plus récente à la plus ancienne ;
+        parmi les premières trouvées (20 par résultat demandé), les plus
+        compactes puis les mieux classées d'abord. Sans majuscule dans
+        `query`, la casse est ignorée.
+        """
+        if not query:
+            return []
+        if self.text is None:
+            # Chaque commande précédée d'un \n, la plus récente en premier
+            self.text = '\n' + '\n'.join(reversed(self.entries))
+            folded = self.text.lower()
+            # Même texte en minuscules, si les positions y sont les mêmes
+            self.folded = folded if len(folded) == len(self.text) else None
+        text = haystack = self.text
+        if query == query.lower() and self.folded is not None:
+            haystack = self.folded
+        window = count * 20
+        now = time.time() if now is None else now
+        found = {}
+        
+        def add(start, end, gap):
+            command = text[start:end]
+            if command not in found:
+                found[command] = (gap, self._rank(command, now))
+        
+        pos = haystack.find(query)
+        while pos >= 0 and len(found) < window:
+            end = haystack.find('\n', pos)
+            end = len(text) if end < 0 else end
+            add(haystack.rfind('\n', 0, pos) + 1, end, 0)
+            pos = haystack.find(query, end)
+        # Chaque caractère à sa première occurrence après le précédent :
+        # \n[^\na]*(a[^\nb]*b[^\nc]*c), sans retour en arrière possible
+        chars = [re.escape(char) for char in query]
+        fuzzy = chars[0] + ''.join(f'[^\n{char}]*{char}' for char in chars[1:])
+        pattern = re.compile(f'\n[^\n{chars[0]}]*({fuzzy})')
+        pos = 0
+        while len(found) < window:
+            match = pattern.search(haystack, pos)
+            if match is None:
+                break
+            end = haystack.find('\n', match.end())
+            end = len(text) if end < 0 else end
+            add(match.start() + 1, end, len(query) - (match.end(1) - match.start(1)))
+            pos = end
+        return heapq.nlargest(count, found, key=found.get)
+    
+    def _rank(self, command, now):
+        # Score, puis dernière utilisation pour départager
+        return self.score(command, now), self.entries[command][1]
+
+# Historiques ouverts, partagés par les terminaux (onglets) d'un même hôte
+HISTORIES = {}
+
+def host_history(username, hostname, port):
+    """Historique persistant de `username`@`hostname`:`port`"""
+    name = re.sub(r'[^\w.@-]+', '_', f"{username}@{host_label(hostname, port)}")
+    path = os.path.join(HISTORY_DIR, name + '.jsonl')
+    history = HISTORIES.get(path)
+    if history is None:
+        history = HISTORIES[path] = CommandHistory(path)
+    return history
+
+# Résultat du transfert d'un fichier : octets transférés et repris (déjà
+# présents dans le .part), message d'erreur, durée en secondes
+TransferResult = collections.namedtuple('TransferResult', 'name size resumed error elapsed')
+
+class _Responses:
+    """Réponses aux requêtes SFTP d'un transfert
+    
+    paramiko remet chaque réponse à `_async_response` de l'objet passé à
+    `_async_request` : les requêtes partent sans attendre, les réponses
+    sont lues à la demande, dans n'importe quel ordre.
+    """
+    
+    def __init__(self, sftp):
+        self.sftp = sftp
+        self.ready = {}
+    
+    def send(self, kind, *args):
+        return self.sftp._async_request(self, kind, *args)
+    
+    def wait(self, num):
+        while num not in self.ready:
+            self.sftp._read_response()
+        return self.ready.pop(num)
+    
+    def _async_response(self, t, msg, num):
+        self.ready[num] = (t, msg)
+
+class SFTPTransfers:
+    """Téléchargements et envois SFTP sur une connexion SSH, pipelinés et reprenables
+    
+    Chaque thread de transfert a son canal SFTP, à grande fenêtre, ouvert
+    une fois pour tous ses fichiers ; chaque fichier garde `depth` requêtes
+    de `chunk` octets en vol : le débit ne dépend plus de
+    la latence, et la mémoire d'un transfert reste bornée par depth × chunk
+    quelle que soit la taille du fichier. La destination est écrite sous
+    `<nom>.part`, renommée une fois complète ; un transfert interrompu
+    reprend à la taille du .part (comme reget/reput, sans vérifier le début).
+    """
+    
+    def __init__(self, client, workers=SFTP_WORKERS, chunk=SFTP_CHUNK, depth=SFTP_DEPTH, window=SFTP_WINDOW):
+        self.client = client
+        self.workers = workers
+        self.chunk = chunk
+        self.depth = depth
+        self.window = window
+    
+    def run(self, jobs, on_progress=None):
+        """Transférer [(sens, source, destination)] ('get' ou 'put'), plusieurs à la fois
+        
+        `on_progress(nom, octets, total)` est appelé depuis les threads de
+        transfert à chaque bloc reçu ou acquitté. Renvoie un TransferResult
+        par transfert, dans l'ordre de `jobs`.
+        """
+        channels = threading.local()
+        opened = []
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(jobs)))) as executor:
+                futures = [executor.submit(self._run_job, job, channels, opened, on_progress) for job in jobs]
+                return [future.result() for future in futures]
+        finally:
+            for sftp in opened:
+                sftp.close()
+    
+    def _run_job(self, job, channels, opened, on_progress):
+        direction, source, destination = job
+        name = os.path.basename(source)
+        start = time.monotonic()
+        resumed = 0
+        try:
+            sftp = getattr(channels, 'sftp', None)
+            if sftp is None or sftp.sock.closed:
+                sftp = channels.sftp = paramiko.SFTPClient.from_transport(
+                    self.client.get_transport(), window_size=self.window, max_packet_size=SFTP_PACKET)
+                opened.append(sftp)
+            transfer = self._download if direction == 'get' else self._upload
+            size, resumed = transfer(sftp, source, destination,
+                                     lambda done, total: on_progress and on_progress(name, done, total))
+            return TransferResult(name, size, resumed, None, time.monotonic() - start)
+        except Exception as e:
+            return TransferResult(name, None, resumed, str(e) or type(e).__name__, time.monotonic() - start)
+    
+    def _download(self, sftp, remote, local, progress):
+        size = sftp.stat(remote).st_size
+        partial = local + PARTIAL_SUFFIX
+        offset = os.path.getsize(partial) if os.path.exists(partial) else 0
+        if offset > size:
+            offset = 0
+        resumed = offset
+        chunk = self.chunk
+        with sftp.open(remote, 'rb') as remote_file, open(partial, 'r+b' if offset else 'wb') as f:
+            f.seek(offset)
+            f.truncate()
+            responses = _Responses(sftp)
+            # (requête, position, longueur), dans l'ordre du fichier
+            pending = collections.deque()
+            position = offset
+            while pending or position < size:
+                while position < size and len(pending) < self.depth:
+                    length = min(chunk, size - position)
+                    pending.append((responses.send(CMD_READ, remote_file.handle, int64(position), length),
+                                    position, length))
+                    position += length
+                num, start, length = pending.popleft()
+                t, msg = responses.wait(num)
+                if t == CMD_STATUS:
+                    # EOF avant la taille annoncée : fichier raccourci pendant le transfert
+                    sftp._convert_status(msg)
+                    raise IOError(f"{remote} : réponse vide à {start}")
+                if t != CMD_DATA:
+                    raise IOError(f"{remote} : réponse SFTP inattendue ({t})")
+                data = msg.get_string()
+                f.write(data)
+                offset += len(data)
+                if 0 < len(data) < length:
+                    # Lecture courte (serveur qui plafonne ses réponses) : le
+                    # reste est redemandé en tête, les requêtes suivantes réduites
+                    chunk = len(data)
+                    pending.appendleft((responses.send(CMD_READ, remote_file.handle, int64(start + len(data)),
+                                                       length - len(data)), start + len(data), length - len(data)))
+                elif not data:
+                    raise IOError(f"{remote} : réponse vide à {start}")
+                progress(offset, size)
+        os.replace(partial, local)
+        return size, resumed
+    
+    def _upload(self, sftp, local, remote, progress):
+        size = os.path.getsize(local)
+        partial = remote + PARTIAL_SUFFIX
+        try:
+            offset = sftp.stat(partial).st_size
+        except IOError:
+            offset = 0
+        if offset > size:
+            offset = 0
+        resumed = offset
+        with open(local, 'rb') as f, sftp.open(partial, 'r+b' if offset else 'wb') as remote_file:
+            f.seek(offset)
+            responses = _Responses(sftp)
+            # (requête, longueur) ; un bloc est compté une fois acquitté
+            pending = collections.deque()
+            position = offset
+            while True:
+                data = f.read(self.chunk) if len(pending) < self.depth else None
+                if data:
+                    pending.append((responses.send(CMD_WRITE, remote_file.handle, int64(position), data), len(data)))
+                    position += len(data)
+                    continue
+                if not pending:
+                    break
+                num, length = pending.popleft()
+                t, msg = responses.wait(num)
+                if t != CMD_STATUS:
+                    raise IOError(f"{remote} : réponse SFTP inattendue ({t})")
+                sftp._convert_status(msg)
+                offset += length
+                progress(offset, size)
+        try:
+            sftp.posix_rename(partial, remote)
+        except IOError:
+            # Serveur sans l'extension posix-rename : rename refuse d'écraser
+            try:
+                sftp.remove(remote)
+            except IOError:
+                pass
+            sftp.rename(partial, remote)
+        return size, resumed
+
+def transfer_summary(results):
+    """Une ligne par fichier, puis le total"""
+    lines = []
+    for result in results:
+        if result.error is not None:
+            lines.append(f"{result.name} : échec ({result.error})")
+        else:
+            resumed = f", repris à {result.resumed / 1e6:.1f} Mo" if result.resumed else ""
+            rate = (result.size - result.resumed) / max(result.elapsed, 1e-6) / 1e6
+            lines.append(f"{result.name} : {result.size / 1e6:.1f} Mo en {result.elapsed:.1f} s "
+                         f"({rate:.1f} Mo/s{resumed})")
+    failed = sum(1 for result in results if result.error is not None)
+    lines.append(f"{len(results) - failed}/{len(results)} fichier(s) transféré(s)")
+    return '\n'.join(lines) + '\n'
+
+class SSHTerminal:
+    def __init__(self, scrollback_lines=SCROLLBACK_LINES, pool=None):
+        # Connexions partagées avec les autres onglets
+        self.pool = CONNECTION_POOL if pool is None else pool
         self.ssh_client = None
         self.ssh_channel = None
         self.connected = False
+        # Sortie reçue en attente du prochain rendu, puis scrollback borné
         self.output_buffer = []
-        self.command_history = []
-        self.history_index = 0
+        self.output_lock = threading.Lock()
+        self.flush_pending = False
+        # Volume en attente, et signal de son affichage pour la lecture suspendue
+        self.output_size = 0
+        self.output_drained = threading.Condition(self.output_lock)
+        # Session supervisée : commandes à envoyer (rejouées après une
+        # coupure), octets déjà envoyés de la première. `session` change à
+        # chaque connexion et déconnexion : un superviseur d'une session
+        # précédente s'arrête même si une nouvelle a déjà commencé.
+        self.supervised = False
+        self.session = 0
+        self.outbox = collections.deque()
+        self.outbox_sent = 0
+        self.wakeup = threading.Event()
+        self.scrollback_lines = scrollback_lines
+        # Historique de l'hôte, chargé à la connexion
+        self.history = CommandHistory()
         
         # Paramètres de connexion par défaut
         self.hostname = "raspberrypi.local"
@@ -86,7 +1374,14 @@ class SSHTerminal:
         self.terminal_view.text_color = '#00ff00'
         self.terminal_view.font = ('Courier', 12)
         self.terminal_view.editable = False
-        self.terminal_view.text = "Terminal SSH - Prêt à se connecter\n"
+        # Grille de l'émulateur à la taille de la vue ; annoncée au serveur
+        # avec le pseudo-terminal
+        width, height = self.terminal_view.frame[2:]
+        self.screen = TerminalScreen(max(1, int((width - VIEW_PADDING) / CELL_WIDTH)),
+                                     max(1, int((height - VIEW_PADDING) / CELL_HEIGHT)),
+                                     self.scrollback_lines)
+        self.screen.feed("Terminal SSH - Prêt à se connecter\r\n")
+        self.terminal_view.text = self._screen_text()
         self.view.add_subview(self.terminal_view)
         
         # Zone de saisie des commandes
@@ -122,6 +1417,11 @@ class SSHTerminal:
         history_btn.action = self.show_history
         command_view.add_subview(history_btn)
         
+        tab_btn = ui.Button(frame=(170, 45, 70, 25), title='Tab')
+        tab_btn.background_color = '#34C759'
+        tab_btn.action = self.new_tab
+        command_view.add_subview(tab_btn)
+        
         self.view.add_subview(command_view)
     
     def textfield_should_return(self, textfield):
@@ -137,13 +1437,17 @@ class SSHTerminal:
             self.add_output("Erreur: Paramiko non installé. Installez-le via pip.\n")
             return
             
-        if not self.connected:
-            self.connect_ssh()
-        else:
+        # Pendant une reconnexion, le bouton reste « Disconnect » : il l'arrête
+        if self.supervised:
             self.disconnect_ssh()
+        else:
+            self.connect_ssh()
     
     def connect_ssh(self):
         """Établir la connexion SSH"""
+        if self.supervised:
+            # Session déjà en cours ou en reconnexion : ses paramètres ne changent pas
+            return
         self.hostname = self.host_field.text or "raspberrypi.local"
         self.username = self.user_field.text or "tom"
         self.password = self.pass_field.text
@@ -152,43 +1456,155 @@ class SSHTerminal:
             self.add_output("Erreur: Mot de passe requis\n")
             return
         
-        self.add_output(f"Connexion à {self.username}@{self.hostname}...\n")
+        try:
+            hosts = parse_hosts(self.hostname)
+        except ValueError as e:
+            self.add_output(f"Erreur: {e}\n")
+            return
+        if not hosts:
+            self.add_output("Erreur: Hôte requis\n")
+            return
+        if len(hosts) > 1:
+            self.history = host_history(self.username, self.hostname, self.port)
+            self.add_output(f"Mode diffusion: chaque commande sera exécutée sur {len(hosts)} hôtes\n")
+            return
+        self.hostname, self.port = hosts[0]
+        self.history = host_history(self.username, self.hostname, self.port)
+        
+        self.add_output(f"Connexion à {self.username}@{host_label(self.hostname, self.port)}...\n")
         
         # Connexion en thread séparé pour éviter le blocage de l'UI
-        threading.Thread(target=self._connect_thread, daemon=True).start()
+        threading.Thread(target=self._connect_thread, args=(self._begin_session(),), daemon=True).start()
     
-    def _connect_thread(self):
+    def _begin_session(self):
+        """Réserver la session dès l'appui sur Connect : un second appui déconnecte au lieu de relancer une connexion"""
+        self.supervised = True
+        self.session += 1
+        self._update_connection_ui(True)
+        return self.session
+    
+    def _connect_thread(self, session):
         """Thread de connexion SSH"""
         try:
-            self.ssh_client = paramiko.SSHClient()
-            self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-            
-            self.ssh_client.connect(
-                hostname=self.hostname,
-                port=self.port,
-                username=self.username,
-                password=self.password,
-                timeout=10
-            )
-            
-            # Créer un canal shell interactif
-            self.ssh_channel = self.ssh_client.invoke_shell()
-            self.ssh_channel.settimeout(0.1)
-            
-            self.connected = True
-            
-            # Mettre à jour l'UI sur le thread principal
-            ui.delay(lambda: self._update_connection_ui(True), 0)
-            
-            self.add_output(f"Connecté à {self.hostname} avec succès!\n")
-            self.add_output("Tapez vos commandes ci-dessous.\n\n")
-            
-            # Démarrer la lecture des données du serveur
-            threading.Thread(target=self._read_ssh_output, daemon=True).start()
-            
+            reused = self._open_shell()
         except Exception as e:
-            self.add_output(f"Erreur de connexion: {str(e)}\n")
-            ui.delay(lambda: self._update_connection_ui(False), 0)
+            if session == self.session:
+                self.supervised = False
+                self.add_output(f"Erreur de connexion: {str(e)}\n")
+                ui.delay(lambda: self._update_connection_ui(False), 0)
+            return
+        if session != self.session or not self.supervised:
+            # Déconnexion demandée pendant la connexion : rendre le canal au pool
+            channel, self.ssh_channel, self.ssh_client = self.ssh_channel, None, None
+            self.connected = False
+            self.pool.release(channel)
+            return
+        
+        self.add_output(f"Connecté à {self.hostname} avec succès!"
+                        + (" (connexion réutilisée)" if reused else "") + "\n")
+        self.add_output("Tapez vos commandes ci-dessous.\n\n")
+        
+        # Surveiller la connexion et envoyer les commandes
+        threading.Thread(target=self._supervise, args=(session,), daemon=True).start()
+    
+    def _open_shell(self):
+        """Ouvrir le shell, sur une connexion du pool si l'hôte en a déjà une, et démarrer sa lecture
+        
+        Renvoie vrai si la connexion a été réutilisée.
+        """
+        handshakes = self.pool.handshakes
+        self.ssh_client, self.ssh_channel = self.pool.open_shell(
+            self.hostname, self.port, self.username, self.password,
+            term=TERM_TYPE, width=self.screen.cols, height=self.screen.rows, timeout=10
+        )
+        self.ssh_channel.settimeout(0.1)
+        self.outbox_sent = 0
+        self.connected = True
+        
+        # Démarrer la lecture des données du serveur
+        threading.Thread(target=self._read_ssh_output, daemon=True).start()
+        return self.pool.handshakes == handshakes
+    
+    def _supervise(self, session):
+        """Thread de supervision : envoi des commandes, keepalives, reconnexion avec backoff"""
+        delay = RECONNECT_DELAY
+        last_probe = time.monotonic()
+        while self.supervised and session == self.session:
+            if not self.connected:
+                try:
+                    self._open_shell()
+                except Exception as e:
+                    # Délai doublé à chaque échec, avec une part aléatoire pour
+                    # que les onglets ne se reconnectent pas tous ensemble
+                    wait = delay * random.uniform(0.5, 1)
+                    self.add_output(f"Reconnexion impossible ({e}), nouvel essai dans {wait:.1f} s\n")
+                    delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                    deadline = time.monotonic() + wait
+                    while self.supervised and session == self.session and time.monotonic() < deadline:
+                        self.wakeup.wait(deadline - time.monotonic())
+                        self.wakeup.clear()
+                    continue
+                delay = RECONNECT_DELAY
+                last_probe = time.monotonic()
+                pending = f", {len(self.outbox)} commande(s) en attente renvoyée(s)" if self.outbox else ""
+                self.add_output(f"Reconnecté à {self.hostname}{pending}.\n")
+            channel = self.ssh_channel
+            if channel is None:
+                # _link_lost (thread de lecture) ou une déconnexion vient de passer
+                continue
+            try:
+                blocked = self._send_pending(channel)
+            except Exception:
+                self._link_lost(channel)
+                continue
+            if time.monotonic() - last_probe >= PROBE_INTERVAL:
+                last_probe = time.monotonic()
+                transport = channel.get_transport()
+                if transport is None or not probe(transport, PROBE_TIMEOUT):
+                    self._link_lost(channel, dead=True)
+                    continue
+            # Fenêtre du canal pleine : réessayer bientôt ; sinon attendre une
+            # commande ou le prochain keepalive
+            self.wakeup.wait(0.05 if blocked else max(0, last_probe + PROBE_INTERVAL - time.monotonic()))
+            self.wakeup.clear()
+    
+    def _send_pending(self, channel):
+        """Envoyer les commandes en file tant que la fenêtre SSH du canal le permet
+        
+        Une commande ne quitte la file qu'entièrement envoyée. Renvoie vrai
+        s'il en reste, faute de place dans la fenêtre.
+        """
+        while self.outbox and self.connected and channel is self.ssh_channel:
+            if not channel.send_ready():
+                return True
+            data = self.outbox[0].encode('utf-8')
+            try:
+                self.outbox_sent += channel.send(data[self.outbox_sent:])
+            except socket.timeout:
+                return True
+            if self.outbox_sent >= len(data):
+                self.outbox.popleft()
+                self.outbox_sent = 0
+        return False
+    
+    def _link_lost(self, channel, dead=False):
+        """Le canal est tombé sans que l'utilisateur l'ait demandé : la supervision reconnecte"""
+        if not self.supervised or channel is not self.ssh_channel:
+            return
+        self.connected = False
+        self.ssh_channel = None
+        client, self.ssh_client = self.ssh_client, None
+        transport = client.get_transport() if client else None
+        if dead or transport is None or not transport.is_active():
+            # Connexion morte : retirée du pool (les autres onglets se reconnecteront aussi)
+            if client is not None:
+                self.pool.discard(client)
+        else:
+            self.pool.release(channel)
+        self.add_output("\nConnexion perdue, reconnexion...\n")
+        # L'interface reste « connectée » : Disconnect arrête la reconnexion
+        ui.delay(lambda: self._update_connection_ui(True), 0)
+        self.wakeup.set()
     
     def _update_connection_ui(self, connected):
         """Mettre à jour l'interface selon l'état de connexion"""
@@ -206,30 +1622,72 @@ class SSHTerminal:
             self.pass_field.enabled = True
     
     def _read_ssh_output(self):
-        """Lire en continu la sortie du serveur SSH"""
-        while self.connected and self.ssh_channel:
+        """Lire en continu la sortie du serveur SSH (attente sur select, décodage UTF-8 incrémental)"""
+        channel = self.ssh_channel
+        # Un caractère multi-octets coupé entre deux lectures est complété
+        # à la suivante ; seuls les octets invalides deviennent U+FFFD.
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        while self.connected and channel is self.ssh_channel:
+            # Affichage en retard : ne plus lire, la fenêtre SSH se referme et
+            # le serveur cesse d'envoyer
+            with self.output_lock:
+                if self.output_size > OUTPUT_BUFFER_LIMIT:
+                    self.output_drained.wait(READ_TIMEOUT)
+                    continue
             try:
-                if self.ssh_channel.recv_ready():
-                    data = self.ssh_channel.recv(1024).decode('utf-8', errors='ignore')
-                    if data:
-                        self.add_output(data)
-                time.sleep(0.1)
+                readable, _, _ = select.select([channel], [], [], READ_TIMEOUT)
+                if not readable:
+                    # Transport mort (RST, erreur réseau) : paramiko ferme le
+                    # canal sans le rendre lisible
+                    if channel.closed:
+                        self._link_lost(channel)
+                        break
+                    continue
+                chunks = [channel.recv(READ_SIZE)]
+                size = len(chunks[0])
+                if not chunks[0]:
+                    # Fin de flux : le shell distant s'est terminé
+                    tail = decoder.decode(b'', final=True)
+                    if tail:
+                        self.add_output(tail, raw=True)
+                    transport = channel.get_transport()
+                    if self.supervised and (not transport.is_active() or channel.recv_exit_status() == -1):
+                        # Transport mort, ou canal fermé sans code de sortie : lien coupé
+                        self._link_lost(channel)
+                    elif self.connected:
+                        ui.delay(self.disconnect_ssh, 0)
+                    break
+                # Vider ce qui est déjà arrivé avant de passer à l'affichage
+                while size < DRAIN_LIMIT and channel.recv_ready():
+                    chunks.append(channel.recv(READ_SIZE))
+                    size += len(chunks[-1])
+                text = decoder.decode(b''.join(chunks))
+                if text:
+                    self.add_output(text, raw=True)
             except Exception as e:
                 if self.connected:  # Éviter les erreurs lors de la déconnexion
                     self.add_output(f"Erreur de lecture: {str(e)}\n")
+                    self._link_lost(channel)
                 break
     
     def disconnect_ssh(self):
         """Fermer la connexion SSH"""
+        # Supervision arrêtée d'abord : elle ne doit pas voir la connexion
+        # fermée et rouvrir le shell
+        self.supervised = False
+        self.session += 1
         self.connected = False
+        self.wakeup.set()
+        if self.outbox:
+            self.add_output(f"{len(self.outbox)} commande(s) en attente abandonnée(s).\n")
+            self.outbox.clear()
         
+        # Le canal est fermé ; la connexion reste ouverte dans le pool pour
+        # une reconnexion ou un autre onglet
         if self.ssh_channel:
-            self.ssh_channel.close()
+            self.pool.release(self.ssh_channel)
             self.ssh_channel = None
-        
-        if self.ssh_client:
-            self.ssh_client.close()
-            self.ssh_client = None
+        self.ssh_client = None
         
         self._update_connection_ui(False)
         self.add_output("Connexion fermée.\n")
@@ -240,63 +1698,219 @@ class SSHTerminal:
         if not command:
             return
         
-        if not self.connected or not self.ssh_channel:
+        # Plusieurs hôtes dans le champ Host : diffusion plutôt que shell
+        try:
+            hosts = parse_hosts(self.host_field.text or "")
+        except ValueError as e:
+            self.add_output(f"Erreur: {e}\n")
+            return
+        if len(hosts) > 1 and not self.connected:
+            self.broadcast_command(hosts, command)
+            return
+        
+        if not self.supervised:
             self.add_output("Erreur: Non connecté au serveur\n")
             return
         
+        # Transferts de fichiers plutôt que commande du shell
+        if command.split()[0] in (':get', ':put'):
+            self.transfer_command(command)
+            return
+        
+        # File pleine (coupure longue ou canal bloqué) : refuser plutôt que
+        # de tout garder en mémoire
+        if len(self.outbox) >= COMMAND_QUEUE_LIMIT:
+            self.add_output(f"Erreur: {len(self.outbox)} commandes déjà en attente, réessayez plus tard\n")
+            return
+        
+        self._remember(command)
+        
+        # Afficher la commande dans le terminal
+        self.add_output(f"$ {command}\n")
+        
+        # Confier la commande au thread de supervision, qui l'envoie dès que
+        # la connexion et la fenêtre SSH le permettent
+        self.outbox.append(command + '\n')
+        self.wakeup.set()
+        if not self.connected:
+            self.add_output(f"(hors ligne : commande en attente, {len(self.outbox)} au total)\n")
+        
+        # Vider le champ de saisie
+        self.command_field.text = ""
+    
+    def _remember(self, command):
+        """Ajouter la commande à l'historique"""
+        self.history.add(command)
+    
+    def transfer_command(self, command):
+        """Transférer des fichiers par SFTP sur la connexion du terminal, avec progression
+        
+        « :get distant... » télécharge dans TRANSFER_DIR ; « :put local... »
+        envoie des fichiers de TRANSFER_DIR (ou d'un chemin absolu) dans le
+        dossier personnel distant.
+        """
+        client = self.ssh_client
+        if not self.connected or client is None:
+            self.add_output("Erreur: transfert impossible pendant la reconnexion\n")
+            return
         try:
-            # Ajouter la commande à l'historique
-            if command not in self.command_history:
-                self.command_history.append(command)
-            self.history_index = len(self.command_history)
-            
-            # Afficher la commande dans le terminal
-            self.add_output(f"$ {command}\n")
-            
-            # Envoyer la commande
-            self.ssh_channel.send(command + '\n')
-            
-            # Vider le champ de saisie
-            self.command_field.text = ""
-            
-        except Exception as e:
-            self.add_output(f"Erreur d'envoi: {str(e)}\n")
-    
-    def add_output(self, text):
-        """Ajouter du texte au terminal"""
-        def update_ui():
-            current_text = self.terminal_view.text
-            self.terminal_view.text = current_text + text
-            # Faire défiler vers le bas
-            self.terminal_view.content_offset = (0, max(0, self.terminal_view.content_size[1] - self.terminal_view.frame[3]))
-        
-        if threading.current_thread() != threading.main_thread():
-            ui.delay(update_ui, 0)
+            direction, *names = shlex.split(command[1:])
+        except ValueError as e:
+            self.add_output(f"Erreur: {e}\n")
+            return
+        if not names:
+            self.add_output(f"Usage: :{direction} fichier...\n")
+            return
+        self._remember(command)
+        self.command_field.text = ""
+        self.add_output(f"$ {command}\n")
+        if direction == 'get':
+            jobs = [('get', name, os.path.join(TRANSFER_DIR, os.path.basename(name))) for name in names]
         else:
-            update_ui()
+            jobs = [('put', os.path.join(TRANSFER_DIR, name), os.path.basename(name)) for name in names]
+        # Progression de chaque fichier ; une ligne récrite en place, deux fois par seconde au plus
+        progress = {}
+        last = 0
+        
+        def on_progress(name, done, total):
+            nonlocal last
+            progress[name] = (done, total)
+            now = time.monotonic()
+            if now - last >= 0.5:
+                last = now
+                done = sum(done for done, _ in progress.values())
+                total = sum(total for _, total in progress.values())
+                self.add_output(f"\r\x1b[K{len(progress)}/{len(jobs)} fichier(s) : "
+                                f"{done / 1e6:.1f} / {total / 1e6:.1f} Mo", raw=True)
+        
+        def run():
+            results = SFTPTransfers(client).run(jobs, on_progress)
+            self.add_output("\r\x1b[K", raw=True)
+            self.add_output(transfer_summary(results))
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def broadcast_command(self, hosts, command):
+        """Exécuter une commande sur plusieurs hôtes ; sortie préfixée par l'hôte, puis résumé"""
+        username = self.user_field.text or "tom"
+        password = self.pass_field.text
+        if not password:
+            self.add_output("Erreur: Mot de passe requis\n")
+            return
+        self._remember(command)
+        self.command_field.text = ""
+        self.add_output(f"$ {command}  ({len(hosts)} hôtes)\n")
+        width = max(len(host_label(*host)) for host in hosts)
+        
+        def on_output(host, line):
+            self.add_output(f"[{host:<{width}}] {line}\n")
+        
+        def run():
+            broadcast = Broadcast(self.pool, username, password)
+            self.add_output(broadcast_summary(broadcast.run(hosts, command, on_output)))
+        
+        threading.Thread(target=run, daemon=True).start()
+    
+    def add_output(self, text, raw=False):
+        """Ajouter du texte au terminal (affiché au prochain rendu, une fois par image au plus)
+        
+        `raw` : flux du shell, passé tel quel à l'émulateur ; sinon message
+        local, dont les fins de ligne deviennent CR LF.
+        """
+        if not raw:
+            text = text.replace('\n', '\r\n')
+        with self.output_lock:
+            self.output_buffer.append(text)
+            self.output_size += len(text)
+            if self.flush_pending:
+                return
+            self.flush_pending = True
+        ui.delay(self._flush_output, FRAME_INTERVAL)
+    
+    def _flush_output(self):
+        """Passer la sortie en attente à l'émulateur, puis afficher l'écran"""
+        with self.output_lock:
+            text = ''.join(self.output_buffer)
+            self.output_buffer = []
+            self.output_size = 0
+            self.flush_pending = False
+            self.output_drained.notify_all()
+        self.screen.feed(text)
+        if self.screen.replies:
+            replies, self.screen.replies = ''.join(self.screen.replies), []
+            try:
+                if self.connected and self.ssh_channel:
+                    self.ssh_channel.send(replies)
+            except Exception:
+                pass
+        self.terminal_view.text = self._screen_text()
+        # Faire défiler vers le bas
+        self.terminal_view.content_offset = (0, max(0, self.terminal_view.content_size[1] - self.terminal_view.frame[3]))
+    
+    def _screen_text(self):
+        """Texte de la vue : scrollback puis lignes de l'écran (seules les modifiées sont reconverties)"""
+        screen = self.screen
+        lines, _ = screen.render()
+        if screen.alternate is not None:
+            return '\n'.join(lines)
+        # Écran principal : les lignes vides sous le curseur ne sont pas affichées
+        end = len(lines)
+        while end > screen.y + 1 and not lines[end - 1]:
+            end -= 1
+        if not screen.scrollback:
+            return '\n'.join(lines[:end])
+        return '\n'.join(screen.scrollback) + '\n' + '\n'.join(lines[:end])
     
     def clear_terminal(self, sender):
         """Vider l'affichage du terminal"""
+        self.screen.clear()
         self.terminal_view.text = ""
     
     def show_history(self, sender):
-        """Afficher l'historique des commandes"""
-        if not self.command_history:
+        """Afficher l'historique des commandes
+        
+        Champ de saisie vide : les 10 dernières commandes. Sinon, recherche
+        façon reverse-i-search : commandes commençant par le texte saisi, puis
+        celles qui en contiennent les caractères dans l'ordre ; la meilleure
+        remplace la saisie.
+        """
+        if not len(self.history):
             self.add_output("Aucun historique de commandes\n")
             return
         
-        self.add_output("\n=== Historique des commandes ===\n")
-        for i, cmd in enumerate(self.command_history[-10:], 1):  # 10 dernières commandes
+        query = self.command_field.text.strip()
+        if query:
+            matches = self.history.prefix(query)
+            matches += [cmd for cmd in self.history.search(query) if cmd not in matches][:10 - len(matches)]
+            if not matches:
+                self.add_output(f"(reverse-i-search) '{query}' : aucune commande\n")
+                return
+            self.add_output(f"\n=== (reverse-i-search) '{query}' ===\n")
+            self.command_field.text = matches[0]
+        else:
+            matches = self.history.recent(10)
+            self.add_output(f"\n=== Historique des commandes ({len(self.history)}) ===\n")
+        for i, cmd in enumerate(matches, 1):
             self.add_output(f"{i}. {cmd}\n")
         self.add_output("================================\n\n")
     
-    def present(self):
+    def new_tab(self, sender):
+        """Ouvrir un autre terminal sur le même hôte, par la même connexion"""
+        tab = SSHTerminal(self.scrollback_lines, pool=self.pool)
+        tab.host_field.text = self.host_field.text
+        tab.user_field.text = self.user_field.text
+        tab.pass_field.text = self.pass_field.text
+        tab.port = self.port
+        tab.present('panel')
+        tab.connect_ssh()
+    
+    def present(self, style='fullscreen'):
         """Afficher l'interface"""
-        self.view.present('fullscreen')
+        self.view.present(style)
     
     def will_close(self):
         """Nettoyage avant fermeture"""
-        if self.connected:
+        if self.connected or self.supervised:
             self.disconnect_ssh()
 
 def main():
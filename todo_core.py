@@ -0,0 +1,2525 @@
+# Seuls les modules nécessaires à toutes les commandes sont importés ici ;
+# les autres (asyncio, sqlite3, argparse...) le sont là où ils servent, pour
+# garder un démarrage rapide aux appels fréquents (list, add, done).
+import bisect
+import contextlib
+import itertools
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # pas de verrou consultatif hors POSIX
+    fcntl = None
+
+TASKS_FILE = 'tasks.json'
+DB_FILE = 'tasks.db'
+BINARY_FILE = 'tasks.bin'
+JOURNAL_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+SEARCH_SUFFIX = '.search'
+META_SUFFIX = '.meta'
+CACHE_SUFFIX = '.cache'
+STALE_SUFFIX = '.stale'
+SOCKET_FILE = 'tasks.sock'
+LOCK_SUFFIX = '.lock'
+UNDO_SUFFIX = '.undo'
+REDO_SUFFIX = '.redo'
+# Attente maximale du verrou d'écriture, en secondes.
+LOCK_TIMEOUT = 10
+# Le journal est compacté dans le snapshot dès qu'il dépasse la moitié de sa
+# taille (avec un minimum), ce qui garde un coût amorti constant par opération.
+COMPACT_MIN_BYTES = 1 << 20
+# Au-delà, le snapshot JSON est lu en flux plutôt que depuis son cache, qui
+# est chargé en entier (la mémoire d'un `list` resterait proportionnelle au fichier).
+CACHE_MAX_BYTES = 64 << 20
+# En-tête du cache : magic, version de marshal, taille, mtime et SHA-1 du snapshot.
+CACHE_HEADER = struct.Struct('<8sIQq20s')
+CACHE_MAGIC = b'TODOCCH2'
+# Nombre d'opérations annulables conservées (0 : pas d'historique).
+HISTORY_LIMIT = 1000
+
+# Drapeaux d'une entrée de l'index
+LIVE, DONE, IN_JOURNAL = 1, 2, 4
+
+# Métadonnées facultatives d'une tâche : priorité (1 à 3), échéance
+# (AAAA-MM-JJ) et étiquettes. Une tâche sans métadonnées n'a aucune de ces clés.
+META_FIELDS = ('priority', 'due', 'tags')
+PRIORITIES = {'low': 1, 'normal': 2, 'high': 3}
+PRIORITY_NAMES = {value: name for name, value in PRIORITIES.items()}
+
+
+class Tracer:
+    """Durée de chaque phase d'une commande, une ligne JSON par phase.
+
+    Activé par --profile ou la variable TODO_TRACE (1 : sur stderr, sinon
+    chemin d'un fichier complété à chaque commande). `blocks` est la
+    variation du nombre de blocs mémoire alloués pendant la phase ; `parent`
+    la phase englobante (un fsync a lieu pendant une sauvegarde...).
+    """
+
+    def __init__(self, out):
+        self.out = out
+        self.command = None
+        self.stack = []
+
+    def record(self, name, start, blocks):
+        line = {'command': self.command, 'phase': name, 'parent': self.stack[-1] if self.stack else None,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+                'blocks': sys.getallocatedblocks() - blocks, 'pid': os.getpid()}
+        self.out.write(json.dumps(line) + '\n')
+        self.out.flush()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start, blocks = time.perf_counter(), sys.getallocatedblocks()
+        self.stack.append(name)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            self.record(name, start, blocks)
+
+
+TRACER = None
+_UNTRACED = contextlib.nullcontext()
+
+
+def phase(name):
+    """Contexte mesurant la phase `name` ; sans traçage, un contexte vide partagé qui ne mesure rien."""
+    return _UNTRACED if TRACER is None else TRACER.phase(name)
+
+
+def task_meta(task):
+    """Métadonnées renseignées de `task`."""
+    return {field: task[field] for field in META_FIELDS if task.get(field)}
+
+
+def new_task(task_id, value):
+    """Tâche `task_id` décrite par un titre seul ou par un dict (titre, statut, métadonnées)."""
+    if isinstance(value, str):
+        return {'id': task_id, 'title': value, 'done': False}
+    return dict({'id': task_id, 'title': value['title'], 'done': bool(value.get('done'))}, **task_meta(value))
+
+
+def meta_changes(task, changes):
+    """Valeurs actuelles de `task` pour les champs que `changes` modifie : l'op ('set') qui les rétablit."""
+    return dict({field: task.get(field) for field in META_FIELDS if field in changes}, id=task['id'])
+
+
+def with_meta(task, changes):
+    """Copie de `task` dont les métadonnées présentes dans `changes` sont remplacées (None : effacée)."""
+    meta = dict(task_meta(task), **{field: changes[field] for field in META_FIELDS if field in changes})
+    return dict({key: value for key, value in task.items() if key not in META_FIELDS}, **task_meta(meta))
+
+
+def load_tasks(path=TASKS_FILE):
+    with phase('load'):
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return []
+        with f, phase('decode'):
+            return json.load(f)
+
+
+def cache_header(st, digest):
+    import marshal
+    return CACHE_HEADER.pack(CACHE_MAGIC, marshal.version, st.st_size, st.st_mtime_ns, bytes.fromhex(digest))
+
+
+def read_cache(f, digest):
+    """Tâches (TaskList) du snapshot JSON ouvert `f`, lues depuis son cache `<snapshot>.cache`, ou None.
+
+    Le cache est la TaskList du snapshot en colonnes sérialisées par
+    marshal, derrière un en-tête qui identifie le snapshot dont elle vient :
+    taille, mtime et empreinte SHA-1 du contenu, celle que la compaction a
+    notée dans l'en-tête du journal. Le relire ne parse aucun JSON et ne
+    crée aucun objet par tâche.
+    """
+    st = os.fstat(f.fileno())
+    if st.st_size > CACHE_MAX_BYTES:
+        return None
+    import marshal
+    try:
+        with open(f.name + CACHE_SUFFIX, 'rb') as c:
+            if c.read(CACHE_HEADER.size) != cache_header(st, digest):
+                return None
+            with phase('cache'):
+                return TaskList.from_columns(marshal.loads(c.read()))
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+
+def write_cache(path, digest, tasks):
+    """Écrire le cache du snapshot JSON `path` (empreinte `digest`), dont `tasks` (TaskList) est le contenu."""
+    import marshal
+    st = os.stat(path)
+    if st.st_size > CACHE_MAX_BYTES:
+        return
+    cache = path + CACHE_SUFFIX
+    tmp = cache + '.tmp'
+    try:
+        with open(tmp, 'wb') as c:
+            c.write(cache_header(st, digest))
+            c.write(marshal.dumps(tasks.columns()))
+        os.replace(tmp, cache)
+    except OSError:
+        pass
+
+
+def save_tasks(tasks, path=TASKS_FILE):
+    """Écrire le snapshot et renvoyer l'offset de chaque tâche dans le fichier.
+
+    Le fichier reste un tableau JSON, avec une tâche par ligne pour que
+    l'index puisse en relire une seule sans parser tout le reste.
+    """
+    offsets = array('Q')
+    pos = 2
+    last = len(tasks) - 1
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(b'[\n')
+        for i, task in enumerate(tasks):
+            line = b'  ' + json.dumps(task, ensure_ascii=False).encode('utf-8')
+            line += b',\n' if i < last else b'\n'
+            f.write(line)
+            offsets.append(pos)
+            pos += len(line)
+        f.write(b']\n')
+        f.flush()
+        with phase('fsync'):
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+    # Le cache ne correspondrait plus (sa clé le dirait) : autant libérer la place.
+    try:
+        os.remove(path + CACHE_SUFFIX)
+    except FileNotFoundError:
+        pass
+    return offsets
+
+
+def iter_snapshot(f):
+    """Parcourir le snapshot ouvert `f` tâche par tâche, sans le charger en entier."""
+    with f:
+        if f.readline().strip() == b'[':
+            for line in f:
+                line = line.strip()
+                if line == b']':
+                    return
+                try:
+                    task = json.loads(line.rstrip(b','))
+                except ValueError:
+                    break
+                yield task
+            else:
+                return
+        # Ancien format indenté (toujours sur la première tâche) : parse complet.
+        f.seek(0)
+        yield from json.load(f)
+
+
+@contextlib.contextmanager
+def file_lock(path, timeout=LOCK_TIMEOUT):
+    """Verrou consultatif exclusif sur `path`, attendu au plus `timeout` secondes."""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            deadline = time.monotonic() + timeout
+            delay = 0.001
+            with phase('lock'):
+                while True:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise TimeoutError(f'verrou {path} toujours pris après {timeout} s')
+                        time.sleep(delay)
+                        delay = min(delay * 2, 0.02)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def write_atomic(path, data):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        with phase('fsync'):
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_line_at(path, offset):
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        return json.loads(f.readline().strip().rstrip(b','))
+
+
+class JsonSnapshot:
+    """Snapshot `tasks.json` : tableau JSON, une tâche par ligne, lu en flux."""
+
+    save = staticmethod(save_tasks)
+    iterate = staticmethod(iter_snapshot)
+
+    @staticmethod
+    def load(f):
+        return json.load(f)
+
+    @staticmethod
+    def read_at(path, offset):
+        return read_line_at(path, offset)
+
+
+class BinarySnapshot:
+    """Snapshot binaire en colonnes, lu par mmap.
+
+    En-tête (magic, nombre de tâches), ids en uint64, bitmap des tâches
+    terminées, puis les titres UTF-8 préfixés par leur longueur, à la suite.
+    Les ids sont triés (ordre d'insertion) : retrouver une tâche est une
+    recherche dichotomique, et les compteurs ne décodent aucun titre.
+    Quand le bit de poids fort de la longueur est levé, le titre est suivi
+    des métadonnées de la tâche en JSON, elles aussi préfixées par leur longueur.
+    """
+
+    HEADER = struct.Struct('<8sQ')
+    LENGTH = struct.Struct('<I')
+    HAS_META = 1 << 31
+    MAGIC = b'TODOBIN1'
+
+    def __init__(self, f):
+        import mmap
+        self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = self.HEADER.unpack_from(self.map)
+        if magic != self.MAGIC:
+            raise ValueError(f'{f.name}: snapshot binaire invalide')
+        view = memoryview(self.map)
+        start = self.HEADER.size
+        bitmap_start = start + 8 * self.count
+        if sys.byteorder == 'little':
+            self.ids = view[start:bitmap_start].cast('Q')
+        else:
+            self.ids = array('Q', view[start:bitmap_start])
+            self.ids.byteswap()
+        self.titles_start = bitmap_start + (self.count + 7) // 8
+        self.bitmap = view[bitmap_start:self.titles_start]
+
+    def is_done(self, position):
+        return bool(self.bitmap[position >> 3] >> (position & 7) & 1)
+
+    def position(self, task_id):
+        pos = bisect.bisect_left(self.ids, task_id)
+        return pos if pos < self.count and self.ids[pos] == task_id else None
+
+    def done_count(self):
+        return int.from_bytes(self.bitmap, 'little').bit_count()
+
+    def _entry(self, pos):
+        """(titre, métadonnées, position suivante) de l'entrée à `pos`."""
+        (size,) = self.LENGTH.unpack_from(self.map, pos)
+        pos += self.LENGTH.size
+        end = pos + (size & ~self.HAS_META)
+        title, meta = self.map[pos:end].decode('utf-8'), None
+        if size & self.HAS_META:
+            (size,) = self.LENGTH.unpack_from(self.map, end)
+            pos = end + self.LENGTH.size
+            end = pos + size
+            meta = json.loads(self.map[pos:end])
+        return title, meta, end
+
+    def __iter__(self):
+        pos = self.titles_start
+        for i in range(self.count):
+            title, meta, pos = self._entry(pos)
+            task = {'id': self.ids[i], 'title': title, 'done': self.is_done(i)}
+            if meta:
+                task.update(meta)
+            yield task
+
+    @classmethod
+    def save(cls, tasks, path):
+        ids = array('Q', (task['id'] for task in tasks))
+        if sys.byteorder != 'little':
+            ids.byteswap()
+        bitmap = bytearray((len(tasks) + 7) // 8)
+        chunks, offsets = [], array('Q')
+        pos = cls.HEADER.size + 8 * len(tasks) + len(bitmap)
+        for i, task in enumerate(tasks):
+            if task.get('done'):
+                bitmap[i >> 3] |= 1 << (i & 7)
+            title = task['title'].encode('utf-8')
+            meta = task_meta(task)
+            if meta:
+                meta = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+                chunks.append(cls.LENGTH.pack(len(title) | cls.HAS_META) + title + cls.LENGTH.pack(len(meta)) + meta)
+            else:
+                chunks.append(cls.LENGTH.pack(len(title)) + title)
+            offsets.append(pos)
+            pos += len(chunks[-1])
+        write_atomic(path, cls.HEADER.pack(cls.MAGIC, len(tasks)) + ids.tobytes() + bitmap + b''.join(chunks))
+        return offsets
+
+    @classmethod
+    def iterate(cls, f):
+        with f:
+            yield from cls(f)
+
+    @classmethod
+    def load(cls, f):
+        return list(cls(f))
+
+    @classmethod
+    def read_at(cls, path, offset):
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            (size,) = cls.LENGTH.unpack(f.read(cls.LENGTH.size))
+            task = {'title': f.read(size & ~cls.HAS_META).decode('utf-8')}
+            if size & cls.HAS_META:
+                (size,) = cls.LENGTH.unpack(f.read(cls.LENGTH.size))
+                task.update(json.loads(f.read(size)))
+            return task
+
+
+def file_digest(f):
+    """Empreinte SHA-1 (hexadécimale) du contenu du fichier ouvert `f` ; sa position est conservée."""
+    import hashlib
+    pos = f.tell()
+    f.seek(0)
+    digest = hashlib.sha1(usedforsecurity=False)
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+        digest.update(chunk)
+    f.seek(pos)
+    return digest.hexdigest()
+
+
+def _parse_header(line, snapshot, digest=None):
+    """En-tête du journal s'il s'applique au snapshot `snapshot` (taille, mtime), sinon None.
+
+    Une copie, une restauration ou un `touch` changent le mtime sans toucher
+    au contenu : si seule la taille correspond, l'empreinte `digest()` du
+    snapshot est comparée à celle que la compaction a notée dans l'en-tête.
+    """
+    try:
+        header = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(header, dict):
+        return None
+    pinned = header.get('snapshot')
+    if pinned == snapshot:
+        return header
+    if (digest is not None and snapshot is not None and isinstance(pinned, list) and pinned[:1] == snapshot[:1]
+            and header.get('digest') is not None and header['digest'] == digest()):
+        return header
+    return None
+
+
+class TaskIndex:
+    """Index disque id -> (drapeaux, offset) à entrées de taille fixe.
+
+    L'entrée d'une tâche se trouve à une position calculée depuis son id :
+    la lire ou la modifier coûte un seek. L'en-tête indique le snapshot
+    indexé, les octets du journal déjà reportés et le prochain id.
+    """
+
+    HEADER = struct.Struct('<8s4Q')
+    ENTRY = struct.Struct('<BQ')
+    MAGIC = b'TODOIDX1'
+
+    def __init__(self, f):
+        self.f = f
+        self.snapshot = None
+        self.covered = 0
+        self.next_id = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.f.close()
+
+    @classmethod
+    def build(cls, path, snapshot, covered, next_id, tasks, offsets):
+        entries = bytearray(cls.HEADER.size + cls.ENTRY.size * next_id)
+        cls.HEADER.pack_into(entries, 0, cls.MAGIC, *snapshot, covered, next_id)
+        for task, offset in zip(tasks, offsets):
+            flags = LIVE | (DONE if task['done'] else 0)
+            cls.ENTRY.pack_into(entries, cls.HEADER.size + task['id'] * cls.ENTRY.size, flags, offset)
+        write_atomic(path, entries)
+
+    def read_header(self):
+        self.f.seek(0)
+        data = self.f.read(self.HEADER.size)
+        if len(data) < self.HEADER.size:
+            return False
+        magic, size, mtime, self.covered, self.next_id = self.HEADER.unpack(data)
+        self.snapshot = [size, mtime]
+        return magic == self.MAGIC
+
+    def commit(self):
+        self.f.seek(0)
+        self.f.write(self.HEADER.pack(self.MAGIC, *self.snapshot, self.covered, self.next_id))
+
+    def get(self, task_id):
+        if task_id < 1:
+            return 0, 0
+        self.f.seek(self.HEADER.size + task_id * self.ENTRY.size)
+        data = self.f.read(self.ENTRY.size)
+        if len(data) < self.ENTRY.size:
+            return 0, 0
+        return self.ENTRY.unpack(data)
+
+    def put(self, task_id, flags, offset):
+        self.f.seek(self.HEADER.size + task_id * self.ENTRY.size)
+        self.f.write(self.ENTRY.pack(flags, offset))
+
+    def apply(self, record, offset):
+        task_id = record['id']
+        if record['op'] in ('add', 'restore'):
+            self.put(task_id, LIVE | IN_JOURNAL | (DONE if record.get('done') else 0), offset)
+            self.next_id = max(self.next_id, task_id + 1)
+        elif record['op'] in ('done', 'undone'):
+            flags, task_offset = self.get(task_id)
+            if flags & LIVE:
+                self.put(task_id, flags | DONE if record['op'] == 'done' else flags & ~DONE, task_offset)
+        elif record['op'] == 'set':
+            # L'enregistrement porte la tâche entière : il devient sa source.
+            flags, _ = self.get(task_id)
+            if flags & LIVE:
+                self.put(task_id, flags & (LIVE | DONE) | IN_JOURNAL, offset)
+        elif record['op'] == 'remove':
+            self.put(task_id, 0, 0)
+
+
+def fold(text):
+    """Minuscules sans accents : « Réunion » et « reunion » donnent le même terme."""
+    import unicodedata
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    import re
+    return set(re.findall(r'\w+', fold(text)))
+
+
+class SidecarIndex:
+    """Index dérivé des tâches, dans un fichier à part, mis à jour par chaque lot sous le verrou d'écriture.
+
+    Pendant un lot, un marqueur `<index>.stale` signale l'index comme
+    périmé : si le processus s'arrête entre la mutation et la mise à jour de
+    l'index, le marqueur reste et la requête suivante le reconstruit.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def fresh(self):
+        return os.path.exists(self.path) and not os.path.exists(self.path + STALE_SUFFIX)
+
+    @contextlib.contextmanager
+    def pending(self):
+        marker = self.path + STALE_SUFFIX
+        # Un marqueur déjà posé (lot interrompu) reste jusqu'à la reconstruction.
+        if not os.path.exists(self.path) or os.path.exists(marker):
+            yield
+            return
+        open(marker, 'wb').close()
+        yield
+        os.remove(marker)
+
+    def _install(self, tmp):
+        os.replace(tmp, self.path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path + STALE_SUFFIX)
+
+
+class SearchIndex(SidecarIndex):
+    """Index inversé persistant des titres, dans une base SQLite à part.
+
+    Les postings (terme, id) sont triés par terme : une recherche par préfixe
+    est un parcours d'intervalle de la clé primaire. L'index n'est créé qu'à
+    la première recherche ; tant qu'il n'existe pas, les mises à jour sont ignorées.
+    """
+
+    def _connect(self, path=None):
+        import sqlite3
+        conn = sqlite3.connect(path or self.path)
+        conn.execute('CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, title TEXT, done INTEGER)')
+        conn.execute('CREATE TABLE IF NOT EXISTS postings ('
+                     'term TEXT, id INTEGER, PRIMARY KEY (term, id)) WITHOUT ROWID')
+        return conn
+
+    def _insert(self, conn, tasks):
+        tasks = list(tasks)
+        conn.executemany('INSERT OR REPLACE INTO docs VALUES (?, ?, ?)',
+                         ((t['id'], t['title'], int(bool(t.get('done')))) for t in tasks))
+        conn.executemany('INSERT OR IGNORE INTO postings VALUES (?, ?)',
+                         ((term, t['id']) for t in tasks for term in tokenize(t['title'])))
+
+    def rebuild(self, tasks):
+        tmp = self.path + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = self._connect(tmp)
+        count = 0
+        with conn:
+            for chunk in iter(lambda: list(itertools.islice(tasks, 10000)), []):
+                self._insert(conn, chunk)
+                count += len(chunk)
+        conn.close()
+        self._install(tmp)
+        return count
+
+    def update(self, ops, results):
+        if not os.path.exists(self.path):
+            return
+        conn = self._connect()
+        with conn:
+            for (op, _), task in zip(ops, results):
+                if task is None:
+                    continue
+                if op in ('add', 'restore'):
+                    self._insert(conn, [task])
+                elif op in ('done', 'undone'):
+                    conn.execute('UPDATE docs SET done = ? WHERE id = ?', (int(op == 'done'), task['id']))
+                elif op == 'remove':
+                    conn.execute('DELETE FROM docs WHERE id = ?', (task['id'],))
+                    conn.executemany('DELETE FROM postings WHERE term = ? AND id = ?',
+                                     ((term, task['id']) for term in tokenize(task['title'])))
+        conn.close()
+
+    def search(self, query, limit=20):
+        """Tâches dont chaque mot de `query` préfixe un mot du titre, les meilleures d'abord.
+
+        Seuls les postings du mot le plus rare sont parcourus, des plus récents
+        aux plus anciens ; les autres mots sont vérifiés sur le titre des
+        candidats. Un mot retrouvé en entier compte double ; à score égal, les
+        tâches les plus récentes d'abord.
+        """
+        import heapq
+        words = sorted(tokenize(query))
+        if not words:
+            return []
+        conn = self._connect()
+        bounds = {word: (word, word + '\U0010ffff') for word in words}
+        rarest = min(words, key=lambda word: conn.execute(
+            'SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE term >= ? AND term < ? LIMIT 10000)',
+            bounds[word]).fetchone()[0])
+        # Meilleur score possible : s'il est atteint par `limit` tâches, les
+        # suivantes (plus anciennes) ne peuvent plus entrer dans le classement.
+        top = sum(2 if conn.execute('SELECT 1 FROM postings WHERE term = ? LIMIT 1', (word,)).fetchone()
+                  else 1 for word in words)
+        best, seen = [], set()
+        ids = conn.execute('SELECT id FROM postings WHERE term >= ? AND term < ? ORDER BY id DESC',
+                           bounds[rarest])
+        for (task_id,) in ids:
+            if len(best) == limit and best[0][0] == top:
+                break
+            if task_id in seen:
+                continue
+            seen.add(task_id)
+            title, done = conn.execute('SELECT title, done FROM docs WHERE id = ?', (task_id,)).fetchone()
+            terms = tokenize(title)
+            score = 0
+            for word in words:
+                if word in terms:
+                    score += 2
+                elif any(term.startswith(word) for term in terms):
+                    score += 1
+                else:
+                    break
+            else:
+                entry = (score, task_id, title, done)
+                if len(best) < limit:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+        conn.close()
+        return [{'id': task_id, 'title': title, 'done': bool(done)}
+                for _, task_id, title, done in sorted(best, reverse=True)]
+
+
+class MetaIndex(SidecarIndex):
+    """Index secondaires des métadonnées (échéance, priorité, étiquettes), dans une base SQLite à part.
+
+    Seules les tâches qui ont des métadonnées y figurent. Les index B-tree
+    (done, due), (done, priority) et (tag, id) rendent une requête comme
+    « en retard, priorité haute, étiquette prod » en O(log n + k) sur le
+    critère le plus sélectif. Comme l'index de recherche, il n'est créé qu'à
+    la première requête puis suit chaque lot.
+    """
+
+    def _connect(self, path=None):
+        import sqlite3
+        conn = sqlite3.connect(path or self.path)
+        conn.execute('CREATE TABLE IF NOT EXISTS meta ('
+                     'id INTEGER PRIMARY KEY, done INTEGER, priority INTEGER, due TEXT)')
+        conn.execute('CREATE INDEX IF NOT EXISTS meta_due ON meta (done, due, id) WHERE due IS NOT NULL')
+        conn.execute('CREATE INDEX IF NOT EXISTS meta_priority ON meta (done, priority, id) '
+                     'WHERE priority IS NOT NULL')
+        conn.execute('CREATE TABLE IF NOT EXISTS tags ('
+                     'tag TEXT, id INTEGER, PRIMARY KEY (tag, id)) WITHOUT ROWID')
+        return conn
+
+    def _insert(self, conn, tasks):
+        tasks = [t for t in tasks if task_meta(t)]
+        conn.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)',
+                         ((t['id'], int(bool(t.get('done'))), t.get('priority'), t.get('due')) for t in tasks))
+        conn.executemany('INSERT OR IGNORE INTO tags VALUES (?, ?)',
+                         ((tag, t['id']) for t in tasks for tag in t.get('tags', ())))
+
+    def _delete(self, conn, task_id):
+        conn.execute('DELETE FROM meta WHERE id = ?', (task_id,))
+        conn.execute('DELETE FROM tags WHERE id = ?', (task_id,))
+
+    def rebuild(self, tasks):
+        tmp = self.path + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        conn = self._connect(tmp)
+        count = 0
+        with conn:
+            for chunk in iter(lambda: list(itertools.islice(tasks, 10000)), []):
+                self._insert(conn, chunk)
+                count += len(chunk)
+        # Statistiques pour que SQLite parte de l'index le plus sélectif.
+        conn.execute('ANALYZE')
+        conn.close()
+        self._install(tmp)
+        return count
+
+    def update(self, ops, results):
+        if not os.path.exists(self.path):
+            return
+        conn = self._connect()
+        with conn:
+            for (op, _), task in zip(ops, results):
+                if task is None:
+                    continue
+                if op in ('add', 'restore', 'set'):
+                    self._delete(conn, task['id'])
+                    self._insert(conn, [task])
+                elif op in ('done', 'undone'):
+                    conn.execute('UPDATE meta SET done = ? WHERE id = ?', (int(op == 'done'), task['id']))
+                elif op == 'remove':
+                    self._delete(conn, task['id'])
+        conn.close()
+
+    def query(self, due_before=None, min_priority=None, tags=(), include_done=False, limit=None):
+        """Ids des tâches retenues, par échéance si elle est un critère, sinon par id.
+
+        `due_before` est exclu (AAAA-MM-JJ), `min_priority` inclus ; chaque
+        étiquette de `tags` est exigée.
+        """
+        clauses, params = [], []
+        if not include_done:
+            clauses.append('done = 0')
+        if due_before is not None:
+            clauses.append('due < ?')
+            params.append(due_before)
+        if min_priority is not None:
+            clauses.append('priority >= ?')
+            params.append(min_priority)
+        for tag in tags:
+            clauses.append('id IN (SELECT id FROM tags WHERE tag = ?)')
+            params.append(tag)
+        sql = 'SELECT id FROM meta'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY due, id' if due_before is not None else ' ORDER BY id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        conn = self._connect()
+        ids = [task_id for (task_id,) in conn.execute(sql, params)]
+        conn.close()
+        return ids
+
+
+class TaskList:
+    """Tâches rangées en colonnes : ids, drapeaux et titres dans un tampon UTF-8 unique.
+
+    Une tâche y coûte une vingtaine d'octets plus son titre encodé, contre
+    plusieurs centaines sous forme de dict. Les ids sont croissants (ordre
+    d'insertion), une recherche par id est donc dichotomique. Une
+    suppression pose une pierre tombale (drapeaux à 0) ; elles sont purgées
+    quand elles dépassent la moitié des entrées. Les métadonnées, que peu de
+    tâches portent, sont à part dans un dict id -> métadonnées.
+    """
+
+    __slots__ = ('ids', 'flags', 'starts', 'titles', 'meta', 'removed')
+
+    def __init__(self, tasks=()):
+        self.ids = array('Q')
+        self.flags = bytearray()
+        self.starts = array('Q')
+        self.titles = bytearray()
+        self.meta = {}
+        self.removed = 0
+        for task in tasks:
+            self.append(task['id'], task['title'], task.get('done', False), task_meta(task))
+
+    def append(self, task_id, title, done=False, meta=None):
+        if self.ids and task_id <= self.ids[-1]:
+            raise ValueError(f'id {task_id} non croissant')
+        self.ids.append(task_id)
+        self.flags.append(LIVE | (DONE if done else 0))
+        self.starts.append(len(self.titles))
+        self.titles += title.encode('utf-8')
+        if meta:
+            self.meta[task_id] = meta
+
+    def columns(self):
+        """Colonnes sérialisables (marshal) ; `from_columns` les relit sans décoder aucun titre."""
+        ids, starts = array('Q', self.ids), array('Q', self.starts)
+        if sys.byteorder != 'little':
+            ids.byteswap()
+            starts.byteswap()
+        return ids.tobytes(), bytes(self.flags), starts.tobytes(), bytes(self.titles), self.meta, self.removed
+
+    @classmethod
+    def from_columns(cls, columns):
+        ids, flags, starts, titles, meta, removed = columns
+        tasks = cls()
+        tasks.ids.frombytes(ids)
+        tasks.starts.frombytes(starts)
+        if sys.byteorder != 'little':
+            tasks.ids.byteswap()
+            tasks.starts.byteswap()
+        tasks.flags, tasks.titles, tasks.meta, tasks.removed = bytearray(flags), bytearray(titles), meta, removed
+        return tasks
+
+    def copy(self):
+        clone = TaskList()
+        clone.ids, clone.flags = array('Q', self.ids), bytearray(self.flags)
+        clone.starts, clone.titles = array('Q', self.starts), bytearray(self.titles)
+        clone.meta = dict(self.meta)
+        clone.removed = self.removed
+        return clone
+
+    def __len__(self):
+        return len(self.ids) - self.removed
+
+    def __iter__(self):
+        for pos, flags in enumerate(self.flags):
+            if flags & LIVE:
+                yield self._task(pos)
+
+    def _position(self, task_id):
+        pos = bisect.bisect_left(self.ids, task_id)
+        if pos < len(self.ids) and self.ids[pos] == task_id and self.flags[pos] & LIVE:
+            return pos
+        return None
+
+    def _task(self, pos):
+        end = self.starts[pos + 1] if pos + 1 < len(self.starts) else len(self.titles)
+        task = {'id': self.ids[pos], 'title': self.titles[self.starts[pos]:end].decode('utf-8'),
+                'done': bool(self.flags[pos] & DONE)}
+        if self.meta and task['id'] in self.meta:
+            task.update(self.meta[task['id']])
+        return task
+
+    def get(self, task_id):
+        pos = self._position(task_id)
+        return None if pos is None else self._task(pos)
+
+    def id_at(self, index):
+        if not 0 <= index < len(self):
+            return None
+        if not self.removed:
+            return self.ids[index]
+        return next(itertools.islice((self.ids[pos] for pos, flags in enumerate(self.flags) if flags),
+                                     index, None))
+
+    def done_count(self):
+        return self.flags.count(LIVE | DONE)
+
+    def mark_done(self, task_id):
+        pos = self._position(task_id)
+        if pos is None:
+            return None
+        self.flags[pos] |= DONE
+        return self._task(pos)
+
+    def mark_pending(self, task_id):
+        pos = self._position(task_id)
+        if pos is None:
+            return None
+        self.flags[pos] &= ~DONE
+        return self._task(pos)
+
+    def remove(self, task_id):
+        pos = self._position(task_id)
+        if pos is None:
+            return None
+        task = self._task(pos)
+        self.flags[pos] = 0
+        self.meta.pop(task_id, None)
+        self.removed += 1
+        if self.removed * 2 > len(self.ids):
+            live = TaskList(self)
+            self.ids, self.flags, self.starts, self.titles = live.ids, live.flags, live.starts, live.titles
+            self.removed = 0
+        return task
+
+    def set_meta(self, task_id, meta):
+        """Remplacer les métadonnées d'une tâche."""
+        pos = self._position(task_id)
+        if pos is None:
+            return None
+        if meta:
+            self.meta[task_id] = meta
+        else:
+            self.meta.pop(task_id, None)
+        return self._task(pos)
+
+    def restore(self, task_id, title, done=False, meta=None):
+        """Remettre une tâche supprimée à sa place, sur sa pierre tombale si elle n'a pas été purgée."""
+        pos = bisect.bisect_left(self.ids, task_id)
+        if pos == len(self.ids):
+            self.append(task_id, title, done, meta)
+            return self._task(pos)
+        if self.ids[pos] == task_id:
+            if self.flags[pos] & LIVE:
+                return None
+            self.removed -= 1
+        else:
+            # Insertion au milieu : décaler les colonnes (cas rare, après une purge).
+            data = title.encode('utf-8')
+            start = self.starts[pos]
+            self.titles[start:start] = data
+            self.starts[pos:] = array('Q', itertools.chain([start], (s + len(data) for s in self.starts[pos:])))
+            self.ids.insert(pos, task_id)
+            self.flags.insert(pos, 0)
+        self.flags[pos] = LIVE | (DONE if done else 0)
+        if meta:
+            self.meta[task_id] = meta
+        return self._task(pos)
+
+
+class TitleSet:
+    """Empreintes 64 bits de titres, en adressage ouvert dans un tableau.
+
+    Huit octets par case, au plus une case sur deux occupée, au lieu d'une
+    chaîne et d'une entrée de set par titre. Deux titres de même empreinte
+    passent pour des doublons : à 64 bits, le risque est négligeable.
+    """
+
+    __slots__ = ('slots', 'count')
+
+    def __init__(self, titles=()):
+        self.slots = array('Q', bytes(8 * 1024))
+        self.count = 0
+        for title in titles:
+            self.add(title)
+
+    def _insert(self, key):
+        mask = len(self.slots) - 1
+        pos = key & mask
+        while self.slots[pos]:
+            if self.slots[pos] == key:
+                return False
+            pos = (pos + 1) & mask
+        self.slots[pos] = key
+        return True
+
+    def add(self, title):
+        """Ajouter `title` ; False s'il y était déjà."""
+        # 0 marque une case vide.
+        if not self._insert(hash(title) & 0xFFFFFFFFFFFFFFFF or 1):
+            return False
+        self.count += 1
+        if self.count * 2 > len(self.slots):
+            old, self.slots = self.slots, array('Q', bytes(16 * len(self.slots)))
+            for key in old:
+                if key:
+                    self._insert(key)
+        return True
+
+
+class History:
+    """Piles d'annulation et de rétablissement, une entrée JSON par ligne.
+
+    Une entrée ne garde que le delta inverse d'une opération : les ops qui
+    la défont, par exemple ('restore', tâche) pour une suppression. Empiler
+    ou dépiler ne lit et n'écrit que la fin du fichier. Au-delà de `limit`
+    entrées, les plus anciennes sont évincées ; la pile n'est réécrite
+    qu'une fois toutes les `limit` opérations.
+    """
+
+    def __init__(self, path, limit=HISTORY_LIMIT):
+        self.path = path
+        self.undo_path = path + UNDO_SUFFIX
+        self.redo_path = path + REDO_SUFFIX
+        self.limit = limit
+
+    @staticmethod
+    def _top(f):
+        """(offset, entrée) de la dernière ligne, lue depuis la fin du fichier."""
+        end = f.seek(0, os.SEEK_END)
+        size = 4096
+        while end:
+            start = max(0, end - size)
+            f.seek(start)
+            data = f.read(end - start)
+            cut = data.rfind(b'\n', 0, len(data) - 1)
+            if cut >= 0 or start == 0:
+                return start + cut + 1, json.loads(data[cut + 1:])
+            size *= 2
+        return 0, None
+
+    def peek(self, stack):
+        try:
+            with open(stack, 'rb') as f:
+                return self._top(f)[1]
+        except FileNotFoundError:
+            return None
+
+    def pop(self, stack):
+        with open(stack, 'r+b') as f:
+            f.truncate(self._top(f)[0])
+
+    def push(self, stack, label, ops):
+        with open(stack, 'a+b') as f:
+            top = self._top(f)[1]
+            seq = top['seq'] + 1 if top else 1
+            f.write(json.dumps({'seq': seq, 'label': label, 'ops': ops}, ensure_ascii=False).encode('utf-8') + b'\n')
+            f.seek(0)
+            first = json.loads(f.readline())['seq']
+        if seq - first >= 2 * self.limit:
+            kept = self.entries(stack)[-self.limit:]
+            write_atomic(stack, b''.join(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n'
+                                         for entry in kept))
+
+    def record(self, label, ops):
+        """Nouvelle opération : elle devient annulable et ce qui avait été annulé ne se rétablit plus."""
+        if os.path.exists(self.redo_path):
+            os.remove(self.redo_path)
+        if self.limit > 0:
+            self.push(self.undo_path, label, ops)
+
+    def entries(self, stack):
+        """Entrées de la pile, de la plus ancienne à la plus récente."""
+        try:
+            with open(stack, 'rb') as f:
+                return [json.loads(line) for line in f]
+        except FileNotFoundError:
+            return []
+
+
+def describe_ops(ops, results):
+    if len(ops) == 1:
+        return describe(ops[0][0], results[0])
+    return f'Lot de {len(ops)} opérations'
+
+
+class Store:
+    """Opérations communes aux moteurs, exprimées à partir de `apply`.
+
+    `apply` reçoit une suite de couples (op, valeur) — ('add', titre),
+    ('done', id) ou ('remove', id) — et les persiste en une seule fois ; une
+    tâche importée s'ajoute avec ('add', {'title': ..., 'done': ...}), et
+    ('set', {'id': ..., 'priority': ...}) change les métadonnées données.
+    elle renvoie pour chacune la tâche concernée, ou None si l'id est inconnu.
+    Chaque moteur fournit `_apply`, qui renvoie aussi les ops inverses de ce
+    qui a effectivement changé, dont ('undone', id) et ('restore', tâche) ;
+    l'historique et les index (recherche, métadonnées) suivent chaque lot,
+    sous le même verrou : deux lots ne peuvent pas les mettre à jour dans le
+    désordre.
+    """
+
+    @contextlib.contextmanager
+    def _lock(self):
+        with file_lock(self.path + LOCK_SUFFIX):
+            yield
+
+    def apply(self, ops):
+        with self._lock(), self.search.pending(), self.meta.pending():
+            with phase('mutation'):
+                results, undo = self._apply(ops)
+            if undo:
+                with phase('history'):
+                    self.history.record(describe_ops(ops, results), undo[::-1])
+            with phase('search'):
+                self.search.update(ops, results)
+                self.meta.update(ops, results)
+        return results
+
+    def rebuild_index(self, index, force=False):
+        """Reconstruire `index` (recherche ou métadonnées) s'il manque ou est périmé ; nombre de tâches indexées.
+
+        Sous le verrou d'écriture : aucun lot ne peut passer entre la lecture
+        des tâches et le remplacement de l'index. None s'il était à jour.
+        """
+        with self._lock():
+            if force or not index.fresh():
+                return index.rebuild(self.iter_tasks())
+        return None
+
+    @contextlib.contextmanager
+    def bulk(self):
+        """Suite de lots d'un import : un moteur peut reporter sa maintenance (compaction) à la fin."""
+        yield
+
+    def _replay(self, source, target):
+        """Appliquer l'entrée au sommet de la pile `source` ; son inverse passe sur `target`."""
+        with self._lock(), self.search.pending(), self.meta.pending():
+            entry = self.history.peek(source)
+            if entry is None:
+                return None
+            ops = [tuple(op) for op in entry['ops']]
+            results, inverse = self._apply(ops)
+            self.history.pop(source)
+            self.history.push(target, entry['label'], inverse[::-1])
+            self.search.update(ops, results)
+            self.meta.update(ops, results)
+        return entry['label'], ops, results
+
+    def undo(self):
+        """(libellé, ops, résultats) de l'opération annulée, ou None s'il n'y en a pas."""
+        return self._replay(self.history.undo_path, self.history.redo_path)
+
+    def redo(self):
+        return self._replay(self.history.redo_path, self.history.undo_path)
+
+    def load(self):
+        with phase('load'):
+            return TaskList(self.iter_tasks())
+
+    def counts(self):
+        """(nombre de tâches, nombre de tâches terminées)."""
+        total = done = 0
+        for task in self.iter_tasks():
+            total += 1
+            done += bool(task.get('done'))
+        return total, done
+
+    def add(self, title):
+        return self.apply([('add', title)])[0]
+
+    def done(self, task_id):
+        return self.apply([('done', task_id)])[0]
+
+    def remove(self, task_id):
+        return self.apply([('remove', task_id)])[0]
+
+
+class JournalStore(Store):
+    """Snapshot `tasks.json` + journal d'opérations en ajout seul + index des ids.
+
+    Le journal commence par une ligne d'en-tête qui identifie le snapshot
+    sur lequel il s'applique : taille, mtime et empreinte du contenu. Après
+    une compaction, l'ancien journal ne correspond plus et il est ignoré,
+    même si le processus a été interrompu avant de le remplacer ; un snapshot
+    copié ou restauré (autre mtime, même contenu) garde son journal. Un
+    journal ignoré qui contient des enregistrements est signalé, puis mis de
+    côté par la compaction suivante. L'index est un cache : s'il manque ou
+    ne correspond plus, une compaction le reconstruit.
+
+    Les écritures (et la compaction) se font sous un verrou de fichier ; les
+    lectures s'en passent grâce au contrôle de `_open_consistent`.
+    """
+
+    def __init__(self, path=TASKS_FILE, codec=JsonSnapshot):
+        self.path = path
+        self.codec = codec
+        self.journal = path + JOURNAL_SUFFIX
+        self.index_path = path + INDEX_SUFFIX
+        self.search = SearchIndex(path + SEARCH_SUFFIX)
+        self.meta = MetaIndex(path + META_SUFFIX)
+        self.history = History(path)
+        self.lock_path = path + LOCK_SUFFIX
+        self.next_id = 1
+        self.orphaned = False
+        self._locked = False
+        self._deferred = None
+
+    @contextlib.contextmanager
+    def _lock(self):
+        if self._locked:  # déjà détenu par l'appelant (compaction pendant une écriture)
+            yield
+            return
+        with file_lock(self.lock_path):
+            self._locked = True
+            try:
+                yield
+            finally:
+                self._locked = False
+
+    @contextlib.contextmanager
+    def bulk(self):
+        if self._deferred is not None:
+            yield
+            return
+        self._deferred = False
+        try:
+            yield
+        finally:
+            due, self._deferred = self._deferred, None
+            if due:
+                self.compact()
+
+    def _snapshot_id(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return [st.st_size, st.st_mtime_ns]
+
+    def _journal(self, snapshot, snap=None):
+        """En-tête du journal et flux de ses enregistrements, lus à la demande.
+
+        Le journal n'est modifié que par ajout (une compaction le remplace,
+        le fichier ouvert reste l'ancien) : le lire au fil de l'eau ne peut
+        faire voir que des enregistrements plus récents.
+        """
+        try:
+            f = open(self.journal, 'rb')
+        except FileNotFoundError:
+            return None, iter(())
+        header = _parse_header(f.readline(), snapshot, snap and (lambda: file_digest(snap)))
+        if header is None:
+            f.close()
+            return None, iter(())
+        return header, self._records(f)
+
+    @staticmethod
+    def _records(f):
+        with f:
+            for line in f:
+                # Une dernière ligne sans '\n' est un enregistrement en cours d'écriture.
+                if line.endswith(b'\n'):
+                    yield json.loads(line)
+
+    def _open_consistent(self):
+        """Snapshot ouvert et enregistrements du journal qui s'y appliquent.
+
+        Une compaction remplace le snapshot puis le journal. Si l'en-tête du
+        journal ne correspond pas au snapshot ouvert alors que celui-ci a été
+        remplacé entre-temps, la lecture recommence (contrôle optimiste).
+        """
+        while True:
+            try:
+                snap = open(self.path, 'rb')
+            except FileNotFoundError:
+                snap, snapshot = None, None
+            else:
+                st = os.fstat(snap.fileno())
+                snapshot = [st.st_size, st.st_mtime_ns]
+            header, records = self._journal(snapshot, snap)
+            if header is not None or self._snapshot_id() == snapshot:
+                if header is None and self._has_records():
+                    if not self.orphaned:
+                        print(f'Attention : {self.journal} ne correspond pas à {self.path}, '
+                              'ses modifications sont ignorées.', file=sys.stderr)
+                    self.orphaned = True
+                return snap, header, records
+            if snap is not None:
+                snap.close()
+
+    def _has_records(self):
+        try:
+            with open(self.journal, 'rb') as f:
+                f.readline()
+                return bool(f.readline())
+        except FileNotFoundError:
+            return False
+
+    def _snapshot_tasks(self, snap, header):
+        """Tâches du snapshot ouvert `snap` : sa TaskList en cache si elle correspond, sinon un flux de dicts."""
+        if snap is None:
+            return ()
+        if self.codec is JsonSnapshot and header is not None and header.get('digest'):
+            tasks = read_cache(snap, header['digest'])
+            if tasks is not None:
+                snap.close()
+                return tasks
+        return self.codec.iterate(snap)
+
+    def load(self):
+        snap, header, records = self._open_consistent()
+        return self._build(self._snapshot_tasks(snap, header), header, records)
+
+    def _build(self, source, header, records):
+        """TaskList des tâches du snapshot (`source`) auxquelles les enregistrements du journal sont appliqués."""
+        next_id = header.get('next_id', 1) if header else 1
+        if isinstance(source, TaskList):
+            tasks = source
+            if tasks.ids:
+                next_id = max(next_id, tasks.ids[-1] + 1)
+        else:
+            tasks = TaskList()
+            for task in source:
+                # Les snapshots antérieurs aux identifiants n'en ont aucun.
+                task_id = task.get('id', next_id)
+                tasks.append(task_id, task['title'], task.get('done', False), task_meta(task))
+                next_id = max(next_id, task_id + 1)
+        for record in records:
+            op = record['op']
+            if op == 'add':
+                task_id = record.get('id', next_id)
+                next_id = max(next_id, task_id + 1)
+                tasks.append(task_id, record['title'], record.get('done', False), task_meta(record))
+                continue
+            # Les journaux antérieurs aux identifiants désignent les tâches par position.
+            task_id = record['id'] if 'id' in record else tasks.id_at(record['index'])
+            if op == 'done':
+                tasks.mark_done(task_id)
+            elif op == 'undone':
+                tasks.mark_pending(task_id)
+            elif op == 'remove':
+                tasks.remove(task_id)
+            elif op == 'restore':
+                tasks.restore(task_id, record['title'], record['done'], task_meta(record))
+                next_id = max(next_id, task_id + 1)
+            elif op == 'set':
+                tasks.set_meta(task_id, task_meta(record))
+        self.next_id = next_id
+        return tasks
+
+    def compact(self):
+        with self._lock(), phase('compact'):
+            with phase('load'):
+                tasks = self.load()
+            with phase('save'):
+                offsets = self.codec.save(tasks, self.path)
+                with open(self.path, 'rb') as f:
+                    digest = file_digest(f)
+                if self.codec is JsonSnapshot:
+                    write_cache(self.path, digest, tasks)
+            snapshot = self._snapshot_id()
+            if self.orphaned:
+                # Le journal ignoré n'est pas écrasé : il reste à récupérer à la main.
+                kept = f'{self.journal}.{time.strftime("%Y%m%d-%H%M%S")}.rejected'
+                os.replace(self.journal, kept)
+                print(f'Journal ignoré conservé dans {kept}', file=sys.stderr)
+                self.orphaned = False
+            header = json.dumps({'snapshot': snapshot, 'digest': digest,
+                                 'next_id': self.next_id}).encode('utf-8') + b'\n'
+            write_atomic(self.journal, header)
+            TaskIndex.build(self.index_path, snapshot, len(header), self.next_id, tasks, offsets)
+
+    def _try_open_index(self):
+        try:
+            index = TaskIndex(open(self.index_path, 'r+b'))
+        except FileNotFoundError:
+            return None
+        snapshot = self._snapshot_id()
+        try:
+            with open(self.journal, 'rb') as j:
+                fresh = (index.read_header() and index.snapshot == snapshot
+                         and _parse_header(j.readline(), snapshot) is not None
+                         and j.seek(0, os.SEEK_END) >= index.covered)
+                if fresh:
+                    j.seek(index.covered)
+                    # Reporter les enregistrements complets écrits après la dernière mise à jour.
+                    for line in j.read().split(b'\n')[:-1]:
+                        index.apply(json.loads(line), index.covered)
+                        index.covered += len(line) + 1
+                    index.commit()
+                    return index
+        except FileNotFoundError:
+            pass
+        index.f.close()
+        return None
+
+    def _open_index(self):
+        index = self._try_open_index()
+        if index is None:
+            self.compact()
+            index = self._try_open_index()
+        return index
+
+    def _write(self, index, records):
+        """Journaliser `records` d'un bloc, les reporter dans l'index et dire si une compaction est due."""
+        lines = [json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n' for record in records]
+        with open(self.journal, 'r+b') as f, phase('save'):
+            # Écarte un éventuel enregistrement incomplet laissé par un crash.
+            f.truncate(index.covered)
+            f.seek(index.covered)
+            f.write(b''.join(lines))
+            f.flush()
+            with phase('fsync'):
+                os.fsync(f.fileno())
+        for record, line in zip(records, lines):
+            index.apply(record, index.covered)
+            index.covered += len(line)
+        index.commit()
+        return index.covered > max(COMPACT_MIN_BYTES, index.snapshot[0] // 2)
+
+    def _read_task(self, index, task_id):
+        flags, offset = index.get(task_id)
+        if not flags & LIVE:
+            return None
+        if flags & IN_JOURNAL:
+            source = read_line_at(self.journal, offset)
+        else:
+            source = self.codec.read_at(self.path, offset)
+        return dict({'id': task_id, 'title': source['title'], 'done': bool(flags & DONE)}, **task_meta(source))
+
+    def iter_tasks(self):
+        """Flux des tâches : le snapshot est lu ligne à ligne, seul le journal est gardé en mémoire."""
+        import heapq
+        snap, header, records = self._open_consistent()
+        # Tâches écrites dans le journal (ajouts, restaurations), ids du
+        # snapshot supprimés, statut et métadonnées modifiés de ceux qui
+        # restent. Une tâche du snapshot restaurée en est masquée : elle
+        # revient depuis `written`.
+        written, removed, status, meta = TaskList(), set(), {}, {}
+        for record in records:
+            if 'id' not in record:
+                break
+            task_id, op = record['id'], record['op']
+            if op == 'add':
+                written.append(task_id, record['title'], record.get('done', False), task_meta(record))
+            elif op == 'restore':
+                written.restore(task_id, record['title'], record['done'], task_meta(record))
+                status.pop(task_id, None)
+                meta.pop(task_id, None)
+            elif op == 'remove':
+                written.remove(task_id)
+                removed.add(task_id)
+            elif op == 'set':
+                if written.set_meta(task_id, task_meta(record)) is None:
+                    meta[task_id] = task_meta(record)
+            elif (written.mark_done if op == 'done' else written.mark_pending)(task_id) is None:
+                status[task_id] = op == 'done'
+        else:
+            snapshot_tasks = (task for task in self._snapshot_tasks(snap, header)
+                              if task.get('id') not in removed)
+            # Une tâche restaurée reprend sa place parmi celles du snapshot.
+            for task in heapq.merge(snapshot_tasks, written, key=lambda task: task.get('id', 0)):
+                if 'id' not in task:
+                    break
+                if task['id'] in status:
+                    task['done'] = status[task['id']]
+                if task['id'] in meta:
+                    task = with_meta(task, dict(dict.fromkeys(META_FIELDS), **meta[task['id']]))
+                yield task
+            else:
+                return
+        # Données antérieures aux identifiants (rencontrées avant toute tâche produite).
+        if snap is not None:
+            snap.close()
+        yield from self.load()
+
+    def counts(self):
+        if self.codec is not BinarySnapshot:
+            snap, header, records = self._open_consistent()
+            source = self._snapshot_tasks(snap, header)
+            if isinstance(source, TaskList):
+                # Snapshot en cache : compter sur les colonnes, sans créer de dict par tâche.
+                tasks = self._build(source, header, records)
+                return len(tasks), tasks.done_count()
+            if snap is not None:
+                snap.close()
+            return super().counts()
+        snap, _, records = self._open_consistent()
+        if snap is None:
+            return 0, 0
+        with snap:
+            binary = BinarySnapshot(snap)
+            total, done = binary.count, binary.done_count()
+            # Corriger les compteurs du snapshot avec l'état des tâches touchées par le journal.
+            touched = {}
+            for record in records:
+                task_id = record['id']
+                if task_id not in touched:
+                    pos = binary.position(task_id)
+                    touched[task_id] = None if pos is None else binary.is_done(pos)
+                if record['op'] in ('add', 'restore') and touched[task_id] is None:
+                    touched[task_id] = record.get('done', False)
+                    total += 1
+                    done += touched[task_id]
+                elif record['op'] == 'done' and touched[task_id] is False:
+                    touched[task_id] = True
+                    done += 1
+                elif record['op'] == 'undone' and touched[task_id] is True:
+                    touched[task_id] = False
+                    done -= 1
+                elif record['op'] == 'remove' and touched[task_id] is not None:
+                    total -= 1
+                    done -= touched[task_id]
+                    touched[task_id] = None
+        return total, done
+
+    def id_at(self, index):
+        if index < 0:
+            return None
+        task = next(itertools.islice(self.iter_tasks(), index, None), None)
+        return task['id'] if task else None
+
+    def get(self, task_id):
+        with self._lock(), self._open_index() as index:
+            return self._read_task(index, task_id)
+
+    def _apply(self, ops):
+        results, records, undo = [], [], []
+        # État des tâches touchées par le lot, qui prime sur l'index tant que
+        # le journal n'a pas été écrit.
+        pending = {}
+        with self._lock(), self._open_index() as index:
+            next_id = index.next_id
+            for op, value in ops:
+                if op == 'add':
+                    task = new_task(next_id, value)
+                    next_id += 1
+                    records.append(dict(task, op='add'))
+                    if not task['done']:
+                        del records[-1]['done']
+                    undo.append(('remove', task['id']))
+                    pending[task['id']] = task
+                    results.append(task)
+                    continue
+                task_id = value['id'] if op in ('restore', 'set') else value
+                task = pending[task_id] if task_id in pending else self._read_task(index, task_id)
+                if op == 'restore':
+                    # Une tâche toujours présente n'est pas dupliquée.
+                    task = None if task is not None else new_task(task_id, value)
+                    if task is not None:
+                        records.append(dict(task, op='restore'))
+                        undo.append(('remove', task_id))
+                        next_id = max(next_id, task_id + 1)
+                        pending[task_id] = task
+                elif task is not None and op == 'set':
+                    updated = with_meta(task, value)
+                    if updated != task:
+                        records.append(dict(updated, op='set'))
+                        undo.append(('set', meta_changes(task, value)))
+                        task = pending[task_id] = updated
+                elif task is not None and op == 'remove':
+                    records.append({'op': op, 'id': task_id})
+                    undo.append(('restore', task))
+                    pending[task_id] = None
+                elif task is not None and task['done'] != (op == 'done'):
+                    records.append({'op': op, 'id': task_id})
+                    undo.append(('undone' if op == 'done' else 'done', task_id))
+                    task = pending[task_id] = dict(task, done=op == 'done')
+                results.append(task)
+            if records and self._write(index, records):
+                if self._deferred is None:
+                    self.compact()
+                else:
+                    self._deferred = True
+        return results, undo
+
+
+class SqliteStore(Store):
+    """Tâches dans une base SQLite : une mutation ne touche qu'une ligne.
+
+    À la création de la base, le contenu de `tasks.json` (journal compris)
+    est importé une fois pour toutes, identifiants compris. Les colonnes des
+    métadonnées sont ajoutées aux bases antérieures (PRAGMA user_version).
+    """
+
+    COLUMNS = 'id, title, done, priority, due, tags'
+
+    def __init__(self, path=DB_FILE, tasks_file=TASKS_FILE):
+        self.path = path
+        self.search = SearchIndex(path + SEARCH_SUFFIX)
+        self.meta = MetaIndex(path + META_SUFFIX)
+        self.history = History(path)
+        created = not os.path.exists(path)
+        # Le service `serve` utilise le store depuis son unique thread d'écriture.
+        import sqlite3
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            # `id` (rowid) porte l'ordre d'insertion, l'index `tasks_done` le statut.
+            self.conn.execute('CREATE TABLE IF NOT EXISTS tasks ('
+                              'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                              'title TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0)')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS tasks_done ON tasks (done, id)')
+            if self.conn.execute('PRAGMA user_version').fetchone()[0] < 1:
+                for column in ('priority INTEGER', 'due TEXT', 'tags TEXT'):
+                    self.conn.execute(f'ALTER TABLE tasks ADD COLUMN {column}')
+                self.conn.execute('PRAGMA user_version = 1')
+        if created:
+            self.import_tasks(JournalStore(tasks_file).load())
+
+    @staticmethod
+    def _row(task):
+        """Valeurs des colonnes COLUMNS pour `task` ; les étiquettes sont une liste JSON."""
+        tags = task.get('tags')
+        return (task['id'], task['title'], int(bool(task.get('done'))), task.get('priority'), task.get('due'),
+                json.dumps(tags, ensure_ascii=False) if tags else None)
+
+    @staticmethod
+    def _task(row):
+        task_id, title, done, priority, due, tags = row
+        task = {'id': task_id, 'title': title, 'done': bool(done)}
+        if priority:
+            task['priority'] = priority
+        if due:
+            task['due'] = due
+        if tags:
+            task['tags'] = json.loads(tags)
+        return task
+
+    def import_tasks(self, tasks):
+        with self.conn:
+            self.conn.executemany(f'INSERT INTO tasks ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)',
+                                  map(self._row, tasks))
+
+    def iter_tasks(self):
+        for row in self.conn.execute(f'SELECT {self.COLUMNS} FROM tasks ORDER BY id'):
+            yield self._task(row)
+
+    def id_at(self, index):
+        if index < 0:
+            return None
+        row = self.conn.execute('SELECT id FROM tasks ORDER BY id LIMIT 1 OFFSET ?', (index,)).fetchone()
+        return row[0] if row else None
+
+    def counts(self):
+        total, done = self.conn.execute('SELECT COUNT(*), TOTAL(done) FROM tasks').fetchone()
+        return total, int(done)
+
+    def get(self, task_id):
+        row = self.conn.execute(f'SELECT {self.COLUMNS} FROM tasks WHERE id = ?', (task_id,)).fetchone()
+        return self._task(row) if row else None
+
+    def _apply(self, ops):
+        results, undo = [], []
+        with self.conn:
+            # Verrou d'écriture pris d'emblée : la lecture de `get` et la mise à
+            # jour voient le même état, même avec d'autres processus.
+            self.conn.execute('BEGIN IMMEDIATE')
+            for op, value in ops:
+                if op == 'add':
+                    task = new_task(None, value)
+                    cursor = self.conn.execute('INSERT INTO tasks (title, done, priority, due, tags) '
+                                               'VALUES (?, ?, ?, ?, ?)', self._row(dict(task, id=None))[1:])
+                    task['id'] = cursor.lastrowid
+                    results.append(task)
+                    undo.append(('remove', cursor.lastrowid))
+                    continue
+                task_id = value['id'] if op in ('restore', 'set') else value
+                task = self.get(task_id)
+                if op == 'restore':
+                    task = None if task is not None else new_task(task_id, value)
+                    if task is not None:
+                        self.conn.execute(f'INSERT INTO tasks ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)',
+                                          self._row(task))
+                        undo.append(('remove', task_id))
+                elif task is not None and op == 'set':
+                    updated = with_meta(task, value)
+                    if updated != task:
+                        self.conn.execute('UPDATE tasks SET priority = ?, due = ?, tags = ? WHERE id = ?',
+                                          self._row(updated)[3:] + (task_id,))
+                        undo.append(('set', meta_changes(task, value)))
+                        task = updated
+                elif task is not None and op == 'remove':
+                    self.conn.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+                    undo.append(('restore', dict(task)))
+                elif task is not None and task['done'] != (op == 'done'):
+                    self.conn.execute('UPDATE tasks SET done = ? WHERE id = ?', (int(op == 'done'), task_id))
+                    undo.append(('undone' if op == 'done' else 'done', task_id))
+                    task['done'] = op == 'done'
+                results.append(task)
+        return results, undo
+
+    def compact(self):
+        self.conn.execute('VACUUM')
+
+
+STORES = {
+    'journal': JournalStore,
+    'binary': lambda: JournalStore(BINARY_FILE, BinarySnapshot),
+    'sqlite': SqliteStore,
+}
+
+
+class RemoteStore(Store):
+    """Client léger du service `todo.py serve`, une requête JSON par ligne sur la socket."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.file = sock.makefile('rwb')
+        self._search = None
+        self._meta = None
+        self._history = None
+
+    @classmethod
+    def connect(cls, path=SOCKET_FILE):
+        """Store distant si un service écoute sur `path`, sinon None."""
+        if not os.path.exists(path):
+            return None
+        import socket
+        if not hasattr(socket, 'AF_UNIX'):
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            return None
+        return cls(sock)
+
+    def _send(self, method, **params):
+        self.file.write(json.dumps(dict(params, method=method), ensure_ascii=False).encode('utf-8') + b'\n')
+        self.file.flush()
+
+    def _receive(self):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('service todo interrompu')
+        return json.loads(line)
+
+    def _call(self, method, **params):
+        self._send(method, **params)
+        response = self._receive()
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response['result']
+
+    @property
+    def search(self):
+        # L'index de recherche est lu directement ; le service le tient à jour.
+        if self._search is None:
+            self._search = SearchIndex(self._call('info')['search'])
+        return self._search
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            self._meta = MetaIndex(self._call('info')['meta'])
+        return self._meta
+
+    @property
+    def history(self):
+        if self._history is None:
+            self._history = History(self._call('info')['history'])
+        return self._history
+
+    @contextlib.contextmanager
+    def _lock(self):
+        # Le service applique les lots un par un ; il n'y a pas de verrou à prendre ici.
+        yield
+
+    def apply(self, ops):
+        return self._call('apply', ops=ops)
+
+    def _replay(self, method):
+        replayed = self._call(method)
+        if replayed is None:
+            return None
+        label, ops, results = replayed
+        return label, [tuple(op) for op in ops], results
+
+    def undo(self):
+        return self._replay('undo')
+
+    def redo(self):
+        return self._replay('redo')
+
+    def iter_tasks(self):
+        self._send('tasks')
+        while True:
+            task = self._receive()
+            if task is None:
+                return
+            yield task
+
+    def id_at(self, index):
+        return self._call('id_at', index=index)
+
+    def get(self, task_id):
+        return self._call('get', id=task_id)
+
+    def counts(self):
+        return tuple(self._call('counts'))
+
+    def compact(self):
+        self._call('compact')
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _valid_meta(value):
+    priority, due, tags = (value.get(field) for field in META_FIELDS)
+    return ((priority is None or priority in PRIORITY_NAMES) and (due is None or isinstance(due, str))
+            and (tags is None or isinstance(tags, list) and all(isinstance(tag, str) for tag in tags)))
+
+
+def check_ops(ops):
+    """Ops d'un client, en couples (op, valeur) ; ValueError si l'une n'est pas de la forme attendue par `apply`.
+
+    Le service vérifie chaque requête avant de la mettre dans un lot : une op
+    invalide ne doit pas faire échouer les requêtes des autres clients.
+    """
+    checked = []
+    for op in ops:
+        if not isinstance(op, list) or len(op) != 2:
+            raise ValueError(f'op invalide: {op!r}')
+        name, value = op
+        if name == 'add':
+            valid = isinstance(value, str) or (isinstance(value, dict) and isinstance(value.get('title'), str)
+                                               and _valid_meta(value))
+        elif name in ('done', 'undone', 'remove'):
+            valid = _is_id(value)
+        elif name in ('set', 'restore'):
+            valid = isinstance(value, dict) and _is_id(value.get('id')) and _valid_meta(value)
+            if name == 'restore':
+                valid = valid and isinstance(value.get('title'), str)
+        else:
+            valid = False
+        if not valid:
+            raise ValueError(f'op invalide: {op!r}')
+        checked.append((name, value))
+    return checked
+
+
+class TodoServer:
+    """Service `todo.py serve` : les tâches restent en mémoire derrière une socket Unix.
+
+    Les lectures sont servies depuis la mémoire. Les écritures passent toutes
+    par une file et un seul thread : ce qui arrive pendant l'écriture d'un lot
+    part dans le lot suivant, persisté avec un seul fsync (group commit).
+    """
+
+    def __init__(self, store, path=SOCKET_FILE):
+        self.store = store
+        self.path = path
+        self.tasks = TaskList()
+        self.queue = None
+        import concurrent.futures
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+
+    async def _run(self, func, *args):
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def serve(self):
+        import asyncio
+        import signal
+        self.tasks = await self._run(self.store.load)
+        self.queue = asyncio.Queue()
+        committer = asyncio.ensure_future(self._commit_loop())
+        server = await asyncio.start_unix_server(self._handle, self.path)
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, server.close)
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            committer.cancel()
+            os.remove(self.path)
+
+    async def _commit_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            ops = [op for request_ops, _ in batch for op in request_ops]
+            try:
+                results = await self._run(self.store.apply, ops)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self._update(ops, results)
+            pos = 0
+            for request_ops, future in batch:
+                future.set_result(results[pos:pos + len(request_ops)])
+                pos += len(request_ops)
+
+    def _update(self, ops, results):
+        """Reporter en mémoire des ops que le store vient d'appliquer."""
+        for (op, _), task in zip(ops, results):
+            if task is None:
+                continue
+            if op == 'add':
+                self.tasks.append(task['id'], task['title'], task['done'], task_meta(task))
+            elif op == 'set':
+                self.tasks.set_meta(task['id'], task_meta(task))
+            elif op == 'done':
+                self.tasks.mark_done(task['id'])
+            elif op == 'undone':
+                self.tasks.mark_pending(task['id'])
+            elif op == 'remove':
+                self.tasks.remove(task['id'])
+            elif op == 'restore':
+                self.tasks.restore(task['id'], task['title'], task['done'], task_meta(task))
+
+    async def _dispatch(self, request, writer):
+        method = request.get('method')
+        if method == 'apply':
+            import asyncio
+            ops = check_ops(request['ops'])
+            future = asyncio.get_running_loop().create_future()
+            await self.queue.put((ops, future))
+            return await future
+        if method in ('undo', 'redo'):
+            # Même thread d'écriture que les lots : l'ordre des opérations est conservé.
+            replayed = await self._run(getattr(self.store, method))
+            if replayed is not None:
+                self._update(replayed[1], replayed[2])
+            return replayed
+        if method == 'tasks':
+            # Copie compacte : les écritures peuvent continuer pendant l'envoi.
+            for task in self.tasks.copy():
+                writer.write(json.dumps(task, ensure_ascii=False).encode('utf-8') + b'\n')
+                if writer.transport.get_write_buffer_size() > 1 << 16:
+                    await writer.drain()
+            writer.write(b'null\n')
+            return None
+        if method == 'id_at':
+            return self.tasks.id_at(request['index'])
+        if method == 'get':
+            return self.tasks.get(request['id'])
+        if method == 'counts':
+            return [len(self.tasks), self.tasks.done_count()]
+        if method == 'compact':
+            return await self._run(self.store.compact)
+        if method == 'info':
+            return {'search': os.path.abspath(self.store.search.path),
+                    'meta': os.path.abspath(self.store.meta.path),
+                    'history': os.path.abspath(self.store.history.path)}
+        raise ValueError(f'méthode inconnue: {method}')
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = json.loads(line)
+                try:
+                    result = await self._dispatch(request, writer)
+                    response = None if request.get('method') == 'tasks' else {'result': result}
+                except Exception as e:
+                    response = {'error': str(e)}
+                if response is not None:
+                    writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def resolve_task_id(args):
+    """Identifiant stable donné avec --id, ou à défaut celui de la tâche à cette position."""
+    if args.by_id:
+        return args.index
+    with phase('load'):
+        return args.store.id_at(args.index - 1)
+
+
+def describe(op, task):
+    if task is None:
+        return 'Index de tâche invalide.'
+    if op == 'add':
+        return f"Tâche ajoutée: {task['title']} (#{task['id']})"
+    if op == 'done':
+        return f"Tâche terminée: {task['title']}"
+    if op == 'set':
+        return f"Tâche modifiée: {task['title']}{format_meta(task)}"
+    return f"Tâche supprimée: {task['title']}"
+
+
+def format_meta(task):
+    """Suffixe ` [priorité high, échéance 2026-10-20, +prod]`, vide sans métadonnées."""
+    parts = []
+    if task.get('priority'):
+        parts.append(f"priorité {PRIORITY_NAMES[task['priority']]}")
+    if task.get('due'):
+        parts.append(f"échéance {task['due']}")
+    if task.get('tags'):
+        parts.append(' '.join('+' + tag for tag in task['tags']))
+    return f" [{', '.join(parts)}]" if parts else ''
+
+
+def select_tasks(tasks, status=None, pattern=None):
+    """(position, tâche) des tâches retenues ; la position reste celle de la liste complète."""
+    for idx, task in enumerate(tasks, 1):
+        if status is not None and bool(task.get('done')) != status:
+            continue
+        if pattern is not None and not pattern.search(task.get('title', '')):
+            continue
+        yield idx, task
+
+
+def render_tasks(selected, fmt):
+    if fmt == 'json':
+        sep = '[\n  '
+        for idx, task in selected:
+            yield sep + json.dumps(dict(task, position=idx), ensure_ascii=False)
+            sep = ',\n  '
+        yield '\n]\n' if sep != '[\n  ' else '[]\n'
+    elif fmt == 'tsv':
+        for idx, task in selected:
+            title = task.get('title', '').replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+            yield f"{idx}\t{task['id']}\t{int(bool(task.get('done')))}\t{title}\n"
+    else:
+        empty = True
+        for idx, task in selected:
+            empty = False
+            status = '✓' if task.get('done') else ' '
+            yield f"{idx}. [{status}] {task.get('title')} (#{task['id']}){format_meta(task)}\n"
+        if empty:
+            yield 'Aucune tâche.\n'
+
+
+def list_tasks(args):
+    selected = select_tasks(args.store.iter_tasks(), args.status, args.grep)
+    stop = args.offset + args.limit if args.limit is not None else None
+    selected = itertools.islice(selected, args.offset, stop)
+    sys.stdout.flush()
+    # Les tâches sont lues au fil de l'affichage : une seule phase pour les deux.
+    with open(sys.stdout.fileno(), 'w', encoding='utf-8', buffering=1 << 16, closefd=False) as out, \
+            phase('output'):
+        for chunk in render_tasks(selected, args.format):
+            out.write(chunk)
+
+
+def add_task(args):
+    meta = {'priority': PRIORITIES.get(args.priority), 'due': args.due, 'tags': args.tags}
+    task = args.store.add(dict(meta, title=args.title) if any(meta.values()) else args.title)
+    with phase('output'):
+        print(describe('add', task))
+
+
+def mark_done(args):
+    task_id = resolve_task_id(args)
+    task = None if task_id is None else args.store.done(task_id)
+    with phase('output'):
+        print(describe('done', task))
+
+
+def remove_task(args):
+    task_id = resolve_task_id(args)
+    task = None if task_id is None else args.store.remove(task_id)
+    with phase('output'):
+        print(describe('remove', task))
+
+
+def set_task(args):
+    task_id = resolve_task_id(args)
+    task = None if task_id is None else args.store.get(task_id)
+    if task is not None:
+        changes = {'id': task_id}
+        if args.priority:
+            changes['priority'] = PRIORITIES.get(args.priority)
+        if args.due:
+            changes['due'] = None if args.due == 'none' else args.due
+        if args.tags or args.untag:
+            tags = [tag for tag in task.get('tags', ()) if tag not in args.untag]
+            changes['tags'] = tags + [tag for tag in dict.fromkeys(args.tags) if tag not in tags]
+        task = args.store.apply([('set', changes)])[0]
+    with phase('output'):
+        print(describe('set', task))
+
+
+def query_tasks(args):
+    index = args.store.meta
+    count = args.store.rebuild_index(index, args.rebuild)
+    if args.rebuild:
+        print(f'Index des métadonnées reconstruit: {count} tâches.')
+    due_before = args.due_before
+    if args.overdue:
+        import datetime
+        today = datetime.date.today().isoformat()
+        due_before = min(due_before or today, today)
+    ids = index.query(due_before, PRIORITIES.get(args.priority), args.tags, args.all, args.limit)
+    for task_id in ids:
+        task = args.store.get(task_id)
+        status = '✓' if task['done'] else ' '
+        print(f"#{task_id} [{status}] {task['title']}{format_meta(task)}")
+    if not ids:
+        print('Aucune tâche trouvée.')
+
+
+def search_tasks(args):
+    count = args.store.rebuild_index(args.store.search, args.rebuild)
+    if args.rebuild:
+        print(f'Index de recherche reconstruit: {count} tâches.')
+    if not args.query:
+        return
+    results = args.store.search.search(' '.join(args.query), args.limit)
+    for task in results:
+        status = '✓' if task['done'] else ' '
+        print(f"#{task['id']} [{status}] {task['title']}")
+    if not results:
+        print('Aucune tâche trouvée.')
+
+
+def parse_batch_line(line):
+    """(op, valeur, par_id) d'une ligne de lot, au format texte ou JSON.
+
+    Texte : `add <titre>`, `done <position>`, `remove #<id>`...
+    JSON : {"op": "add", "title": ...}, {"op": "done", "index": 3}, {"op": "remove", "id": 7}.
+    Le titre doit être une chaîne, la position ou l'id un entier (ou une
+    chaîne qui en est un) ; sinon ValueError, comme pour une ligne mal formée.
+    """
+    if line.startswith('{'):
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(line)
+        op = record.get('op')
+        by_id = 'id' in record
+        value = record['title'] if op == 'add' else record['id' if by_id else 'index']
+        if op == 'add':
+            by_id = False
+            if not isinstance(value, str):
+                raise ValueError(line)
+        elif isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(line)
+        else:
+            value = int(value)
+    else:
+        op, _, value = line.partition(' ')
+        value = value.strip()
+        by_id = value.startswith('#')
+        if op != 'add':
+            value = int(value.lstrip('#'))
+    if op not in ('add', 'done', 'remove') or value == '':
+        raise ValueError(line)
+    return op, value, by_id
+
+
+def batch_tasks(args):
+    if args.file == '-':
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    ops, report = [], []
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            ops.append((lineno, *parse_batch_line(line)))
+        except (ValueError, KeyError, TypeError):
+            report.append((lineno, f'Ligne invalide: {line}'))
+    # Les positions désignent la liste telle qu'elle était au début du lot,
+    # quelles que soient les suppressions qui les précèdent dans le lot.
+    positions = []
+    if any(op != 'add' and not by_id for _, op, _, by_id in ops):
+        positions = [task['id'] for task in args.store.iter_tasks()]
+    resolved = []
+    for _, op, value, by_id in ops:
+        if op != 'add' and not by_id:
+            value = positions[value - 1] if 1 <= value <= len(positions) else 0
+        resolved.append((op, value))
+    results = args.store.apply(resolved)
+    for (lineno, op, _, _), task in zip(ops, results):
+        report.append((lineno, describe(op, task)))
+    for lineno, message in sorted(report):
+        print(f'{lineno}: {message}')
+
+
+def serve_tasks(args):
+    if RemoteStore.connect(args.socket) is not None:
+        print(f'Un service écoute déjà sur {args.socket}.')
+        return
+    if os.path.exists(args.socket):
+        os.remove(args.socket)  # socket laissée par un service arrêté
+    print(f'Service todo à l\'écoute sur {args.socket} (Ctrl-C pour arrêter).')
+    import asyncio
+    try:
+        asyncio.run(TodoServer(args.store, args.socket).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def stats_tasks(args):
+    total, done = args.store.counts()
+    print(f'Tâches: {total} (terminées: {done}, à faire: {total - done})')
+
+
+def convert_tasks(args):
+    """Convertir un snapshot (journal compris) entre JSON et binaire, selon l'extension."""
+    codecs = {'.bin': BinarySnapshot, '.json': JsonSnapshot}
+    source = JournalStore(args.source, codecs.get(os.path.splitext(args.source)[1], JsonSnapshot))
+    target = codecs.get(os.path.splitext(args.target)[1], JsonSnapshot)
+    tasks = source.load()
+    target.save(tasks, args.target)
+    print(f'{len(tasks)} tâches converties: {args.source} -> {args.target}')
+
+
+def compact_tasks(args):
+    args.store.compact()
+    print('Stockage compacté.')
+
+
+def is_checked(value):
+    """Statut « terminé » d'une cellule CSV ou d'un champ JSON."""
+    return str(value).strip().lower() in ('1', 'true', 'x', 'yes', 'oui')
+
+
+def read_csv(f):
+    import csv
+    for row in csv.DictReader(f):
+        yield row.get('title'), is_checked(row.get('done'))
+
+
+def read_jsonl(f):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield None, False
+            continue
+        if isinstance(record, dict):
+            yield record.get('title'), is_checked(record.get('done'))
+        else:
+            yield None, False
+
+
+def read_markdown(f):
+    """Cases à cocher `- [ ] titre` et `- [x] titre` ; le reste du document est ignoré."""
+    import re
+    item = re.compile(r'\s*[-*+] \[([ xX])\] (.*)')
+    for line in f:
+        match = item.match(line)
+        if match:
+            yield match.group(2), match.group(1) != ' '
+
+
+def write_csv(out, tasks):
+    import csv
+    writer = csv.writer(out)
+    writer.writerow(['id', 'title', 'done'])
+    for task in tasks:
+        writer.writerow([task['id'], task['title'], int(task['done'])])
+
+
+def write_jsonl(out, tasks):
+    for task in tasks:
+        out.write(json.dumps(task, ensure_ascii=False) + '\n')
+
+
+def write_markdown(out, tasks):
+    for task in tasks:
+        out.write(f"- [{'x' if task['done'] else ' '}] {task['title']}\n")
+
+
+# Formats d'échange : (lecteur, rédacteur), choisis par --format ou par l'extension du fichier.
+FORMATS = {'csv': (read_csv, write_csv), 'jsonl': (read_jsonl, write_jsonl), 'md': (read_markdown, write_markdown)}
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.md': 'md', '.markdown': 'md'}
+# Lignes importées par écriture : chaque paquet part en un seul lot vers le store.
+IMPORT_CHUNK = 10000
+
+
+def exchange_format(args):
+    fmt = args.format or EXTENSIONS.get(os.path.splitext(args.file)[1].lower())
+    if fmt is None:
+        print(f'Format inconnu pour {args.file} : préciser --format ({", ".join(FORMATS)}).')
+    return fmt
+
+
+def import_tasks(args):
+    """Importer un fichier en flux, par paquets de IMPORT_CHUNK lignes.
+
+    Un titre déjà présent (dans les tâches ou plus haut dans le fichier)
+    n'est pas réimporté. Seules les empreintes des titres restent en
+    mémoire, pas les lignes.
+    """
+    fmt = exchange_format(args)
+    if fmt is None:
+        return
+    start = time.perf_counter()
+    seen = TitleSet(task['title'] for task in args.store.iter_tasks())
+    imported = duplicates = invalid = 0
+    source = sys.stdin.fileno() if args.file == '-' else args.file
+    with open(source, 'r', encoding='utf-8', newline='', closefd=args.file != '-') as f, args.store.bulk():
+        rows = FORMATS[fmt][0](f)
+        for chunk in iter(lambda: list(itertools.islice(rows, IMPORT_CHUNK)), []):
+            ops = []
+            for title, done in chunk:
+                title = title.strip() if isinstance(title, str) else ''
+                if not title:
+                    invalid += 1
+                elif not seen.add(title):
+                    duplicates += 1
+                else:
+                    ops.append(('add', {'title': title, 'done': done}))
+            if ops:
+                args.store.apply(ops)
+                imported += len(ops)
+    elapsed = time.perf_counter() - start
+    rows = imported + duplicates + invalid
+    print(f'{imported} tâches importées, {duplicates} doublons ignorés, {invalid} lignes invalides '
+          f'en {elapsed:.2f} s ({rows / elapsed if elapsed else 0:.0f} lignes/s).')
+
+
+def export_tasks(args):
+    fmt = exchange_format(args)
+    if fmt is None:
+        return
+    start = time.perf_counter()
+    count = 0
+
+    def counted(tasks):
+        nonlocal count
+        for count, task in enumerate(tasks, 1):
+            yield task
+
+    target = sys.stdout.fileno() if args.file == '-' else args.file
+    sys.stdout.flush()
+    with open(target, 'w', encoding='utf-8', newline='', buffering=1 << 16, closefd=args.file != '-') as out:
+        FORMATS[fmt][1](out, counted(args.store.iter_tasks()))
+    elapsed = time.perf_counter() - start
+    # Sur la sortie standard, le compte rendu ne doit pas se mêler aux données.
+    print(f'{count} tâches exportées en {elapsed:.2f} s ({count / elapsed if elapsed else 0:.0f} tâches/s).',
+          file=sys.stderr if args.file == '-' else sys.stdout)
+
+
+def undo_tasks(args):
+    replayed = args.store.undo()
+    print('Rien à annuler.' if replayed is None else f'Annulé: {replayed[0]}')
+
+
+def redo_tasks(args):
+    replayed = args.store.redo()
+    print('Rien à rétablir.' if replayed is None else f'Rétabli: {replayed[0]}')
+
+
+def history_tasks(args):
+    """Opérations annulables, puis rétablissables, de la plus récente à la plus ancienne."""
+    history = args.store.history
+    undo = history.entries(history.undo_path)[::-1][:args.limit]
+    redo = history.entries(history.redo_path)[::-1][:args.limit]
+    if not undo and not redo:
+        print('Historique vide.')
+    for title, entries in (('À annuler', undo), ('À rétablir', redo)):
+        if entries:
+            print(f'{title}:')
+            for n, entry in enumerate(entries, 1):
+                print(f"  {n}. {entry['label']}")
+
+
+# Valeurs par défaut de `list`, partagées par argparse et la répartition rapide.
+LIST_DEFAULTS = {'status': None, 'grep': None, 'offset': 0, 'limit': None, 'format': 'plain'}
+# Métadonnées de `add` quand aucune option n'est donnée.
+ADD_DEFAULTS = {'priority': None, 'due': None, 'tags': ()}
+
+
+def fast_args(argv):
+    """Arguments des formes d'appel les plus fréquentes, reconnues sans argparse.
+
+    `list`, `add <titre>`, `done <n>` et `remove <n>`, éventuellement précédés
+    de `--backend <moteur>`. Renvoie None pour tout le reste (options, aide,
+    erreurs), qui passe par argparse.
+    """
+    from types import SimpleNamespace
+    common = {'backend': 'journal', 'history_limit': HISTORY_LIMIT, 'profile': False, 'cprofile': None}
+    if len(argv) > 2 and argv[0] == '--backend' and argv[1] in STORES:
+        common['backend'], argv = argv[1], argv[2:]
+    if argv == ['list']:
+        return SimpleNamespace(func=list_tasks, **common, **LIST_DEFAULTS)
+    if len(argv) != 2 or argv[1].startswith('-'):
+        return None
+    command, value = argv
+    if command == 'add':
+        return SimpleNamespace(func=add_task, title=value, **common, **ADD_DEFAULTS)
+    if command in ('done', 'remove') and value.isascii() and value.isdigit():
+        func = mark_done if command == 'done' else remove_task
+        return SimpleNamespace(func=func, index=int(value), by_id=False, **common)
+    return None
+
+
+def due_date(value):
+    """Échéance AAAA-MM-JJ, ou `none` pour l'effacer."""
+    if value == 'none':
+        return value
+    import datetime
+    return datetime.date.fromisoformat(value).isoformat()
+
+
+def non_negative(value):
+    """Nombre positif ou nul (--offset, --limit)."""
+    import argparse
+    if not (value.isascii() and value.isdigit()):
+        raise argparse.ArgumentTypeError(f'nombre positif ou nul attendu : {value}')
+    return int(value)
+
+
+def title_pattern(value):
+    """Expression régulière de --grep, compilée sans casse."""
+    import argparse
+    import re
+    try:
+        return re.compile(value, re.IGNORECASE)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f'expression régulière invalide ({e}) : {value}')
+
+
+def build_parser():
+    import argparse
+    parser = argparse.ArgumentParser(description='Gestionnaire de todo list basique.')
+    parser.add_argument('--backend', choices=sorted(STORES), default='journal',
+                        help='Moteur de stockage des tâches')
+    parser.add_argument('--history-limit', type=int, default=HISTORY_LIMIT,
+                        help="Nombre d'opérations annulables conservées (0 : aucun historique)")
+    parser.add_argument('--profile', action='store_true',
+                        help='Durée de chaque phase en lignes JSON sur stderr (comme TODO_TRACE=1)')
+    parser.add_argument('--cprofile', metavar='FICHIER',
+                        help='Profil cProfile de la commande (comme TODO_CPROFILE=FICHIER)')
+    subparsers = parser.add_subparsers(dest='command')
+
+    parser_list = subparsers.add_parser('list', help='Lister toutes les tâches')
+    status = parser_list.add_mutually_exclusive_group()
+    status.add_argument('--done', dest='status', action='store_const', const=True,
+                        help='Seulement les tâches terminées')
+    status.add_argument('--pending', dest='status', action='store_const', const=False,
+                        help='Seulement les tâches à faire')
+    parser_list.add_argument('--grep', type=title_pattern,
+                             help='Expression régulière cherchée dans les titres (sans casse)')
+    parser_list.add_argument('--offset', type=non_negative, help='Nombre de tâches retenues à sauter')
+    parser_list.add_argument('--limit', type=non_negative, help='Nombre maximal de tâches affichées')
+    parser_list.add_argument('--format', choices=('plain', 'tsv', 'json'), help='Format de sortie')
+    parser_list.set_defaults(func=list_tasks, **LIST_DEFAULTS)
+
+    parser_add = subparsers.add_parser('add', help='Ajouter une nouvelle tâche')
+    parser_add.add_argument('title', help='Titre de la tâche')
+    parser_add.add_argument('--priority', choices=sorted(PRIORITIES), help='Priorité de la tâche')
+    parser_add.add_argument('--due', type=due_date, help='Échéance (AAAA-MM-JJ)')
+    parser_add.add_argument('--tag', dest='tags', action='append', default=[], help='Étiquette (répétable)')
+    parser_add.set_defaults(func=add_task)
+
+    parser_set = subparsers.add_parser('set', help="Changer la priorité, l'échéance ou les étiquettes d'une tâche")
+    parser_set.add_argument('index', type=int, help="Index de la tâche (à partir de 1)")
+    parser_set.add_argument('--id', dest='by_id', action='store_true',
+                            help="Désigner la tâche par son identifiant stable")
+    parser_set.add_argument('--priority', choices=sorted(PRIORITIES) + ['none'], help="Priorité ('none' : aucune)")
+    parser_set.add_argument('--due', type=due_date, help="Échéance (AAAA-MM-JJ, 'none' : aucune)")
+    parser_set.add_argument('--tag', dest='tags', action='append', default=[], help='Étiquette à ajouter (répétable)')
+    parser_set.add_argument('--untag', action='append', default=[], help='Étiquette à retirer (répétable)')
+    parser_set.set_defaults(func=set_task)
+
+    parser_done = subparsers.add_parser('done', help='Marquer une tâche comme terminée')
+    parser_done.add_argument('index', type=int, help="Index de la tâche (à partir de 1)")
+    parser_done.add_argument('--id', dest='by_id', action='store_true',
+                             help="Désigner la tâche par son identifiant stable")
+    parser_done.set_defaults(func=mark_done)
+
+    parser_remove = subparsers.add_parser('remove', help='Supprimer une tâche')
+    parser_remove.add_argument('index', type=int, help="Index de la tâche (à partir de 1)")
+    parser_remove.add_argument('--id', dest='by_id', action='store_true',
+                               help="Désigner la tâche par son identifiant stable")
+    parser_remove.set_defaults(func=remove_task)
+
+    parser_search = subparsers.add_parser('search', help='Rechercher des tâches par mots du titre')
+    parser_search.add_argument('query', nargs='*', help='Mots (ou débuts de mots) cherchés, sans casse ni accents')
+    parser_search.add_argument('--limit', type=non_negative, default=20, help='Nombre maximal de résultats')
+    parser_search.add_argument('--rebuild', action='store_true',
+                               help="Reconstruire l'index de recherche depuis les tâches")
+    parser_search.set_defaults(func=search_tasks)
+
+    parser_query = subparsers.add_parser('query', help='Tâches à faire selon échéance, priorité et étiquettes')
+    parser_query.add_argument('--overdue', action='store_true', help="Échéance dépassée (avant aujourd'hui)")
+    parser_query.add_argument('--due-before', type=due_date, help='Échéance avant cette date (AAAA-MM-JJ)')
+    parser_query.add_argument('--priority', choices=sorted(PRIORITIES), help='Priorité minimale')
+    parser_query.add_argument('--tag', dest='tags', action='append', default=[],
+                              help='Étiquette exigée (répétable)')
+    parser_query.add_argument('--all', action='store_true', help='Inclure les tâches terminées')
+    parser_query.add_argument('--limit', type=non_negative, help='Nombre maximal de résultats')
+    parser_query.add_argument('--rebuild', action='store_true',
+                              help="Reconstruire l'index des métadonnées depuis les tâches")
+    parser_query.set_defaults(func=query_tasks)
+
+    parser_batch = subparsers.add_parser('batch', help='Appliquer un lot d\'opérations en une seule écriture')
+    parser_batch.add_argument('file', nargs='?', default='-',
+                              help="Fichier d'opérations, une par ligne (texte ou JSON) ; stdin par défaut")
+    parser_batch.set_defaults(func=batch_tasks)
+
+    parser_serve = subparsers.add_parser('serve', help='Garder les tâches en mémoire derrière une socket locale')
+    parser_serve.add_argument('--socket', default=SOCKET_FILE, help='Chemin de la socket Unix')
+    parser_serve.set_defaults(func=serve_tasks)
+
+    parser_stats = subparsers.add_parser('stats', help='Compter les tâches terminées et à faire')
+    parser_stats.set_defaults(func=stats_tasks)
+
+    parser_convert = subparsers.add_parser('convert', help='Convertir un snapshot entre JSON (.json) et binaire (.bin)')
+    parser_convert.add_argument('source', help='Snapshot à lire (son journal est pris en compte)')
+    parser_convert.add_argument('target', help='Snapshot à écrire')
+    parser_convert.set_defaults(func=convert_tasks)
+
+    parser_compact = subparsers.add_parser('compact', help='Compacter le stockage des tâches')
+    parser_compact.set_defaults(func=compact_tasks)
+
+    parser_import = subparsers.add_parser('import', help='Importer des tâches (CSV, JSONL, Markdown)')
+    parser_import.add_argument('file', help="Fichier à importer ('-' : entrée standard)")
+    parser_import.add_argument('--format', choices=sorted(FORMATS), help="Format du fichier (sinon d'après l'extension)")
+    parser_import.set_defaults(func=import_tasks)
+
+    parser_export = subparsers.add_parser('export', help='Exporter les tâches (CSV, JSONL, Markdown)')
+    parser_export.add_argument('file', help="Fichier à écrire ('-' : sortie standard)")
+    parser_export.add_argument('--format', choices=sorted(FORMATS), help="Format du fichier (sinon d'après l'extension)")
+    parser_export.set_defaults(func=export_tasks)
+
+    parser_undo = subparsers.add_parser('undo', help='Annuler la dernière opération')
+    parser_undo.set_defaults(func=undo_tasks)
+
+    parser_redo = subparsers.add_parser('redo', help='Rétablir la dernière opération annulée')
+    parser_redo.set_defaults(func=redo_tasks)
+
+    parser_history = subparsers.add_parser('history', help='Afficher les opérations annulables et rétablissables')
+    parser_history.add_argument('--limit', type=non_negative, default=10, help="Nombre maximal d'entrées par pile")
+    parser_history.set_defaults(func=history_tasks)
+
+    return parser
+
+
+def start_tracing(target):
+    """Activer le traçage des phases vers stderr (`1`, `-`) ou vers le fichier `target`."""
+    global TRACER
+    out = sys.stderr if target in ('1', '-') else open(target, 'a', encoding='utf-8')
+    TRACER = Tracer(out)
+    return TRACER
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    start, blocks = time.perf_counter(), sys.getallocatedblocks()
+    args = fast_args(argv)
+    if args is None:
+        parser = build_parser()
+        args = parser.parse_args(argv)
+        if not hasattr(args, 'func'):
+            parser.print_help()
+            return
+    trace = os.environ.get('TODO_TRACE') or ('-' if args.profile else None)
+    if trace:
+        # L'analyse des arguments a déjà eu lieu : elle est enregistrée après coup.
+        tracer = start_tracing(trace)
+        tracer.command = args.func.__name__
+        tracer.record('parse', start, blocks)
+    with phase('open'):
+        # Quand un service tourne, les commandes passent par lui.
+        remote = None if args.func is serve_tasks else RemoteStore.connect()
+        args.store = remote or STORES[args.backend]()
+    if remote is None:
+        args.store.history.limit = args.history_limit
+    cprofile = args.cprofile or os.environ.get('TODO_CPROFILE')
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.runcall(args.func, args)
+        profiler.dump_stats(cprofile)
+    else:
+        args.func(args)
+    if trace:
+        tracer.record('total', start, blocks)
+
+
+if __name__ == '__main__':
+    main()